@@ -1,8 +1,13 @@
 from flask import render_template, request, redirect, url_for, flash, g
-from sqlalchemy import func
 from extensions import db
 from models import User, Application
 from helpers import admin_required
+from user_cache import user_cache
+from passwords import password_hasher
+from pagination import paginate_request
+from counters import read_stats
+import analytics
+import file_store
 
 
 def register_routes(app):
@@ -10,8 +15,8 @@ def register_routes(app):
     @admin_required
     def admin_users():
         """Список всіх користувачів для керування."""
-        users = User.query.order_by(User.id.asc()).all()
-        return render_template("admin_users.html", users=users)
+        page = paginate_request(db.select(User), [User.id])
+        return render_template("admin_users.html", users=page, page=page)
 
     @app.route("/admin/users/<int:user_id>/update", methods=["POST"])
     @admin_required
@@ -52,6 +57,7 @@ def register_routes(app):
 
             target_user.role = new_role
             db.session.commit()
+            user_cache.invalidate(target_user.id)
             flash(f"Роль користувача {target_user.email} змінено на {new_role}.", "success")
 
         elif action == "toggle_block":
@@ -62,6 +68,7 @@ def register_routes(app):
 
             target_user.is_blocked = not target_user.is_blocked
             db.session.commit()
+            user_cache.invalidate(target_user.id)
             status = "заблоковано" if target_user.is_blocked else "розблоковано"
             flash(f"Користувача {target_user.email} {status}.", "success")
 
@@ -71,22 +78,23 @@ def register_routes(app):
     @admin_required
     def admin_stats():
         """Сторінка статистики."""
-        # Підрахунок кількості заявок по кожному статусу
-        stats_query = (
-            db.session.query(Application.status, func.count(Application.id))
-            .group_by(Application.status)
-            .all()
-        )
-
-        # Перетворюємо в словник
-        stats = {status: count for status, count in stats_query}
+        # Лічильники оновлюються разом зі змінами (див. counters.py) — без GROUP BY
+        stats, total_users = read_stats()
 
         # Прибираємо чернетки зі статистики
-        if 'draft' in stats:
-            del stats['draft']
+        del stats['draft']
+
+        # Загальна кількість заявок БЕЗ чернеток
+        total_apps = sum(stats.values())
 
-        total_users = User.query.count()
-        # Рахуємо загальну кількість заявок БЕЗ чернеток
-        total_apps = Application.query.filter(Application.status != 'draft').count()
+        return render_template("admin_stats.html", stats=stats, total_users=total_users, total_apps=total_apps,
+                               hash_stats=password_hasher.stats(), storage=file_store.report())
 
-        return render_template("admin_stats.html", stats=stats, total_users=total_users, total_apps=total_apps)
\ No newline at end of file
+    @app.route("/admin/analytics")
+    @admin_required
+    def admin_analytics():
+        """Пропускна здатність і час до рішення (агрегати з `flask analytics-rollup`)."""
+        days = request.args.get("days", type=int) or None
+        if days is not None:
+            days = max(1, min(days, 366))
+        return render_template("admin_analytics.html", report=analytics.report(days))
@@ -1,23 +1,32 @@
 # ssh -R 80:127.0.0.1:5000 nokey@localhost.run
 
 import os
-from flask import Flask, g, render_template, flash, redirect, url_for
+import click
+from flask import Flask, g, request, session, render_template, flash, redirect, url_for
+from sqlalchemy.orm.exc import StaleDataError
 from extensions import db, mail
-from helpers import get_current_user
+from helpers import get_current_user, EditConflict
+from user_cache import user_cache
+import history_store
+from file_store import FileTooLarge, UploadRequest
+from passwords import PasswordHashBusy
 
 # Імпорти модулів маршрутів
 import auth_routes
 import application_routes
 import expert_routes
 import admin_routes
+import upload_routes
 
 # -----------------------
 # Налаштування застосунку
 # -----------------------
 
 app = Flask(__name__)
+# Файли multipart пишуться відразу у сховище, без тимчасових копій werkzeug
+app.request_class = UploadRequest
 app.config["SECRET_KEY"] = "change-me-in-production"
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///app.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///app.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # --- НАЛАШТУВАННЯ ПОШТИ (SMTP) ---
@@ -32,14 +41,110 @@ app.config['MAIL_PASSWORD'] = 'qmog ycrm pvnc stvr'
 # Від кого будуть приходити листи
 app.config['MAIL_DEFAULT_SENDER'] = 'copyregsystem@gmail.com'
 
+# Черга листів (outbox): маршрути лише додають рядок, відправляє `flask mail-worker`
+app.config['MAIL_QUEUE_WORKERS'] = 2
+app.config['MAIL_QUEUE_BATCH_SIZE'] = 20
+app.config['MAIL_QUEUE_POLL_INTERVAL'] = 2.0
+app.config['MAIL_QUEUE_MAX_ATTEMPTS'] = 5
+app.config['MAIL_QUEUE_BACKOFF_BASE'] = 30  # сек., подвоюється з кожною спробою
+app.config['MAIL_QUEUE_BACKOFF_MAX'] = 3600
+app.config['MAIL_QUEUE_LOCK_TIMEOUT'] = 300
+# Транспорт: скільки листів групувати в одну пачку і скільки секунд
+# тримати SMTP-з'єднання відкритим без трафіку
+app.config['MAIL_TRANSPORT_BATCH_SIZE'] = 50
+app.config['MAIL_TRANSPORT_IDLE_TIMEOUT'] = 30
+
+# Кеш поточного користувача (див. user_cache.py)
+app.config['USER_CACHE_SIZE'] = 1024
+app.config['USER_CACHE_TTL'] = 30  # сек.
+# Файл-мітка, через яку invalidate() скидає кеш в усіх процесах
+app.config['USER_CACHE_STAMP'] = os.path.join(app.instance_path, 'user_cache.stamp')
+
+# Кеш відновлених знімків історії заявок (див. history_store.py)
+app.config['HISTORY_CACHE_SIZE'] = 4096
+
+# Хешування паролів у пулі процесів (див. passwords.py)
+app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+app.config['PASSWORD_HASH_WORKERS'] = 2
+app.config['PASSWORD_HASH_MAX_PENDING'] = 8
+app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = 5.0
+
+# Перевірка доставлюваності e-mail при реєстрації (див. email_checks.py)
+app.config['EMAIL_DELIVERABILITY_MODE'] = 'sync'  # sync | async | off
+app.config['EMAIL_DNS_TIMEOUT'] = 3.0
+app.config['EMAIL_DNS_POSITIVE_TTL'] = 24 * 3600
+app.config['EMAIL_DNS_NEGATIVE_TTL'] = 600
+
+# Обмеження частоти для /login і /password/reset/request (див. rate_limit.py)
+app.config['RATELIMIT_ENABLED'] = True
+app.config['RATELIMIT_BACKEND'] = 'memory'  # 'database' — спільний бюджет для всіх процесів
+app.config['RATELIMIT_MAX_KEYS'] = 100000
+app.config['RATELIMIT_LOGIN_PER_IP'] = (20, 60)  # (спроб, секунд)
+app.config['RATELIMIT_LOGIN_PER_EMAIL'] = (5, 60)
+app.config['RATELIMIT_RESET_PER_IP'] = (5, 300)
+app.config['RATELIMIT_RESET_PER_EMAIL'] = (3, 3600)
+
+# Розмір сторінки для списків (курсорна пагінація, див. pagination.py)
+app.config['PAGE_SIZE'] = 20
+# Скільки подій історії заявки показувати одразу; старіші — кнопкою "Показати старіші"
+app.config['HISTORY_PAGE_SIZE'] = 10
+
+# Аналітика рішень (див. analytics.py): пачка подій історії за один прохід,
+# період сторінки за замовчуванням і пауза між проходами `--loop`
+app.config['ANALYTICS_BATCH_SIZE'] = 5000
+app.config['ANALYTICS_DAYS'] = 30
+app.config['ANALYTICS_INTERVAL'] = 60  # сек.
+
+# Черга розгляду (див. review_queue.py): скільки триває оренда заявки експертом
+# і скільки заявок бере кнопка "Взяти наступні"
+app.config['REVIEW_LEASE_SECONDS'] = 30 * 60
+app.config['REVIEW_CLAIM_BATCH'] = 5
+
+# Схожі розглянуті заявки (див. similar.py): каталог індексу (None — instance/similar)
+# і пауза між компактизаціями `flask similar-compact --loop`
+app.config['SIMILAR_INDEX_DIR'] = None
+app.config['SIMILAR_COMPACT_INTERVAL'] = 600  # сек.
+app.config['SIMILAR_GENERATION_GRACE'] = 600  # сек., скільки зберігати замінені сегменти
+app.config['SIMILAR_REFRESH_MAX_EVENTS'] = 5000  # більше нових подій запит не дочитує
+
 # Налаштування завантаження файлів
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
+# Ліміт на один файл: перевіряється під час прийому, до кінця завантаження (див. file_store.py)
+app.config['MAX_FILE_SIZE'] = 20 * 1024 * 1024
+# Порція, якою в сховище копіюються потоки не з multipart (міграція тощо)
+app.config['FILE_STORE_CHUNK_SIZE'] = 1024 * 1024
+# Відновлювані завантаження частинами (див. resumable.py): найбільший файл і скільки
+# секунд живе незавершена сесія до `flask uploads-expire`. Одна частина — до MAX_CONTENT_LENGTH
+app.config['UPLOAD_SESSION_MAX_SIZE'] = 1024 * 1024 * 1024
+app.config['UPLOAD_SESSION_TTL'] = 24 * 3600
+# Віддача файлів (див. file_store.send): скільки секунд браузер тримає файл зі сховища
+# без перевірки і чи віддає байти проксі — None, 'x-sendfile' або 'x-accel-redirect'
+# (для nginx: internal location на FILE_ACCEL_REDIRECT_PREFIX з alias на UPLOAD_FOLDER)
+app.config['FILE_CACHE_MAX_AGE'] = 3600
+app.config['FILE_OFFLOAD'] = None
+app.config['FILE_ACCEL_REDIRECT_PREFIX'] = '/protected-uploads/'
+# Рівень deflate для архіву "Завантажити всі" (див. zip_stream.py; стиснуті формати — без стиснення)
+app.config['ZIP_COMPRESS_LEVEL'] = 6
+# Де лежать байти файлів (див. storage.py): 'local' — UPLOAD_FOLDER з розкладкою
+# ab/cd/<sha256> на FILE_STORAGE_SHARD_DEPTH рівнів, 's3' — S3-сумісне сховище.
+# Перехід між ними — `flask storage-transfer`
+app.config['FILE_STORAGE_BACKEND'] = os.environ.get('FILE_STORAGE_BACKEND', 'local')
+app.config['FILE_STORAGE_SHARD_DEPTH'] = 2
+app.config['S3_ENDPOINT'] = os.environ.get('S3_ENDPOINT', 'https://s3.amazonaws.com')
+app.config['S3_REGION'] = os.environ.get('S3_REGION', 'us-east-1')
+app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET', '')
+app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+app.config['S3_ACCESS_KEY'] = os.environ.get('S3_ACCESS_KEY', '')
+app.config['S3_SECRET_KEY'] = os.environ.get('S3_SECRET_KEY', '')
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Ініціалізація розширень
 db.init_app(app)
 mail.init_app(app)
+user_cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'],
+                     app.config['USER_CACHE_STAMP'])
+history_store.state_cache.configure(app.config['HISTORY_CACHE_SIZE'])
 
 # -----------------------
 # Обробка помилок
@@ -47,9 +152,33 @@ mail.init_app(app)
 @app.errorhandler(413)
 def request_entity_too_large(error):
     """Обробка помилки, коли файли занадто великі."""
-    flash("Загальний розмір файлів занадто великий! Спробуйте завантажити менше файлів.", "danger")
+    if request.endpoint and request.endpoint.startswith("upload_session_"):
+        # Клієнт завантаження частинами чекає код відповіді, а не переадресацію
+        return error
+    if isinstance(error, FileTooLarge):
+        limit = app.config['MAX_FILE_SIZE'] // (1024 * 1024)
+        flash(f"Один із файлів більший за {limit} МБ! Зменшіть його або розділіть на частини.", "danger")
+    else:
+        flash("Загальний розмір файлів занадто великий! Спробуйте завантажити менше файлів.", "danger")
     return redirect(url_for('my_applications'))
 
+
+@app.errorhandler(PasswordHashBusy)
+def password_hash_busy(error):
+    """Черга хешування паролів переповнена — просимо повторити пізніше."""
+    flash("Сервер зараз перевантажений. Спробуйте ще раз за кілька секунд.", "warning")
+    return render_template("index.html"), 503, {"Retry-After": "5"}
+
+
+@app.errorhandler(EditConflict)
+@app.errorhandler(StaleDataError)
+def edit_conflict(error):
+    """Заявку змінили між читанням і записом (див. Application.version) — нічого не записано."""
+    db.session.rollback()
+    flash("Заявку щойно змінив інший користувач. Ваші зміни не збережено — "
+          "перегляньте актуальну версію і повторіть дію.", "warning")
+    return render_template("conflict.html", application_id=(request.view_args or {}).get("application_id")), 409
+
 # -----------------------
 # Реєстрація маршрутів
 # -----------------------
@@ -57,6 +186,7 @@ auth_routes.register_routes(app)
 application_routes.register_routes(app)
 expert_routes.register_routes(app)
 admin_routes.register_routes(app)
+upload_routes.register_routes(app)
 
 
 # -----------------------
@@ -65,6 +195,10 @@ admin_routes.register_routes(app)
 @app.before_request
 def load_logged_in_user():
     g.user = get_current_user()
+    # Заблокований користувач втрачає сесію з першого ж запиту після блокування
+    if g.user is not None and g.user.is_blocked:
+        session.clear()
+        g.user = None
 
 
 # -----------------------
@@ -76,9 +210,191 @@ def init_db_command():
     from models import User, PasswordResetToken, Application, ApplicationFile
     with app.app_context():
         db.create_all()
+        # ...і не додає нові стовпці до вже існуючих таблиць — додаємо відсутні
+        existing = {table: {c["name"] for c in db.inspect(db.engine).get_columns(table)}
+                    for table in db.metadata.tables}
+        with db.engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                for column in table.columns:
+                    if column.name not in existing[table.name]:
+                        default = f" DEFAULT {column.server_default.arg}" if column.server_default else ""
+                        connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                                                   f"{column.type.compile(db.engine.dialect)}{default}")
+                        print(f"Додано стовпець {table.name}.{column.name}.")
+            import review_queue
+            review_queue.backfill(connection)
+        # create_all не додає індекси до вже існуючих таблиць — створюємо відсутні
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # Повнотекстовий індекс для бази, створеної до появи пошуку
+        import search
+        with db.engine.begin() as connection:
+            if search.ensure_index(connection):
+                print("Створено пошуковий індекс заявок.")
+        # Для вже наповненої бази лічильники статистики заповнюються з даних
+        import counters
+        counters.rebuild()
     print("Базу даних ініціалізовано.")
 
 
+@app.cli.command("rebuild-counters")
+@click.option("--verify", "verify_only", is_flag=True, help="Лише звірити лічильники, нічого не змінюючи.")
+def rebuild_counters_command(verify_only):
+    import counters
+    with app.app_context():
+        if verify_only:
+            mismatches = counters.verify()
+            for name, (stored, actual) in mismatches.items():
+                print(f"{name}: збережено {stored}, фактично {actual}")
+            if mismatches:
+                raise SystemExit(1)
+            print("Лічильники збігаються з даними.")
+            return
+        fixed = counters.rebuild()
+    print(f"Лічильники перераховано (виправлено: {len(fixed)}).")
+
+
+@app.cli.command("analytics-rollup")
+@click.option("--loop", is_flag=True, help="Працювати постійно, перевіряючи нову історію кожні ANALYTICS_INTERVAL сек.")
+def analytics_rollup_command(loop):
+    import time
+    import analytics
+    with app.app_context():
+        while True:
+            processed = analytics.run()
+            print(f"Оброблено подій історії: {processed}")
+            if not loop:
+                return
+            time.sleep(app.config['ANALYTICS_INTERVAL'])
+
+
+@app.cli.command("minhash-backfill")
+@click.option("--workers", type=int, default=4, help="Кількість процесів для обчислення підписів.")
+@click.option("--batch-size", type=int, default=2000, help="Скільки заявок читати з БД за раз.")
+def minhash_backfill_command(workers, batch_size):
+    import duplicates
+    with app.app_context():
+        total = duplicates.backfill(workers=workers, batch_size=batch_size,
+                                    progress=lambda done: print(f"  ... {done}"))
+    print(f"Підписи MinHash перераховано для {total} заявок.")
+
+
+@app.cli.command("similar-compact")
+@click.option("--loop", is_flag=True, help="Перебудовувати індекс кожні SIMILAR_COMPACT_INTERVAL сек.")
+def similar_compact_command(loop):
+    import time
+    import similar
+    with app.app_context():
+        while True:
+            docs, hwm = similar.compact()
+            print(f"Індекс схожих заявок перебудовано: {docs} заявок (історія до №{hwm}).")
+            if not loop:
+                return
+            time.sleep(app.config['SIMILAR_COMPACT_INTERVAL'])
+
+
+@app.cli.command("compress-history")
+@click.option("--batch-size", type=int, default=500, help="Скільки заявок конвертувати за одну транзакцію.")
+@click.option("--vacuum", is_flag=True, help="Після конвертації стиснути файл бази (VACUUM).")
+def compress_history_command(batch_size, vacuum):
+    with app.app_context():
+        converted, before, after = history_store.compress_existing(
+            batch_size=batch_size, progress=lambda done: print(f"  ... {done}"))
+        if vacuum:
+            # VACUUM не працює всередині транзакції
+            with db.engine.connect() as connection:
+                connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    saved = before - after
+    percent = f" ({saved * 100 / before:.0f}%)" if before else ""
+    print(f"Стиснуто подій історії: {converted}. Знімки займали {before} байт, тепер {after}; "
+          f"звільнено {saved} байт{percent}.")
+
+
+@app.cli.command("storage-migrate")
+@click.option("--batch-size", type=int, default=200, help="Скільки файлів переносити за одну транзакцію.")
+def storage_migrate_command(batch_size):
+    import file_store
+    with app.app_context():
+        migrated, missing = file_store.migrate_legacy(batch_size=batch_size,
+                                                      progress=lambda done: print(f"  ... {done}"))
+    print(f"Перенесено у сховище файлів: {migrated}. Не знайдено на диску: {missing}.")
+
+
+@app.cli.command("storage-report")
+def storage_report_command():
+    import file_store
+    with app.app_context():
+        report = file_store.report()
+        legacy = file_store.legacy_count()
+    print(f"Файлів у заявках: {report['files']}, унікальних вмістів: {report['blobs']}.")
+    print(f"Прикріплено {report['logical_bytes']} байт, на диску {report['physical_bytes']} байт; "
+          f"дедуплікація {report['ratio']:.2f}x, заощаджено {report['saved_bytes']} байт.")
+    if legacy:
+        print(f"Файлів поза сховищем (до `flask storage-migrate`): {legacy}.")
+
+
+@app.cli.command("storage-transfer")
+@click.argument("source", type=click.Choice(["flat", "local", "s3"]))
+@click.argument("target", type=click.Choice(["local", "s3"]))
+@click.option("--workers", type=int, default=8, help="Скільки файлів переносити одночасно.")
+@click.option("--batch-size", type=int, default=1000, help="Скільки ключів читати з БД за раз.")
+@click.option("--keep-source", is_flag=True, help="Копіювати, не видаляючи з джерела.")
+def storage_transfer_command(source, target, workers, batch_size, keep_source):
+    """Переносить вміст сховища між бекендами: flat → local розкладає плоский UPLOAD_FOLDER по каталогах."""
+    import storage
+    from models import FileBlob
+    if source == target:
+        raise click.UsageError("Джерело і ціль збігаються.")
+    with app.app_context():
+        source_backend = storage.create(source, app.config)
+        target_backend = storage.create(target, app.config)
+        tmp_dir = os.path.join(app.config['UPLOAD_FOLDER'], ".tmp")
+        totals, last = [0, 0, 0], ""
+        while True:
+            keys = db.session.scalars(db.select(FileBlob.sha256).where(FileBlob.sha256 > last)
+                                      .order_by(FileBlob.sha256).limit(batch_size)).all()
+            if not keys:
+                break
+            result = storage.transfer(keys, source_backend, target_backend, tmp_dir,
+                                      workers=workers, move=not keep_source)
+            totals = [a + b for a, b in zip(totals, result)]
+            last = keys[-1]
+            print(f"  ... {sum(totals)}")
+    moved, skipped, missing = totals
+    print(f"Перенесено: {moved}. Уже були в цілі: {skipped}. Не знайдено в джерелі: {missing}.")
+
+
+@app.cli.command("uploads-expire")
+@click.option("--ttl", type=int, default=None, help="Вік у секундах (за замовчуванням UPLOAD_SESSION_TTL).")
+def uploads_expire_command(ttl):
+    import resumable
+    with app.app_context():
+        removed = resumable.expire(ttl)
+    print(f"Видалено незавершених завантажень: {removed}.")
+
+
+@app.cli.command("mail-worker")
+@click.option("--workers", type=int, default=None, help="Кількість потоків-відправників.")
+@click.option("--once", is_flag=True, help="Відправити все, що готово, і завершитись.")
+def mail_worker_command(workers, once):
+    from mail_queue import MailWorkerPool
+    pool = MailWorkerPool(app, workers=workers)
+    if once:
+        sent = pool.drain()
+        print(f"Оброблено листів: {sent}")
+        return
+
+    pool.start()
+    print(f"Воркери пошти запущено ({pool.workers}). Ctrl+C для зупинки.")
+    try:
+        while True:
+            pool._stop.wait(1)
+    except KeyboardInterrupt:
+        pool.stop()
+        print("Воркери пошти зупинено.")
+
+
 @app.cli.command("create-expert")
 def create_expert_command():
     from models import User
@@ -1,25 +1,25 @@
-import os
 from flask import (
-    render_template, request, redirect, url_for, flash, g, send_from_directory, abort
+    render_template, request, redirect, url_for, flash, g, abort, Response
 )
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm import selectinload
 from extensions import db
 from models import Application, ApplicationFile
-from helpers import login_required, save_history
+from helpers import login_required, save_history, check_version
+from pagination import paginate_request
+from loaders import DETAIL_OPTIONS, count_files, history_page
+import review_queue
+import file_store
+import zip_stream
 
 
 def register_routes(app):
     @app.route("/applications")
     @login_required
     def my_applications():
-        # Новий синтаксис Select
-        stmt = (
-            db.select(Application)
-            .filter_by(owner_id=g.user.id)
-            .order_by(Application.created_at.desc())
-        )
-        apps = db.session.execute(stmt).scalars().all()
-        return render_template("applications_list.html", applications=apps)
+        # Курсорна пагінація по індексу (owner_id, created_at)
+        stmt = db.select(Application).filter_by(owner_id=g.user.id)
+        page = paginate_request(stmt, [Application.created_at, Application.id], descending=True)
+        return render_template("applications_list.html", applications=page, page=page)
 
     @app.route("/applications/new", methods=["GET", "POST"])
     @login_required
@@ -46,26 +46,28 @@ def register_routes(app):
                 return render_template("application_form.html", mode="create", application=None, title_value=title,
                                        description_value=short_description)
 
-            app_obj = Application(
-                title=title,
-                short_description=short_description,
-                owner_id=g.user.id,
-                status="draft"
-            )
-            db.session.add(app_obj)
-            db.session.flush()
+            # Файли — у сховище до першого flush: мережевий бекенд отримує їх,
+            # поки транзакція ще не тримає блокування запису БД
+            prepared = file_store.prepare(valid_files)
+            try:
+                app_obj = Application(
+                    title=title,
+                    short_description=short_description,
+                    owner_id=g.user.id,
+                    status="draft"
+                )
+                db.session.add(app_obj)
+                db.session.flush()
 
-            for file in valid_files:
-                original_filename = secure_filename(file.filename)
-                unique_filename = f"app_{app_obj.id}_{original_filename}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-                new_file = ApplicationFile(filename=unique_filename, application_id=app_obj.id)
-                db.session.add(new_file)
+                for item in prepared:
+                    file_store.attach(app_obj.id, item)
 
-            # --- ІСТОРІЯ: Створено ---
-            save_history(app_obj, g.user, "created")
+                # --- ІСТОРІЯ: Створено ---
+                save_history(app_obj, g.user, "created")
 
-            db.session.commit()
+                db.session.commit()
+            finally:
+                file_store.discard(prepared)
 
             flash("Заявку успішно створено.", "success")
             for msg in messages: flash(msg, "warning")
@@ -77,19 +79,29 @@ def register_routes(app):
     @app.route("/applications/<int:application_id>")
     @login_required
     def view_application(application_id):
-        # ВИПРАВЛЕНО: db.get_or_404
-        app_obj = db.get_or_404(Application, application_id)
+        app_obj = db.get_or_404(Application, application_id, options=DETAIL_OPTIONS)
 
         if app_obj.owner_id != g.user.id and g.user.role not in ('expert', 'admin', 'super_admin'):
             flash("Ви не маєте доступу до цієї заявки.", "danger")
             return redirect(url_for("my_applications"))
-        return render_template("application_detail.html", application=app_obj)
+        return render_template("application_detail.html", application=app_obj, history=history_page(app_obj.id))
+
+    @app.route("/applications/<int:application_id>/history")
+    @login_required
+    def application_history(application_id):
+        """Фрагмент зі старішими подіями історії (кнопка "Показати старіші")."""
+        app_obj = db.get_or_404(Application, application_id)
+        if app_obj.owner_id != g.user.id and g.user.role not in ('expert', 'admin', 'super_admin'):
+            abort(403)
+        return render_template("_history_events.html", application_id=application_id,
+                               history=history_page(application_id, after=request.args.get("after")))
 
     @app.route("/applications/<int:application_id>/edit", methods=["GET", "POST"])
     @login_required
     def edit_application(application_id):
-        # ВИПРАВЛЕНО: db.get_or_404
-        app_obj = db.get_or_404(Application, application_id)
+        # Форма показує файли та історію; POST рахує файли окремим count()
+        options = DETAIL_OPTIONS if request.method == "GET" else ()
+        app_obj = db.get_or_404(Application, application_id, options=options)
 
         if app_obj.owner_id != g.user.id:
             flash("Ви не можете редагувати цю заявку.", "danger")
@@ -99,18 +111,19 @@ def register_routes(app):
             return redirect(url_for("view_application", application_id=application_id))
 
         if request.method == "POST":
+            check_version(app_obj)
             title = (request.form.get("title") or "").strip()
             short_description = (request.form.get("short_description") or "").strip()
 
             if not title:
                 flash("Назва є обов'язковою.", "danger")
                 return render_template("application_form.html", mode="edit", application=app_obj, title_value=title,
-                                       description_value=short_description)
+                                       description_value=short_description, history=history_page(app_obj.id))
 
             new_files = request.files.getlist('files')
             valid_new_files = [f for f in new_files if f and f.filename and f.filename.strip() != ""]
 
-            current_count = len(app_obj.files)
+            current_count = count_files(app_obj.id)
             available_slots = 10 - current_count
             messages = []
 
@@ -118,26 +131,29 @@ def register_routes(app):
                 valid_new_files = valid_new_files[:available_slots]
                 messages.append(f"⚠️ Ліміт перевищено. Додано лише {available_slots} файлів.")
 
-            app_obj.title = title
-            app_obj.short_description = short_description
+            # Файли — у сховище до першого flush (див. create_application)
+            prepared = file_store.prepare(valid_new_files)
+            try:
+                app_obj.title = title
+                app_obj.short_description = short_description
+                # UPDATE з перевіркою версії — до того, як файли отримають посилання
+                db.session.flush()
 
-            for file in valid_new_files:
-                original_filename = secure_filename(file.filename)
-                unique_filename = f"app_{app_obj.id}_{original_filename}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-                new_file_record = ApplicationFile(filename=unique_filename, application_id=app_obj.id)
-                db.session.add(new_file_record)
+                for item in prepared:
+                    file_store.attach(app_obj.id, item)
 
-            # --- ІСТОРІЯ: Відредаговано ---
-            save_history(app_obj, g.user, "edited")
+                # --- ІСТОРІЯ: Відредаговано ---
+                save_history(app_obj, g.user, "edited")
 
-            db.session.commit()
+                db.session.commit()
+            finally:
+                file_store.discard(prepared)
             flash("Заявку оновлено.", "success")
             for msg in messages: flash(msg, "warning")
             return redirect(url_for("view_application", application_id=application_id))
 
         return render_template("application_form.html", mode="edit", application=app_obj, title_value=app_obj.title,
-                               description_value=app_obj.short_description)
+                               description_value=app_obj.short_description, history=history_page(app_obj.id))
 
     @app.route("/applications/<int:application_id>/submit", methods=["POST"])
     @login_required
@@ -151,8 +167,10 @@ def register_routes(app):
         if app_obj.status not in ("draft", "needs_changes"):
             flash("Подати можна лише чернетку.", "warning")
             return redirect(url_for("view_application", application_id=application_id))
+        check_version(app_obj)
 
         app_obj.status = "submitted"
+        review_queue.enqueue(app_obj)
 
         # --- ІСТОРІЯ: Подано на розгляд ---
         save_history(app_obj, g.user, "status_change")
@@ -173,6 +191,7 @@ def register_routes(app):
         if app_obj.status not in ("submitted",):
             flash("Цю заявку неможливо скасувати.", "warning")
             return redirect(url_for("view_application", application_id=application_id))
+        check_version(app_obj)
 
         app_obj.status = "cancelled"
 
@@ -194,20 +213,62 @@ def register_routes(app):
             flash("Ви не маєте права видаляти цей файл.", "danger")
             return redirect(url_for("my_applications"))
 
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], file_record.filename)
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                print(f"Error deleting file: {e}")
-
-        db.session.delete(file_record)
+        # Байти видаляються лише разом з останнім посиланням на цей вміст
+        orphan = file_store.detach(file_record)
         db.session.commit()
+        file_store.release(orphan)
         flash("Файл видалено.", "success")
         return redirect(url_for("edit_application", application_id=app_obj.id))
 
+    @app.route("/files/<int:file_id>")
+    @login_required
+    def download_application_file(file_id):
+        file_record = db.get_or_404(ApplicationFile, file_id)
+        app_obj = file_record.application
+        if app_obj.owner_id != g.user.id and g.user.role not in ('expert', 'admin', 'super_admin'):
+            abort(403)
+        if not file_store.exists(file_record):
+            return abort(404)
+        # Права перевірено — лише тепер байти (чи заголовок для проксі)
+        return file_store.send(file_record)
+
+    @app.route("/applications/<int:application_id>/files.zip")
+    @login_required
+    def download_application_files_zip(application_id):
+        """Усі файли заявки одним ZIP-архівом, що генерується під час відправлення."""
+        app_obj = db.get_or_404(Application, application_id)
+        if app_obj.owner_id != g.user.id and g.user.role not in ('expert', 'admin', 'super_admin'):
+            abort(403)
+        files = db.session.execute(
+            db.select(ApplicationFile).filter_by(application_id=application_id)
+            .options(selectinload(ApplicationFile.blob)).order_by(ApplicationFile.id)
+        ).scalars().all()
+        # Усе з БД — до першого байта відповіді: генератор читає лише сховище
+        entries = zip_stream.entries_for(files)
+        if not entries:
+            abort(404)
+        return Response(zip_stream.stream(entries), mimetype="application/zip", headers={
+            "Content-Disposition": f'attachment; filename="application-{application_id}.zip"',
+            "Cache-Control": "private, no-store",
+        })
+
+    # Посилання на файли, збережені до появи сховища (app_<id>_<ім'я>).
+    # Лише на такі: вміст сховища за хешем звідси не віддається
     @app.route("/uploads/<filename>")
+    @login_required
     def download_file(filename):
-        if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+        prefix, _, rest = filename.partition("_")
+        application_id, _, _ = rest.partition("_")
+        if prefix != "app" or not application_id.isdigit():
+            return abort(404)
+        file_record = db.session.scalar(db.select(ApplicationFile).filter_by(
+            application_id=int(application_id), filename=filename, blob_sha256=None))
+        if file_record is None:
+            return abort(404)
+        app_obj = file_record.application
+        if app_obj.owner_id != g.user.id and g.user.role not in ('expert', 'admin', 'super_admin'):
+            abort(403)
+        # Наявність на диску — лише після перевірки прав, щоб не підказувати чужим
+        if not file_store.exists(file_record):
             return abort(404)
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
\ No newline at end of file
+        return file_store.send(file_record)
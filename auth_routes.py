@@ -14,6 +14,9 @@ from email_validator import validate_email, EmailNotValidError
 from extensions import db
 from models import User, PasswordResetToken
 from helpers import login_required, send_password_reset_email
+from user_cache import user_cache
+from email_checks import deliverability
+from rate_limit import rate_limiter
 
 
 def register_routes(app):
@@ -37,8 +40,10 @@ def register_routes(app):
             normalized_email = email  # За замовчуванням залишаємо те, що ввів юзер
 
             try:
-                valid = validate_email(email)
+                # Синтаксис — локально, DNS-перевірка домену — через кеш (email_checks.py)
+                valid = validate_email(email, check_deliverability=False)
                 normalized_email = valid.email
+                deliverability.check(normalized_email.rsplit("@", 1)[-1])
             except EmailNotValidError as e:
                 msg = str(e)
                 # Переклад специфічної помилки домену
@@ -112,9 +117,18 @@ def register_routes(app):
             email = (request.form.get("email") or "").strip()
             password = request.form.get("password") or ""
 
+            # Обмеження частоти — до будь-якого хешування та запитів до БД
+            wait = rate_limiter.check("login", ip=request.remote_addr, email=email)
+            if wait:
+                flash(f"Забагато спроб входу. Спробуйте ще раз через {wait} с.", "danger")
+                return render_template("login.html", email=email), 429, {"Retry-After": str(wait)}
+
             user = User.query.filter_by(email=email).first()
 
             if user and user.check_password(password):
+                # Хеш міг бути перерахований за новою політикою
+                db.session.commit()
+
                 # ПЕРЕВІРКА БЛОКУВАННЯ
                 if user.is_blocked:
                     flash("Ваш акаунт заблоковано адміністратором.", "danger")
@@ -145,7 +159,8 @@ def register_routes(app):
     @app.route("/profile")
     @login_required
     def profile():
-        return render_template("profile.html", user=g.user)
+        user = db.session.get(User, g.user.id)
+        return render_template("profile.html", user=user)
 
     @app.route("/password/reset/request", methods=["GET", "POST"])
     def request_password_reset():
@@ -156,6 +171,11 @@ def register_routes(app):
                 flash("Введіть e-mail.", "danger")
                 return render_template("request_password_reset.html")
 
+            wait = rate_limiter.check("reset", ip=request.remote_addr, email=email)
+            if wait:
+                flash(f"Забагато запитів на відновлення. Спробуйте ще раз через {wait} с.", "danger")
+                return render_template("request_password_reset.html"), 429, {"Retry-After": str(wait)}
+
             user = User.query.filter_by(email=email).first()
 
             if not user:
@@ -172,10 +192,10 @@ def register_routes(app):
                 user=user,
             )
             db.session.add(reset_token)
-            db.session.commit()
 
             reset_link = url_for("reset_password", token=token_value, _external=True)
             send_password_reset_email(user.email, reset_link)
+            db.session.commit()
 
             flash(
                 "Якщо користувач з таким e-mail існує, на нього надіслано посилання.",
@@ -212,6 +232,7 @@ def register_routes(app):
             user.set_password(new_password)
             reset_token.used = True
             db.session.commit()
+            user_cache.invalidate(user.id)
 
             flash("Пароль успішно змінено. Тепер увійдіть у систему.", "success")
             return redirect(url_for("login"))
@@ -230,7 +251,9 @@ def register_routes(app):
             # 1. Збираємо результати перевірок
             is_length_bad = len(new_password) < 8
             is_mismatch = new_password != confirm_password
-            is_old_wrong = not g.user.check_password(current_password)
+            # g.user — лише кешований запис, пароль перевіряємо на моделі
+            user = db.session.get(User, g.user.id)
+            is_old_wrong = not user.check_password(current_password)
 
             # 2. Формуємо список повідомлень за ПРІОРИТЕТОМ
             error_messages = []
@@ -258,8 +281,9 @@ def register_routes(app):
                 return render_template("change_password.html")
 
             # Успіх
-            g.user.set_password(new_password)
+            user.set_password(new_password)
             db.session.commit()
+            user_cache.invalidate(user.id)
 
             flash("Пароль успішно змінено.", "success")
             return redirect(url_for("profile"))
@@ -0,0 +1,86 @@
+"""Інкрементальний rollup історії та рендер /admin/analytics.
+
+    python benchmarks/bench_analytics.py --applications 20000
+
+Кожна заявка: подання і рішення експерта через випадковий (логнормальний) час.
+Для порівняння — два GROUP BY по всій історії, які сторінка робила б без агрегатів.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from sqlalchemy import text  # noqa: E402
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+import analytics  # noqa: E402
+
+
+def populate(count):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    users = [{"id": i, "email": f"u{i}@test.com", "password_hash": "x", "role": "expert" if i <= 10 else "applicant"}
+             for i in range(1, 111)]
+    db.session.execute(text("INSERT INTO users (id, email, password_hash, role) "
+                            "VALUES (:id, :email, :password_hash, :role)"), users)
+    apps, history = [], []
+    for app_id in range(1, count + 1):
+        submitted = now - timedelta(days=random.uniform(0, 30))
+        apps.append({"id": app_id, "owner": random.randint(11, 110), "created": submitted})
+        history.append((app_id, apps[-1]["owner"], "submitted", submitted))
+        decided = min(now, submitted + timedelta(hours=random.lognormvariate(3, 1)))
+        history.append((app_id, random.randint(1, 10), random.choice(["approved", "rejected", "needs_changes"]), decided))
+    db.session.execute(text("INSERT INTO applications (id, title, short_description, status, owner_id, created_at) "
+                            "VALUES (:id, 'Т', 'Опис', 'approved', :owner, :created)"), apps)
+    history.sort(key=lambda row: row[3])
+    db.session.execute(text("INSERT INTO application_history (application_id, changed_by_id, event_type, "
+                            "snapshot_status, created_at) VALUES (:a, :u, 'status_change', :s, :t)"),
+                       [{"a": a, "u": u, "s": s, "t": t} for a, u, s, t in history])
+    db.session.commit()
+    return len(history)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--applications", type=int, default=20000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        events = populate(args.applications)
+
+        started = time.perf_counter()
+        analytics.run()
+        rollup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        analytics.run()
+        idle = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(20):
+            analytics.report(30)
+        report_ms = (time.perf_counter() - started) / 20 * 1000
+
+        started = time.perf_counter()
+        db.session.execute(text("SELECT date(created_at), count(*) FROM application_history "
+                                "WHERE snapshot_status = 'submitted' GROUP BY 1")).all()
+        db.session.execute(text("SELECT changed_by_id, count(*) FROM application_history "
+                                "WHERE snapshot_status IN ('approved', 'rejected', 'needs_changes') GROUP BY 1")).all()
+        naive_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Подій історії: {events}")
+    print(f"Перший rollup: {rollup * 1000:.0f} мс ({events / rollup:.0f} подій/с)")
+    print(f"Повторний rollup без нових подій: {idle * 1000:.2f} мс")
+    print(f"Дані сторінки з агрегатів: {report_ms:.2f} мс")
+    print(f"Лише два GROUP BY по всій історії (без перцентилів): {naive_ms:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""MinHash/LSH: паралельне заповнення і пошук дублікатів для сторінки розгляду.
+
+    python benchmarks/bench_duplicates.py --applications 50000 --workers 4
+
+Заявки генеруються зі словника seed.py (тож дублікатів багато). Пошук через
+кошики LSH порівнюється з повним перебором усіх підписів.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Application, ApplicationMinHash  # noqa: E402
+import duplicates  # noqa: E402
+from seed import generate_title  # noqa: E402
+
+WORDS = "система пристрій спосіб виготовлення матеріал обробка даних мережа сигнал датчик керування".split()
+
+
+def populate(count):
+    rows = [{"id": i, "title": generate_title(), "description": " ".join(random.choices(WORDS, k=20))}
+            for i in range(1, count + 1)]
+    db.session.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'o@test.com', 'x')"))
+    db.session.execute(text(
+        "INSERT INTO applications (id, title, short_description, status, owner_id) "
+        "VALUES (:id, :title, :description, 'submitted', 1)"
+    ), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--applications", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        populate(args.applications)
+
+        for workers in sorted({1, args.workers}):
+            started = time.perf_counter()
+            duplicates.backfill(workers=workers)
+            print(f"Заповнення, {workers} проц.: {time.perf_counter() - started:.1f} с")
+
+        sample = random.sample(range(1, args.applications + 1), args.queries)
+        started = time.perf_counter()
+        for app_id in sample:
+            duplicates.likely_duplicates(db.session.get(Application, app_id))
+        lsh_ms = (time.perf_counter() - started) / args.queries * 1000
+
+        started = time.perf_counter()
+        for app_id in sample[:5]:
+            rows = db.session.execute(select(ApplicationMinHash.signature)).scalars().all()
+            matrix = np.frombuffer(b"".join(rows), dtype=np.uint32).reshape(len(rows), duplicates.NUM_PERM)
+            duplicates.similarity(matrix[app_id - 1], matrix)
+        brute_ms = (time.perf_counter() - started) / 5 * 1000
+        started = time.perf_counter()
+        for app_id in sample:
+            duplicates.similarity(matrix[app_id - 1], matrix)
+        memory_ms = (time.perf_counter() - started) / args.queries * 1000
+
+    print(f"Пошук через LSH (разом із запитами до БД): {lsh_ms:.2f} мс")
+    print(f"Повний перебір {args.applications} підписів з читанням з БД: {brute_ms:.2f} мс")
+    print(f"  з них лише порівняння в пам'яті (numpy): {memory_ms:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
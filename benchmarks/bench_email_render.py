@@ -0,0 +1,45 @@
+"""Мікробенчмарк рендеру листів про зміну статусу.
+
+    python benchmarks/bench_email_render.py --count 500
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import app  # noqa: E402
+from email_templates import get_template, render_status_updates  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    args = parser.parse_args()
+
+    owner = SimpleNamespace(email="owner@test.com")
+    applications = [
+        SimpleNamespace(id=i, title=f"Заявка <{i}>", short_description="Опис " * 80,
+                        status="needs_changes", expert_comment="Додайте креслення.", owner=owner)
+        for i in range(args.count)
+    ]
+
+    with app.test_request_context():
+        started = time.perf_counter()
+        get_template("status_update.html")
+        get_template("status_update.txt")
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        render_status_updates(applications)
+        elapsed = time.perf_counter() - started
+
+    print(f"Завантаження + інлайн CSS + компіляція (один раз): {compile_ms:.2f} мс")
+    print(f"Рендер {args.count} листів: {elapsed * 1000:.1f} мс, "
+          f"{elapsed / args.count * 1e6:.1f} мкс на лист (HTML + текст)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Стиснута історія заявок: місце в базі та час відновлення стрічки подій.
+
+    python benchmarks/bench_history_store.py --applications 2000 --events 30
+
+Кожна заявка має довгий опис, який --events разів трохи правиться (вставка
+речення, правка слова, коментар експерта). Історія спершу записується
+старим способом — повні копії полів, — потім конвертується
+`history_store.compress_existing`. Виводиться розмір знімків до і після,
+розмір файлу бази до і після VACUUM, а також час відновлення всієї стрічки
+однієї заявки з холодним і з теплим кешем.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.TemporaryDirectory()
+_db_path = os.path.join(_tmp.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+from sqlalchemy import select, text  # noqa: E402
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import ApplicationHistory  # noqa: E402
+import history_store  # noqa: E402
+
+WORDS = ("система навчання студент алгоритм вправа рівень прогрес модуль аналіз дані модель "
+         "результат оцінка курс викладач платформа завдання тест звіт метод").split()
+
+
+def sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + ". "
+
+
+def populate(count, events, rng):
+    db.session.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'o@test.com', 'x')"))
+    for app_id in range(1, count + 1):
+        description = "".join(sentence(rng) for _ in range(rng.randint(20, 60)))
+        title, comment = f"Заявка {app_id}", None
+        rows = []
+        for i in range(events):
+            if i:
+                position = rng.randrange(len(description))
+                description = description[:position] + sentence(rng) + description[position + rng.randint(0, 30):]
+                comment = sentence(rng) if rng.random() < 0.3 else comment
+            rows.append({"a": app_id, "t": title, "d": description, "c": comment})
+        db.session.execute(text(
+            "INSERT INTO applications (id, title, short_description, status, owner_id, created_at) "
+            "VALUES (:id, :t, :d, 'submitted', 1, datetime('now'))"), {"id": app_id, "t": title, "d": description})
+        db.session.execute(text(
+            "INSERT INTO application_history (application_id, changed_by_id, event_type, snapshot_title, "
+            "snapshot_description, snapshot_status, snapshot_comment, created_at) "
+            "VALUES (:a, 1, 'edited', :t, :d, 'submitted', :c, datetime('now'))"), rows)
+    db.session.commit()
+
+
+def timeline(app_id):
+    events = db.session.execute(
+        select(ApplicationHistory).where(ApplicationHistory.application_id == app_id)
+        .order_by(ApplicationHistory.id.desc())
+    ).scalars().all()
+    started = time.perf_counter()
+    for event in events:
+        event.snapshot_description, event.snapshot_comment
+    return time.perf_counter() - started
+
+
+def vacuum():
+    with db.engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    return os.path.getsize(_db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--applications", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=30)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with app.app_context():
+        db.create_all()
+        # Пошуковий індекс тут не потрібен, а вставку сповільнює
+        for trigger in ("ai", "ad", "au"):
+            db.session.execute(text(f"DROP TRIGGER IF EXISTS applications_fts_{trigger}"))
+        populate(args.applications, args.events, rng)
+        file_before = vacuum()
+        legacy = timeline(1)
+
+        started = time.perf_counter()
+        converted, before, after = history_store.compress_existing()
+        elapsed = time.perf_counter() - started
+        file_after = vacuum()
+
+        history_store.state_cache.clear()
+        db.session.expunge_all()
+        cold = timeline(1)
+        db.session.expunge_all()
+        warm = timeline(1)
+
+    print(f"подій: {converted}, конвертація {elapsed:.1f} с ({converted / elapsed:.0f} подій/с)")
+    print(f"знімки: {before / 2**20:.1f} МБ -> {after / 2**20:.2f} МБ (у {before / after:.0f} разів менше)")
+    print(f"файл бази: {file_before / 2**20:.1f} МБ -> {file_after / 2**20:.1f} МБ")
+    print(f"стрічка з {args.events} подій: старий формат {legacy * 1000:.2f} мс, "
+          f"холодний кеш {cold * 1000:.2f} мс, теплий {warm * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
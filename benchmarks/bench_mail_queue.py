@@ -0,0 +1,58 @@
+"""Пропускна здатність черги листів проти локальної SMTP-заглушки.
+
+    python benchmarks/bench_mail_queue.py --messages 500 --workers 4 --connect-delay 0.2
+
+`--connect-delay` імітує TCP + STARTTLS + AUTH реального сервера.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Окрема тимчасова БД, щоб не чіпати робочу app.db
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from app import app  # noqa: E402
+from extensions import db, mail  # noqa: E402
+from mail_queue import MailWorkerPool, enqueue_email  # noqa: E402
+from models import OutboxEmail  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--connect-delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with SMTPSink(connect_delay=args.connect_delay, keep_messages=False) as sink:
+        app.extensions["mail"] = mail.init_mail({**app.config, **sink.mail_config()})
+        with app.app_context():
+            db.create_all()
+            for i in range(args.messages):
+                enqueue_email(f"Bench {i}", [f"user{i}@test.com"], "Текст листа")
+            db.session.commit()
+
+        pool = MailWorkerPool(app, workers=args.workers, batch_size=args.batch_size, poll_interval=0.05)
+        started = time.perf_counter()
+        pool.start()
+        while sink.received < args.messages:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        pool.stop()
+
+        with app.app_context():
+            sent = OutboxEmail.query.filter_by(status="sent").count()
+
+    print(f"Листів: {sink.received} (sent у БД: {sent}), з'єднань: {sink.connections}")
+    print(f"Час: {elapsed:.2f} c, {sink.received / elapsed:.1f} листів/с")
+    print(f"Для порівняння, з'єднання на кожен лист: ~{1 / max(args.connect_delay, 1e-9):.1f} листів/с на потік")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Листів за секунду: `mail.send` на кожен лист проти пачок `MailTransport`.
+
+    python benchmarks/bench_mail_transport.py --messages 200 --connect-delay 0.05
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask_mail import Message  # noqa: E402
+from app import app  # noqa: E402
+from extensions import mail  # noqa: E402
+from mail_transport import MailTransport  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+
+def _messages(n):
+    return [Message(f"Bench {i}", recipients=[f"user{i}@test.com"], body="Текст листа") for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with SMTPSink(connect_delay=args.connect_delay, keep_messages=False) as sink, app.app_context():
+        app.extensions["mail"] = mail.init_mail({**app.config, **sink.mail_config()})
+
+        started = time.perf_counter()
+        for msg in _messages(args.messages):
+            mail.send(msg)
+        single = time.perf_counter() - started
+        single_conns = sink.connections
+
+        started = time.perf_counter()
+        with MailTransport(batch_size=args.batch_size) as transport:
+            transport.send_many(_messages(args.messages))
+        batched = time.perf_counter() - started
+
+    print(f"mail.send:     {args.messages / single:8.1f} листів/с ({single_conns} з'єднань)")
+    print(f"MailTransport: {args.messages / batched:8.1f} листів/с ({transport.connections_opened} з'єднань)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Черга розгляду: час взяття наступних заявок при паралельних експертах.
+
+    python benchmarks/bench_review_queue.py --sizes 10000 100000 1000000 --reviewers 8
+
+Для кожного розміру черги --reviewers потоків по черзі беруть по --claim
+заявок і відразу "вирішують" їх, поки не виконають --rounds взять кожен.
+Виводиться медіана і 99-й перцентиль часу одного claim_next та пропускна
+здатність. Якщо запит черги йде по індексу, час не росте з розміром.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from sqlalchemy import text, update  # noqa: E402
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Application  # noqa: E402
+import review_queue  # noqa: E402
+
+
+def populate(start, count):
+    for chunk in range(start, start + count, 50000):
+        rows = [{"id": i} for i in range(chunk, min(start + count, chunk + 50000))]
+        db.session.execute(text(
+            "INSERT INTO applications (id, title, short_description, status, owner_id, created_at, available_at) "
+            "VALUES (:id, 'Заявка', 'Опис', 'submitted', 1, datetime('now'), datetime('now', '-1 day'))"
+        ), rows)
+        db.session.commit()
+
+
+def reviewer(expert_id, rounds, claim, latencies):
+    with app.app_context():
+        for _ in range(rounds):
+            started = time.perf_counter()
+            claimed = review_queue.claim_next(expert_id, claim)
+            latencies.append(time.perf_counter() - started)
+            db.session.execute(
+                update(Application).where(Application.id.in_(claimed)).values(status="approved")
+            )
+            db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--reviewers", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--claim", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        # Повнотекстовий індекс тут не потрібен, а вставку сповільнює
+        for trigger in ("ai", "ad", "au"):
+            db.session.execute(text(f"DROP TRIGGER IF EXISTS applications_fts_{trigger}"))
+        db.session.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'o@test.com', 'x')"))
+        db.session.commit()
+
+    loaded = 0
+    print(f"{'заявок':>8} | {'медіана':>9} | {'p99':>9} | {'взять/с':>8}")
+    for size in args.sizes:
+        with app.app_context():
+            populate(loaded + 1, size - loaded)
+        loaded = size
+
+        latencies = []
+        threads = [threading.Thread(target=reviewer, args=(1000 + i, args.rounds, args.claim, latencies))
+                   for i in range(args.reviewers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        ms = np.array(latencies) * 1000
+        print(f"{size:>8} | {np.median(ms):>7.2f}мс | {np.percentile(ms, 99):>7.2f}мс | "
+              f"{len(latencies) / elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
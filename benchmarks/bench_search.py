@@ -0,0 +1,85 @@
+"""Повнотекстовий пошук (FTS5) проти LIKE '%...%' на зростаючому корпусі.
+
+    python benchmarks/bench_search.py --sizes 10000 100000 300000
+
+Тексти складаються зі словника seed.py плюс випадкових "рідкісних" слів.
+Для кожного розміру вимірюється середній час першої сторінки (20 рядків)
+для частого і рідкісного слова.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from sqlalchemy import text  # noqa: E402
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+import search  # noqa: E402
+from seed import ADJECTIVES, NOUNS, DOMAINS  # noqa: E402
+
+FILLER = ("система пристрій спосіб виготовлення матеріал обробка даних мережа сигнал датчик "
+          "керування енергія модель схема вузол контроль").split()
+
+LIKE = text("""
+    SELECT id, title FROM applications
+    WHERE title LIKE :p OR short_description LIKE :p OR expert_comment LIKE :p
+    ORDER BY created_at DESC LIMIT 20
+""")
+
+
+def populate(start, count):
+    rows = []
+    for i in range(start, start + count):
+        words = random.choices(FILLER, k=25) + [f"рідк{random.randrange(100000)}"]
+        random.shuffle(words)
+        rows.append({
+            "id": i,
+            "title": f"{random.choice(ADJECTIVES)} {random.choice(NOUNS)} {random.choice(DOMAINS)}",
+            "description": " ".join(words),
+        })
+    db.session.execute(text(
+        "INSERT INTO applications (id, title, short_description, status, owner_id, created_at) "
+        "VALUES (:id, :title, :description, 'submitted', 1, datetime('now'))"
+    ), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'o@test.com', 'x')"))
+        loaded = 0
+        print(f"{'рядків':>8} | {'FTS часте':>10} | {'FTS рідкісне':>12} | {'LIKE часте':>10} | {'LIKE рідкісне':>13}")
+        for size in args.sizes:
+            populate(loaded + 1, size - loaded)
+            loaded = size
+            rare = f"рідк{random.randrange(100000)}"
+            results = [
+                timed(lambda: search.search("квантовий", page_size=20), args.repeat),
+                timed(lambda: search.search(rare, page_size=20), args.repeat),
+                timed(lambda: db.session.execute(LIKE, {"p": "%квантовий%"}).all(), max(1, args.repeat // 5)),
+                timed(lambda: db.session.execute(LIKE, {"p": f"%{rare}%"}).all(), max(1, args.repeat // 5)),
+            ]
+            print(f"{size:>8} | " + " | ".join(f"{ms:>8.2f}мс".rjust(w) for ms, w in zip(results, (10, 12, 10, 13))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Схожі розглянуті заявки: час компактизації і запиту top-k на зростаючому корпусі.
+
+    python benchmarks/bench_similar.py --sizes 100000 300000 1000000
+
+Описи — 25 слів зі словника VOCABULARY випадкових слів із частотами за
+законом Ципфа (як у природній мові: кілька дуже частих слів і довгий
+хвіст рідкісних). Для кожного розміру вимірюється побудова сегмента,
+середній час одного запиту і час на запит у пачці з --batch запитів.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from sqlalchemy import text  # noqa: E402
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+import similar  # noqa: E402
+from seed import ADJECTIVES, NOUNS, DOMAINS  # noqa: E402
+
+VOCABULARY = 50000
+LETTERS = "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя"
+STATUSES = ["draft", "submitted", "needs_changes", "approved", "rejected", "cancelled"]
+
+_words = ["".join(random.choices(LETTERS, k=random.randint(5, 10))) for _ in range(VOCABULARY)]
+_zipf = 1.0 / np.arange(1, VOCABULARY + 1)
+_zipf /= _zipf.sum()
+
+
+def descriptions(count):
+    return [" ".join(_words[i] for i in row) for row in np.random.choice(VOCABULARY, (count, 25), p=_zipf)]
+
+
+def populate(start, count):
+    for chunk in range(start, start + count, 10000):
+        ids = range(chunk, min(start + count, chunk + 10000))
+        rows = [{
+            "id": i,
+            "title": f"{random.choice(ADJECTIVES)} {random.choice(NOUNS)} {random.choice(DOMAINS)}",
+            "description": value,
+            "status": random.choice(STATUSES),
+        } for i, value in zip(ids, descriptions(len(ids)))]
+        db.session.execute(text(
+            "INSERT INTO applications (id, title, short_description, status, owner_id, created_at) "
+            "VALUES (:id, :title, :description, :status, 1, datetime('now'))"
+        ), rows)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 300000])
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+    app.config["SIMILAR_INDEX_DIR"] = os.path.join(_tmp.name, "similar")
+
+    with app.app_context():
+        db.create_all()
+        # Повнотекстовий індекс тут не потрібен, а вставку сповільнює
+        for trigger in ("ai", "ad", "au"):
+            db.session.execute(text(f"DROP TRIGGER IF EXISTS applications_fts_{trigger}"))
+        db.session.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'o@test.com', 'x')"))
+        loaded = 0
+        print(f"{'рядків':>8} | {'побудова':>9} | {'1 запит':>9} | {'у пачці':>9} | {'на диску':>9}")
+        for size in args.sizes:
+            populate(loaded + 1, size - loaded)
+            loaded = size
+
+            started = time.perf_counter()
+            similar.similar_index.reset()
+            similar.compact()
+            similar.similar_index.refresh(db.session, similar.index_dir())
+            build = time.perf_counter() - started
+
+            index = similar.similar_index
+            queries = [index.vector(random.choice(NOUNS), value) for value in descriptions(args.queries)]
+            index.query(queries[:1])  # прогрів кешу сторінок
+
+            started = time.perf_counter()
+            for query in queries:
+                index.query([query], k=5)
+            single = (time.perf_counter() - started) / len(queries) * 1000
+
+            started = time.perf_counter()
+            for i in range(0, len(queries), args.batch):
+                index.query(queries[i:i + args.batch], k=5)
+            batched = (time.perf_counter() - started) / len(queries) * 1000
+
+            directory = os.path.join(similar.index_dir(), similar._current_generation(similar.index_dir()))
+            megabytes = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 2 ** 20
+            print(f"{size:>8} | {build:>8.1f}с | {single:>7.2f}мс | {batched:>7.2f}мс | {megabytes:>6.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Сховище файлів: плоский каталог проти розкладки ab/cd/<sha256> і паралельне перенесення.
+
+    python benchmarks/bench_storage.py --files 200000 --lookups 20000
+    python benchmarks/bench_storage.py --files 0 --transfer 200 --latency 0.02
+
+Перша частина створює --files порожніх файлів з іменами-хешами в кожній
+розкладці (storage.LocalStorage з depth=0 і depth=2) і міряє:
+створення, exists() для випадкових наявних і відсутніх ключів, open() і
+повний обхід (як резервна копія: os.walk + stat). Кеш каталогів ядра
+теплий — це нижня межа; на холодному кеші й мережевих ФС різниця більша.
+
+Друга частина переносить --transfer файлів по 64 КБ у S3-заглушку з
+затримкою --latency сек. на запит (storage.transfer, як `flask
+storage-transfer local s3`) з різною кількістю потоків.
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import storage  # noqa: E402
+from s3_sink import S3Sink  # noqa: E402
+
+
+def keys(n, salt):
+    return [hashlib.sha256(f"{salt}{i}".encode()).hexdigest() for i in range(n)]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def bench_layout(root, depth, present, absent, lookups):
+    backend = storage.LocalStorage(root, depth=depth)
+    staged = os.path.join(root, ".staged")
+
+    def create():
+        for key in present:
+            open(staged, "wb").close()
+            backend.put_file(key, staged)
+
+    sample = random.sample(present, min(lookups, len(present)))
+    misses = absent[:lookups]
+
+    def walk():
+        for folder, _, names in os.walk(root):
+            for name in names:
+                os.stat(os.path.join(folder, name))
+
+    def open_all():
+        for key in sample:
+            backend.open(key).close()
+
+    return {
+        "create": timed(create) / len(present) * 1e6,
+        "hit": timed(lambda: [backend.exists(k) for k in sample]) / len(sample) * 1e6,
+        "miss": timed(lambda: [backend.exists(k) for k in misses]) / len(misses) * 1e6,
+        "open": timed(open_all) / len(sample) * 1e6,
+        "walk": timed(walk),
+        "max_dir": max(len(names) + len(dirs) for _, dirs, names in os.walk(root)),
+    }
+
+
+def bench_transfer(count, latency, workers_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        source = storage.LocalStorage(os.path.join(tmp, "uploads"))
+        names = []
+        for i in range(count):
+            data = os.urandom(64 * 1024)
+            key = hashlib.sha256(data).hexdigest()
+            path = os.path.join(tmp, "staged")
+            with open(path, "wb") as f:
+                f.write(data)
+            source.put_file(key, path)
+            names.append(key)
+        for workers in workers_list:
+            with S3Sink(latency=latency) as sink:
+                config = {**sink.storage_config(), "UPLOAD_FOLDER": tmp}
+                target = storage.create("s3", config)
+                elapsed = timed(lambda: storage.transfer(names, source, target, os.path.join(tmp, ".tmp"),
+                                                         workers=workers, move=False))
+                assert len(sink.keys()) == count
+            print(f"  потоків {workers:>2}: {elapsed:6.2f} с, {count / elapsed:7.1f} файлів/с")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--transfer", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    if args.files:
+        present, absent = keys(args.files, "present"), keys(args.lookups, "absent")
+        print(f"{args.files} файлів; мкс на операцію, обхід — с")
+        print(f"{'розкладка':>10} | {'створ.':>7} | {'exists+':>7} | {'exists-':>7} | {'open':>7} | "
+              f"{'обхід':>6} | {'макс. у каталозі':>16}")
+        for label, depth in (("плоска", 0), ("ab/cd", 2)):
+            with tempfile.TemporaryDirectory() as root:
+                r = bench_layout(root, depth, present, absent, args.lookups)
+            print(f"{label:>10} | {r['create']:>7.1f} | {r['hit']:>7.2f} | {r['miss']:>7.2f} | {r['open']:>7.2f} | "
+                  f"{r['walk']:>6.2f} | {r['max_dir']:>16}")
+
+    if args.transfer:
+        print(f"\nПеренесення {args.transfer} файлів по 64 КБ у S3-заглушку (затримка {args.latency * 1000:g} мс)")
+        bench_transfer(args.transfer, args.latency, (1, 4, 16))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Прийом завантажень: звичайний парсер werkzeug проти потокового запису у сховище.
+
+    python benchmarks/bench_uploads.py --files 10 --size-mb 10
+
+Тіло multipart з --files файлів по --size-mb МБ готується на диску й
+подається як wsgi.input. Кожен режим запускається в окремому процесі,
+щоб пік RSS (ru_maxrss) не змішувався:
+
+    werkzeug — flask.Request: werkzeug пише кожну частину у свій тимчасовий
+               файл, а file_store потім копіює його у сховище з хешуванням
+               (так працювали маршрути до UploadRequest);
+    stream   — file_store.UploadRequest: частина пишеться одразу в
+               UPLOAD_FOLDER/.tmp з хешуванням, далі лише перейменування.
+
+Виводиться пропускна здатність (парсинг + збереження + коміт), пік RSS і
+скільки байтів процес записав на диск (/proc/self/io, якщо доступно).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+BOUNDARY = "benchboundary7f3a"
+
+
+def write_body(path, files, size):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as out:
+        for i in range(files):
+            out.write(f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"files\"; "
+                      f"filename=\"doc{i}.pdf\"\r\nContent-Type: application/pdf\r\n\r\n".encode())
+            out.write(f"{i:016d}".encode())  # різний вміст — без дедуплікації
+            left = size - 16
+            while left > 0:
+                out.write(block[:min(left, len(block))])
+                left -= len(block)
+            out.write(b"\r\n")
+        out.write(f"--{BOUNDARY}--\r\n".encode())
+
+
+def written_bytes():
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("write_bytes"))
+    except (OSError, StopIteration):
+        return None
+
+
+def run(mode, body_path, uploads):
+    from flask import Request
+    from werkzeug.test import EnvironBuilder
+    from app import app
+    from extensions import db
+    import file_store
+
+    app.config.update(UPLOAD_FOLDER=uploads, MAX_CONTENT_LENGTH=None, MAX_FILE_SIZE=None)
+    with app.app_context():
+        db.create_all()
+    cls = file_store.UploadRequest if mode == "stream" else Request
+    with open(body_path, "rb") as body:
+        environ = EnvironBuilder(method="POST", path="/", input_stream=body,
+                                 content_length=os.path.getsize(body_path),
+                                 content_type=f"multipart/form-data; boundary={BOUNDARY}").get_environ()
+        with app.app_context():
+            before = written_bytes()
+            started = time.perf_counter()
+            request = cls(environ)
+            for upload in request.files.getlist("files"):
+                file_store.attach(1, upload)
+            db.session.commit()
+            elapsed = time.perf_counter() - started
+            request.close()
+            after = written_bytes()
+    return {
+        "seconds": elapsed,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "written": None if before is None else after - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--mode", choices=["werkzeug", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--body", help=argparse.SUPPRESS)
+    parser.add_argument("--uploads", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run(args.mode, args.body, args.uploads)))
+        return
+
+    size = int(args.size_mb * 1024 * 1024)
+    total = args.files * size
+    print(f"{args.files} файлів по {args.size_mb:g} МБ")
+    print(f"{'режим':>9} | {'МБ/с':>7} | {'пік RSS':>9} | {'записано':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        body_path = os.path.join(tmp, "body.bin")
+        write_body(body_path, args.files, size)
+        for mode in ("werkzeug", "stream"):
+            # Свіжа база й сховище для кожного режиму; тимчасові файли werkzeug — там само
+            run_dir = os.path.join(tmp, mode)
+            os.makedirs(run_dir)
+            env = dict(os.environ, TMPDIR=run_dir,
+                       DATABASE_URL=f"sqlite:///{os.path.join(run_dir, 'bench.db')}")
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--body", body_path,
+                 "--uploads", os.path.join(run_dir, "uploads")],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(out)
+            written = "н/д" if result["written"] is None else f"{result['written'] / 2**20:.0f} МБ"
+            print(f"{mode:>9} | {total / 2**20 / result['seconds']:>7.0f} | {result['rss_mb']:>7.0f}МБ | {written:>10}")
+
+
+if __name__ == "__main__":
+    main()
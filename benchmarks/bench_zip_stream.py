@@ -0,0 +1,101 @@
+"""Архів усіх файлів заявки: потоковий ZIP проти складання в пам'яті.
+
+    python benchmarks/bench_zip_stream.py --files 10 --total-mb 100
+
+Заявка з --files файлами на --total-mb МБ: більшість — .pdf/.docx
+(випадкові байти, тобто вже стиснуті), кожен четвертий — .txt, що
+добре стискається. Режими:
+
+    memory   — zipfile у BytesIO, усе DEFLATED, потім віддати (наївний варіант);
+    deflate  — zip_stream, але всі записи DEFLATED;
+    stream   — zip_stream як у /applications/<id>/files.zip (STORED для стиснутих).
+
+Виводиться час, пропускна здатність, розмір архіву і пік пам'яті Python
+(tracemalloc, окремим прогоном — він сповільнює).
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import zip_stream  # noqa: E402
+
+
+def make_files(folder, files, total):
+    size = total // files
+    entries = []
+    text = b"".join(f"Рядок {i}: опис твору, автор, дата створення.\n".encode() for i in range(20000))
+    for i in range(files):
+        ext = "txt" if i % 4 == 3 else ("pdf" if i % 2 else "docx")
+        path = os.path.join(folder, f"f{i}.{ext}")
+        with open(path, "wb") as f:
+            left = size
+            while left > 0:
+                block = text if ext == "txt" else os.urandom(1024 * 1024)
+                f.write(block[:left])
+                left -= len(block)
+        entries.append((f"file{i}.{ext}", path, size, None))
+    return entries
+
+
+def build_memory(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, path, _, _ in entries:
+            archive.write(path, name)
+    return [buffer.getvalue()]
+
+
+def build_stream(entries, deflate_all=False):
+    if deflate_all:
+        original = zip_stream.STORED_EXTENSIONS
+        zip_stream.STORED_EXTENSIONS = frozenset()
+    try:
+        yield from zip_stream.stream(entries)
+    finally:
+        if deflate_all:
+            zip_stream.STORED_EXTENSIONS = original
+
+
+MODES = {
+    "memory": build_memory,
+    "deflate": lambda entries: build_stream(entries, deflate_all=True),
+    "stream": build_stream,
+}
+
+
+def consume(mode, entries):
+    return sum(len(part) for part in MODES[mode](entries))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--total-mb", type=float, default=100)
+    args = parser.parse_args()
+
+    total = int(args.total_mb * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        entries = make_files(tmp, args.files, total)
+        print(f"{args.files} файлів, разом {args.total_mb:g} МБ")
+        print(f"{'режим':>8} | {'с':>6} | {'МБ/с':>6} | {'архів':>8} | {'пік пам.':>9}")
+        for mode in MODES:
+            started = time.perf_counter()
+            size = consume(mode, entries)
+            elapsed = time.perf_counter() - started
+            tracemalloc.start()
+            consume(mode, entries)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{mode:>8} | {elapsed:>6.2f} | {total / 2**20 / elapsed:>6.0f} | "
+                  f"{size / 2**20:>6.1f}МБ | {peak / 2**20:>7.1f}МБ")
+
+
+if __name__ == "__main__":
+    main()
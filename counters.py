@@ -0,0 +1,120 @@
+"""Лічильники для /admin/stats, що підтримуються інкрементально.
+
+Замість GROUP BY по всій таблиці applications на кожен перегляд сторінки
+статистики кількості зберігаються в таблиці counters і змінюються в тій же
+транзакції, що й самі дані:
+
+    applications.status.<status> — save_history() при створенні заявки
+                                   та кожній зміні статусу;
+    users.total                  — подія after_insert моделі User;
+    storage.*                    — file_store.py при прикріпленні та
+                                   видаленні файлів (див. STORAGE_COUNTERS).
+
+Оновлення — атомарний UPSERT `value = value + :delta`, тож паралельні
+запити не гублять інкременти. `flask rebuild-counters` перераховує все
+повним обходом (наприклад, після seed.py чи ручних правок у БД), а з
+`--verify` лише звіряє збережені значення з фактичними.
+"""
+from sqlalchemy import event, text
+
+from models import User
+
+APPLICATION_STATUSES = ("draft", "submitted", "needs_changes", "approved", "rejected", "cancelled")
+USERS_TOTAL = "users.total"
+# Файли заявок у сховищі: записи і сума їхніх розмірів ("логічні" байти)
+# та унікальні вмісти і їхній сумарний розмір (фізично на диску)
+STORAGE_FILES = "storage.files"
+STORAGE_LOGICAL_BYTES = "storage.logical_bytes"
+STORAGE_BLOBS = "storage.blobs"
+STORAGE_PHYSICAL_BYTES = "storage.physical_bytes"
+STORAGE_COUNTERS = (STORAGE_FILES, STORAGE_LOGICAL_BYTES, STORAGE_BLOBS, STORAGE_PHYSICAL_BYTES)
+
+_UPSERT = text("""
+    INSERT INTO counters (name, value) VALUES (:name, :delta)
+    ON CONFLICT (name) DO UPDATE SET value = value + :delta
+""")
+
+
+def status_counter(status):
+    return f"applications.status.{status}"
+
+
+def bump(name, delta=1, connection=None):
+    """Змінює лічильник у поточній транзакції (commit — у викликаючому коді)."""
+    from extensions import db
+    (connection or db.session).execute(_UPSERT, {"name": name, "delta": delta})
+
+
+def record_status_change(old_status, new_status):
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        bump(status_counter(old_status), -1)
+    if new_status is not None:
+        bump(status_counter(new_status), 1)
+
+
+@event.listens_for(User, "after_insert")
+def _count_new_user(mapper, connection, target):
+    bump(USERS_TOTAL, 1, connection=connection)
+
+
+def read_stats():
+    """Кількості за статусами та користувачів — пошук кількох рядків за ключем."""
+    from extensions import db
+    from models import Counter
+    names = [status_counter(s) for s in APPLICATION_STATUSES] + [USERS_TOTAL]
+    values = dict(db.session.execute(
+        db.select(Counter.name, Counter.value).where(Counter.name.in_(names))
+    ).all())
+    by_status = {s: values.get(status_counter(s), 0) for s in APPLICATION_STATUSES}
+    return by_status, values.get(USERS_TOTAL, 0)
+
+
+# --- Перерахунок повним обходом ---
+
+def actual_counts():
+    from extensions import db
+    counts = {status_counter(s): 0 for s in APPLICATION_STATUSES}
+    rows = db.session.execute(text("SELECT status, count(*) FROM applications GROUP BY status"))
+    for status, count in rows:
+        counts[status_counter(status)] = count
+    counts[USERS_TOTAL] = db.session.execute(text("SELECT count(*) FROM users")).scalar()
+    counts[STORAGE_FILES], counts[STORAGE_LOGICAL_BYTES] = db.session.execute(text(
+        "SELECT count(*), coalesce(sum(b.size), 0) FROM application_files f "
+        "JOIN file_blobs b ON b.sha256 = f.blob_sha256"
+    )).one()
+    counts[STORAGE_BLOBS], counts[STORAGE_PHYSICAL_BYTES] = db.session.execute(text(
+        "SELECT count(*), coalesce(sum(size), 0) FROM file_blobs WHERE refcount > 0"
+    )).one()
+    return counts
+
+
+def verify():
+    """Повертає {назва: (збережене, фактичне)} для лічильників, що розійшлися."""
+    from extensions import db
+    from models import Counter
+    expected = actual_counts()
+    stored = dict(db.session.execute(
+        db.select(Counter.name, Counter.value).where(Counter.name.in_(list(expected)))
+    ).all())
+    return {name: (stored.get(name, 0), value) for name, value in expected.items()
+            if stored.get(name, 0) != value}
+
+
+def rebuild():
+    """Перезаписує лічильники фактичними значеннями. Повертає те, що було виправлено.
+
+    Спершу запис (UPDATE) — так транзакція одразу бере блокування на запис
+    і паралельні зміни не втиснуться між підрахунком і збереженням.
+    """
+    from extensions import db
+    db.session.execute(text("UPDATE counters SET value = value WHERE name = :name"), {"name": USERS_TOTAL})
+    fixed = verify()
+    for name, (_, value) in fixed.items():
+        db.session.execute(text("""
+            INSERT INTO counters (name, value) VALUES (:name, :value)
+            ON CONFLICT (name) DO UPDATE SET value = :value
+        """), {"name": name, "value": value})
+    db.session.commit()
+    return fixed
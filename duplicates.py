@@ -0,0 +1,216 @@
+"""Пошук майже однакових заявок: MinHash + LSH.
+
+Текст заявки (назва + опис) розбивається на символьні шинґли довжини
+SHINGLE. MinHash-підпис із NUM_PERM чисел зберігає оцінку схожості
+Жаккара: частка однакових позицій у двох підписах ≈ |A ∩ B| / |A ∪ B|.
+
+Підпис ділиться на BANDS смуг по ROWS чисел; хеш кожної смуги — це
+кошик у таблиці application_lsh_bands. Дві заявки стають кандидатами,
+якщо збігаються хоча б в одній смузі, тож для сторінки розгляду
+потрібен пошук по індексу за BANDS ключами, а не порівняння з усіма
+заявками. Ймовірність потрапити в кандидати різко зростає біля
+схожості (1 / BANDS) ** (1 / ROWS) ≈ 0.5.
+
+Підпис і кошики оновлюються подіями моделі Application при створенні
+та зміні назви чи опису — у тій же транзакції. Для наявних даних є
+`flask minhash-backfill`, який рахує підписи в кількох процесах.
+"""
+import hashlib
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import bindparam, delete, event, insert, inspect, select, text
+
+from models import Application, ApplicationMinHash, ApplicationLSHBand
+
+SHINGLE = 5
+NUM_PERM = 64
+BANDS, ROWS = 16, 4
+# Нижче цієї оціненої схожості кандидатів не показуємо
+THRESHOLD = 0.5
+MAX_CANDIDATES = 200
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+# Фіксоване зерно: підписи мають збігатися між процесами та запусками
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 1 << 29, size=(NUM_PERM, 1)).astype(np.uint64)
+_B = _rng.randint(0, 1 << 29, size=(NUM_PERM, 1)).astype(np.uint64)
+
+_SPACES = re.compile(r"\W+", re.UNICODE)
+
+
+def shingles(text_value):
+    """Множина 32-бітних хешів символьних шинґлів нормалізованого тексту."""
+    normalized = _SPACES.sub(" ", (text_value or "").lower()).strip()
+    if len(normalized) < SHINGLE:
+        normalized = normalized.ljust(SHINGLE)
+    encoded = {normalized[i:i + SHINGLE] for i in range(len(normalized) - SHINGLE + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in encoded),
+        dtype=np.uint64, count=len(encoded),
+    )
+
+
+def signature(text_value):
+    """MinHash-підпис: NUM_PERM x uint32."""
+    x = shingles(text_value)
+    # (a * x + b) mod (2^61 - 1): a, b < 2^29 і x < 2^32 — без переповнення uint64
+    hashed = (_A * x[np.newaxis, :] + _B) % _MERSENNE
+    return (hashed.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def application_text(title, description):
+    return f"{title or ''} {description or ''}"
+
+
+def band_buckets(sig):
+    """BANDS ключів (signed int64) — по одному на смугу, номер смуги входить у хеш."""
+    buckets = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def similarity(sig, others):
+    """Оцінка Жаккара між `sig` і кожним рядком матриці `others`."""
+    return (others == sig[np.newaxis, :]).mean(axis=1)
+
+
+# --- Запис у БД ---
+
+def _store(connection, application_id, sig):
+    connection.execute(delete(ApplicationMinHash.__table__)
+                       .where(ApplicationMinHash.application_id == application_id))
+    connection.execute(delete(ApplicationLSHBand.__table__)
+                       .where(ApplicationLSHBand.application_id == application_id))
+    connection.execute(insert(ApplicationMinHash.__table__),
+                       {"application_id": application_id, "signature": sig.tobytes()})
+    connection.execute(insert(ApplicationLSHBand.__table__),
+                       [{"bucket": b, "application_id": application_id} for b in band_buckets(sig)])
+
+
+@event.listens_for(Application, "after_insert")
+def _index_new_application(mapper, connection, target):
+    _store(connection, target.id, signature(application_text(target.title, target.short_description)))
+
+
+@event.listens_for(Application, "after_update")
+def _reindex_changed_application(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.short_description.history.has_changes():
+        _store(connection, target.id, signature(application_text(target.title, target.short_description)))
+
+
+@event.listens_for(Application, "after_delete")
+def _forget_application(mapper, connection, target):
+    connection.execute(delete(ApplicationMinHash.__table__)
+                       .where(ApplicationMinHash.application_id == target.id))
+    connection.execute(delete(ApplicationLSHBand.__table__)
+                       .where(ApplicationLSHBand.application_id == target.id))
+
+
+# --- Пошук ---
+
+# Кандидати ранжуються за кількістю спільних смуг: якщо популярний кошик
+# переповнений слабкими збігами, справжній дублікат (багато смуг) не
+# відсікається обмеженням MAX_CANDIDATES
+_CANDIDATES = text("""
+    SELECT application_id FROM application_lsh_bands
+    WHERE bucket IN :buckets AND application_id != :exclude
+    GROUP BY application_id
+    ORDER BY count(*) DESC, application_id
+    LIMIT :limit
+""").bindparams(bindparam("buckets", expanding=True))
+
+
+def likely_duplicates(application, limit=5):
+    """Схожі заявки: список (Application, схожість), від найсхожішої."""
+    from extensions import db
+    sig = signature(application_text(application.title, application.short_description))
+    ids = db.session.execute(_CANDIDATES, {
+        "buckets": band_buckets(sig), "exclude": application.id, "limit": MAX_CANDIDATES,
+    }).scalars().all()
+    if not ids:
+        return []
+
+    rows = db.session.execute(
+        select(ApplicationMinHash.application_id, ApplicationMinHash.signature)
+        .where(ApplicationMinHash.application_id.in_(ids))
+    ).all()
+    matrix = np.frombuffer(b"".join(r.signature for r in rows), dtype=np.uint32).reshape(len(rows), NUM_PERM)
+    scores = similarity(sig, matrix)
+    best = [i for i in np.argsort(-scores, kind="stable") if scores[i] >= THRESHOLD][:limit]
+    if not best:
+        return []
+
+    found = {a.id: a for a in db.session.execute(
+        select(Application).where(Application.id.in_([rows[i].application_id for i in best]))
+    ).scalars()}
+    return [(found[rows[i].application_id], float(scores[i])) for i in best
+            if rows[i].application_id in found]
+
+
+# --- Заповнення для наявних даних ---
+
+def _signatures_job(items):
+    """Виконується в процесі пулу: [(id, текст)] -> [(id, байти підпису, кошики)]."""
+    result = []
+    for app_id, text_value in items:
+        sig = signature(text_value)
+        result.append((app_id, sig.tobytes(), band_buckets(sig)))
+    return result
+
+
+def _fetch(engine, after_id, limit):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(Application.id, Application.title, Application.short_description)
+            .where(Application.id > after_id).order_by(Application.id).limit(limit)
+        ).all()
+
+
+def _submit(pool, rows, chunk):
+    items = [(r.id, application_text(r.title, r.short_description)) for r in rows]
+    return [pool.submit(_signatures_job, items[i:i + chunk]) for i in range(0, len(items), chunk)]
+
+
+def _write(engine, signatures):
+    ids = [app_id for app_id, _, _ in signatures]
+    with engine.begin() as connection:
+        connection.execute(delete(ApplicationMinHash.__table__)
+                           .where(ApplicationMinHash.application_id.in_(ids)))
+        connection.execute(delete(ApplicationLSHBand.__table__)
+                           .where(ApplicationLSHBand.application_id.in_(ids)))
+        connection.execute(insert(ApplicationMinHash.__table__),
+                           [{"application_id": i, "signature": s} for i, s, _ in signatures])
+        connection.execute(insert(ApplicationLSHBand.__table__),
+                           [{"bucket": b, "application_id": i} for i, _, buckets in signatures for b in buckets])
+
+
+def backfill(workers=4, batch_size=2000, progress=None):
+    """Перераховує підписи та кошики всіх заявок. Повертає кількість оброблених.
+
+    Поки основний процес записує пачку, пул уже рахує підписи наступної.
+    """
+    from extensions import db
+    engine = db.engine
+    done = 0
+    chunk = max(1, batch_size // max(workers, 1))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        rows = _fetch(engine, 0, batch_size)
+        pending = _submit(pool, rows, chunk)
+        while rows:
+            next_rows = _fetch(engine, rows[-1].id, batch_size)
+            next_pending = _submit(pool, next_rows, chunk)
+            _write(engine, [item for future in pending for item in future.result()])
+
+            done += len(rows)
+            if progress:
+                progress(done)
+            rows, pending = next_rows, next_pending
+    return done
@@ -0,0 +1,134 @@
+"""Перевірка доставлюваності e-mail (DNS MX) з кешем на рівні домену.
+
+`validate_email` з перевіркою доставлюваності робить живий DNS-запит прямо
+в запиті реєстрації, і повільний резолвер перетворює її на багатосекундну.
+Тут синтаксис перевіряється окремо (без мережі), а результат DNS-перевірки
+кешується для всього домену: позитивний — на EMAIL_DNS_POSITIVE_TTL,
+негативний — на EMAIL_DNS_NEGATIVE_TTL секунд. Таймаут не кешується.
+
+Режими (EMAIL_DELIVERABILITY_MODE):
+    "sync"  — при промаху кешу чекаємо DNS (не довше EMAIL_DNS_TIMEOUT);
+    "async" — при промаху кешу адресу приймаємо одразу, а домен
+              перевіряємо у фоні; наступні реєстрації побачать результат;
+    "off"   — лише перевірка синтаксису.
+
+Резолвер підключається через `deliverability.resolver`: це будь-яка функція
+`resolver(domain, timeout) -> (status, message)`, де status — "ok", "bad"
+або "unknown". У тестах підставляється офлайн-резолвер.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import dns.resolver
+from email_validator import EmailUndeliverableError
+from email_validator.deliverability import validate_email_deliverability
+
+DEFAULTS = {
+    "EMAIL_DELIVERABILITY_MODE": "sync",
+    "EMAIL_DNS_TIMEOUT": 3.0,
+    "EMAIL_DNS_POSITIVE_TTL": 24 * 3600,
+    "EMAIL_DNS_NEGATIVE_TTL": 600,
+    "EMAIL_DNS_CACHE_SIZE": 10000,
+}
+
+
+def dns_resolver(domain, timeout):
+    """Резолвер за замовчуванням: MX (або A/AAAA) через dnspython."""
+    resolver = dns.resolver.Resolver()
+    resolver.lifetime = timeout
+    try:
+        info = validate_email_deliverability(domain, domain, dns_resolver=resolver)
+    except EmailUndeliverableError as e:
+        return "bad", str(e)
+    if info.get("unknown-deliverability"):
+        return "unknown", info["unknown-deliverability"]
+    return "ok", None
+
+
+class DeliverabilityChecker:
+    def __init__(self, resolver=dns_resolver):
+        self.resolver = resolver
+        self._cache = OrderedDict()  # domain -> (expires_at, status, message)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email-dns")
+
+    def _settings(self):
+        from flask import current_app, has_app_context
+        cfg = current_app.config if has_app_context() else {}
+        return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+    # --- Кеш ---
+
+    def cached(self, domain):
+        with self._lock:
+            item = self._cache.get(domain)
+            if item is None:
+                return None
+            expires_at, status, message = item
+            if expires_at < time.monotonic():
+                del self._cache[domain]
+                return None
+            self._cache.move_to_end(domain)
+            return status, message
+
+    def _store(self, domain, status, message, settings):
+        if status == "unknown":
+            return  # таймаут чи збій DNS — нічого не знаємо про домен
+        ttl = settings["EMAIL_DNS_POSITIVE_TTL"] if status == "ok" else settings["EMAIL_DNS_NEGATIVE_TTL"]
+        with self._lock:
+            self._cache[domain] = (time.monotonic() + ttl, status, message)
+            self._cache.move_to_end(domain)
+            while len(self._cache) > settings["EMAIL_DNS_CACHE_SIZE"]:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    # --- Перевірка ---
+
+    def _resolve(self, domain, settings):
+        try:
+            status, message = self.resolver(domain, settings["EMAIL_DNS_TIMEOUT"])
+        except Exception as e:
+            status, message = "unknown", str(e)
+        self._store(domain, status, message, settings)
+        return status, message
+
+    def _resolve_in_background(self, domain, settings):
+        try:
+            status, message = self._resolve(domain, settings)
+            if status == "bad":
+                print(f"[EMAIL DNS] Домен {domain} не приймає пошту: {message}")
+        finally:
+            with self._lock:
+                self._pending.discard(domain)
+
+    def check(self, domain):
+        """Кидає EmailUndeliverableError, якщо відомо, що домен не приймає пошту."""
+        domain = domain.lower()
+        settings = self._settings()
+        mode = settings["EMAIL_DELIVERABILITY_MODE"]
+        if mode == "off":
+            return
+
+        result = self.cached(domain)
+        if result is None:
+            if mode == "async":
+                with self._lock:
+                    schedule = domain not in self._pending
+                    self._pending.add(domain)
+                if schedule:
+                    self._executor.submit(self._resolve_in_background, domain, settings)
+                return
+            result = self._resolve(domain, settings)
+
+        status, message = result
+        if status == "bad":
+            raise EmailUndeliverableError(message)
+
+
+deliverability = DeliverabilityChecker()
@@ -0,0 +1,139 @@
+"""Шаблони листів: templates/email/*.html|*.txt, скомпільовані один раз.
+
+CSS з `templates/email/email.css` вбудовується в шаблон під час його
+завантаження: правила з одним класом (`.btn`) чи тегом (`body`) копіюються
+в атрибут `style` відповідних елементів (поштові клієнти часто ігнорують
+<style>), а весь файл підставляється замість маркера `/* email.css */`.
+Після цього Jinja компілює шаблон і тримає його в кеші — на кожен лист
+лишається тільки виклик render(). Значення з бази екрануються автоматично.
+"""
+import os
+import re
+from collections import namedtuple
+
+from flask import url_for
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+EMAIL_TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")
+CSS_FILE = "email.css"
+CSS_MARKER = "/* email.css */"
+
+STATUS_TRANSLATIONS = {
+    "approved": "✅ Схвалено (Approved)",
+    "rejected": "❌ Відхилено (Rejected)",
+    "needs_changes": "⚠️ Потребує змін (Needs Changes)",
+    "submitted": "На розгляді",
+    "draft": "Чернетка",
+    "cancelled": "Скасовано"
+}
+
+RenderedEmail = namedtuple("RenderedEmail", "subject recipients body html")
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_START_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?(/?)>")
+_CLASS_ATTR = re.compile(r'\sclass="([^"]*)"')
+_STYLE_ATTR = re.compile(r'\sstyle="([^"]*)"')
+
+
+def parse_css(css):
+    """Повертає (правила для тегів, правила для класів) як словники селектор -> декларації."""
+    tags, classes = {}, {}
+    for selectors, body in _CSS_RULE.findall(_CSS_COMMENT.sub("", css)):
+        decls = "; ".join(d.strip() for d in body.split(";") if d.strip())
+        for selector in selectors.split(","):
+            selector = selector.strip()
+            if re.fullmatch(r"\.[\w-]+", selector):
+                classes[selector[1:]] = _join(classes.get(selector[1:]), decls)
+            elif re.fullmatch(r"[a-z][a-z0-9]*", selector):
+                tags[selector] = _join(tags.get(selector), decls)
+            # Складні селектори (.header h1) лишаються тільки в <style>
+    return tags, classes
+
+
+def _join(*parts):
+    return "; ".join(p for p in parts if p)
+
+
+def inline_css(html, css):
+    """Вбудовує прості CSS-правила в атрибути style та підставляє CSS у <style>."""
+    tags, classes = parse_css(css)
+
+    def apply(match):
+        tag, attrs, closing = match.group(1), match.group(2) or "", match.group(3)
+        class_match = _CLASS_ATTR.search(attrs)
+        names = class_match.group(1).split() if class_match else []
+        inherited = _join(tags.get(tag.lower()), *(classes.get(n) for n in names))
+        if not inherited:
+            return match.group(0)
+
+        style_match = _STYLE_ATTR.search(attrs)
+        if style_match:
+            # Власний style елемента має пріоритет, тому йде останнім
+            style = _join(inherited, style_match.group(1).strip().rstrip(";"))
+            attrs = attrs[:style_match.start()] + f' style="{style}"' + attrs[style_match.end():]
+        else:
+            attrs += f' style="{inherited}"'
+        return f"<{tag}{attrs}{closing}>"
+
+    return _START_TAG.sub(apply, html).replace(CSS_MARKER, css.strip())
+
+
+class InlineCSSLoader(FileSystemLoader):
+    """Завантажувач, що вбудовує email.css у HTML-шаблони під час завантаження."""
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template.endswith(".html"):
+            css_source, _, _ = super().get_source(environment, CSS_FILE)
+            source = inline_css(source, css_source)
+        return source, filename, uptodate
+
+
+_env = None
+
+
+def get_environment():
+    global _env
+    if _env is None:
+        _env = Environment(
+            loader=InlineCSSLoader(EMAIL_TEMPLATES_DIR),
+            autoescape=select_autoescape(["html"]),
+            # Шаблони не змінюються під час роботи — не перевіряємо файли щоразу
+            auto_reload=False,
+            keep_trailing_newline=True,
+        )
+    return _env
+
+
+def get_template(name):
+    # Environment сам кешує скомпільовані шаблони
+    return get_environment().get_template(name)
+
+
+def render_status_updates(applications):
+    """Рендерить листи про зміну статусу для багатьох заявок за один прохід.
+
+    Потребує контексту застосунку з SERVER_NAME або контексту запиту (для url_for).
+    """
+    html_template = get_template("status_update.html")
+    text_template = get_template("status_update.txt")
+
+    rendered = []
+    for application in applications:
+        context = {
+            "application": application,
+            "readable_status": STATUS_TRANSLATIONS.get(application.status, application.status),
+            "app_link": url_for('view_application', application_id=application.id, _external=True),
+        }
+        rendered.append(RenderedEmail(
+            subject=f"Оновлення заявки №{application.id}",
+            recipients=[application.owner.email],
+            body=text_template.render(context),
+            html=html_template.render(context),
+        ))
+    return rendered
+
+
+def render_status_update(application):
+    return render_status_updates([application])[0]
@@ -1,32 +1,83 @@
 from flask import render_template, request, redirect, url_for, flash, g
 from extensions import db
 from models import Application
-from helpers import expert_required, send_status_update_email, save_history  # <--- Імпорт save_history
+from helpers import expert_required, send_status_update_email, save_history, check_version  # <--- Імпорт save_history
+from pagination import paginate_request
+from loaders import LIST_OPTIONS, DETAIL_OPTIONS, history_page
+import search
+import duplicates
+import similar
+import review_queue
 
 
 def register_routes(app):
     @app.route("/expert/applications")
     @expert_required
     def expert_dashboard():
-        apps = (
-            Application.query
+        stmt = (
+            db.select(Application)
             .filter(Application.status == 'submitted')
             .filter(Application.owner_id != g.user.id)
-            .order_by(Application.created_at.asc())
-            .all()
+            .options(*LIST_OPTIONS)
         )
-        return render_template("expert_dashboard.html", applications=apps)
+        page = paginate_request(stmt, [Application.created_at, Application.id])
+        return render_template("expert_dashboard.html", applications=page, page=page,
+                               leases=review_queue.leases(g.user.id), holder=review_queue.holder)
+
+    @app.route("/expert/queue/claim", methods=["POST"])
+    @expert_required
+    def claim_applications():
+        """Бере наступні вільні заявки з черги."""
+        if g.user.role != "expert":
+            flash("Брати заявки з черги можуть лише експерти.", "warning")
+            return redirect(url_for("expert_dashboard"))
+        claimed = review_queue.claim_next(g.user.id)
+        if claimed:
+            flash(f"Взято на розгляд заявок: {len(claimed)}.", "success")
+        else:
+            flash("Вільних заявок у черзі немає.", "info")
+        return redirect(url_for("expert_dashboard"))
+
+    @app.route("/expert/applications/<int:application_id>/claim", methods=["POST"])
+    @expert_required
+    def claim_application(application_id):
+        """Бере на розгляд конкретну заявку (або продовжує свою оренду)."""
+        if g.user.role == "expert" and review_queue.claim(application_id, g.user.id):
+            flash("Заявку взято на розгляд.", "success")
+        else:
+            flash("Цю заявку зараз не можна взяти на розгляд.", "warning")
+        return redirect(url_for("expert_review", application_id=application_id))
+
+    @app.route("/expert/applications/<int:application_id>/release", methods=["POST"])
+    @expert_required
+    def release_application(application_id):
+        """Повертає взяту заявку в чергу."""
+        if review_queue.release(application_id, g.user.id):
+            flash("Заявку повернуто в чергу.", "info")
+        return redirect(url_for("expert_dashboard"))
 
     @app.route("/expert/applications/<int:application_id>", methods=["GET", "POST"])
     @expert_required
     def expert_review(application_id):
-        app_obj = db.get_or_404(Application, application_id)
+        # Перегляд оренди не видає: лише явне взяття (черга, кнопка) або рішення
+        # експерта. Для рішення оренду беремо до завантаження заявки — її коміт
+        # інакше скинув би щойно підвантажені зв'язки
+        if request.method == "POST" and g.user.role == "expert":
+            review_queue.claim(application_id, g.user.id)
+        options = DETAIL_OPTIONS if request.method == "GET" else ()
+        app_obj = db.get_or_404(Application, application_id, options=options)
 
         if app_obj.owner_id == g.user.id:
             flash("Ви не можете оцінювати власні заявки.", "danger")
             return redirect(url_for("expert_dashboard"))
 
+        taken_by = review_queue.holder(app_obj)
+        if taken_by is not None and taken_by != g.user.id:
+            flash("Цю заявку зараз розглядає інший експерт.", "warning")
+            return redirect(url_for("expert_dashboard"))
+
         if request.method == "POST":
+            check_version(app_obj)
             decision = request.form.get("decision")
             comment = (request.form.get("comment") or "").strip()
 
@@ -36,7 +87,8 @@ def register_routes(app):
 
             if decision in ["rejected", "needs_changes"] and not comment:
                 flash("Для цього рішення коментар є обов'язковим!", "danger")
-                return render_template("expert_review.html", application=app_obj)
+                return render_template("expert_review.html", application=app_obj, history=history_page(app_obj.id),
+                                       taken_by=taken_by)
 
             app_obj.status = decision
             app_obj.expert_comment = comment
@@ -44,10 +96,22 @@ def register_routes(app):
             # --- ІСТОРІЯ: Експерт змінив статус ---
             save_history(app_obj, g.user, "status_change")
 
-            db.session.commit()
+            # Лист лише ставиться в чергу — в одній транзакції зі зміною статусу
             send_status_update_email(app_obj)
+            db.session.commit()
 
             flash(f"Заявку переведено у статус: {decision}.", "success")
             return redirect(url_for("expert_dashboard"))
 
-        return render_template("expert_review.html", application=app_obj)
\ No newline at end of file
+        return render_template("expert_review.html", application=app_obj, history=history_page(app_obj.id),
+                               taken_by=taken_by, duplicates=duplicates.likely_duplicates(app_obj),
+                               similar=similar.similar_prior(app_obj))
+
+    @app.route("/search")
+    @expert_required
+    def search_applications():
+        """Повнотекстовий пошук по назві, опису та коментарю експерта."""
+        query = (request.args.get("q") or "").strip()
+        page = request.args.get("page", 1, type=int)
+        results, has_next = search.search(query, page=page, page_size=app.config.get("PAGE_SIZE", 20))
+        return render_template("search.html", query=query, results=results, page=page, has_next=has_next)
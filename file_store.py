@@ -0,0 +1,559 @@
+"""Сховище файлів заявок, адресоване вмістом (SHA-256).
+
+Раніше кожне завантаження лягало в UPLOAD_FOLDER як app_<id>_<ім'я>:
+один і той самий документ, прикріплений до десяти заявок, лежав на диску
+десять разів, а повторне завантаження файлу з тим самим ім'ям мовчки
+перезаписувало попередній. Тепер:
+
+    бекенд (storage.py)      — байти, один об'єкт на унікальний вміст:
+                               UPLOAD_FOLDER/ab/cd/<sha256> або S3;
+    file_blobs               — рядок на вміст: розмір і refcount;
+    application_files        — ім'я для користувача + посилання на вміст.
+
+Завантаження не проходить через тимчасові файли werkzeug: UploadRequest
+віддає парсеру multipart HashingSpool, який пише кожну частину відразу
+в UPLOAD_FOLDER/.tmp, рахує SHA-256 і розмір на льоту і обриває запит
+з 413, щойно файл перевищить MAX_FILE_SIZE. attach() з локальним
+бекендом лише перейменовує готовий файл — ні повторного читання, ні
+копіювання.
+Потоки іншого походження (міграція, тести) копіюються через spool()
+порціями по FILE_STORE_CHUNK_SIZE, а файли, зібрані відновлюваним
+завантаженням (resumable.py), забирає adopt().
+
+Вміст з'являється в бекенді і зникає з нього лише під блокуванням запису
+SQLite: спершу UPSERT/UPDATE рядка file_blobs (транзакція бере
+блокування), потім файлова операція. Тому паралельні завантаження того ж
+вмісту і видалення останнього посилання не можуть розминутися так, щоб
+рядок лишився без байтів. Мережевий бекенд отримує вміст ще до
+блокування, а під ним лише перевіряється, що той на місці: маршрути
+викликають prepare() до першого flush своєї транзакції, а attach()
+потім робить тільки UPSERT.
+Видалення двофазне: detach() лише зменшує refcount у транзакції
+маршруту, а байти прибирає release() окремою транзакцією вже після
+commit — і лише якщо рядок file_blobs досі має refcount 0.
+
+Файли, завантажені до появи сховища (blob_sha256 IS NULL), читаються
+за старим іменем; `flask storage-migrate` переносить їх у сховище.
+"""
+import functools
+import hashlib
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+
+from collections import namedtuple
+from urllib.parse import quote
+
+from flask import Request, current_app, has_app_context, request
+from sqlalchemy import func, select, text
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename, send_file as _send_file
+
+import counters
+import storage
+from extensions import db
+from models import ApplicationFile
+
+DEFAULTS = {
+    "FILE_STORE_CHUNK_SIZE": 1024 * 1024,
+    "MAX_FILE_SIZE": None,  # None — обмежує лише MAX_CONTENT_LENGTH
+    "FILE_CACHE_MAX_AGE": 3600,
+    "FILE_OFFLOAD": None,  # None | "x-sendfile" | "x-accel-redirect"
+    "FILE_ACCEL_REDIRECT_PREFIX": "/protected-uploads/",
+    "FILE_STORAGE_BACKEND": "local",  # "local" | "s3" (див. storage.py)
+}
+
+_ACQUIRE = text("""
+    INSERT INTO file_blobs (sha256, size, refcount, created_at) VALUES (:sha256, :size, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (sha256) DO UPDATE SET refcount = refcount + 1
+    RETURNING refcount
+""")
+_RELEASE = text("UPDATE file_blobs SET refcount = refcount - 1 WHERE sha256 = :sha256 RETURNING refcount, size")
+_DROP = text("DELETE FROM file_blobs WHERE sha256 = :sha256 AND refcount <= 0 RETURNING sha256")
+
+# Файл, уже збережений у .tmp (і в мережевому сховищі), але ще не прикріплений (див. prepare)
+Prepared = namedtuple("Prepared", "filename sha256 size tmp_path")
+# Те, що лишилося прибрати після видалення файлу (див. detach/release)
+Orphan = namedtuple("Orphan", "sha256 path")
+
+logger = logging.getLogger(__name__)
+
+
+def _settings():
+    cfg = current_app.config if has_app_context() else {}
+    return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def _folder():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def backend():
+    """Бекенд, де лежать байти вмістів (FILE_STORAGE_BACKEND)."""
+    return storage.create(_settings()["FILE_STORAGE_BACKEND"], current_app.config)
+
+
+def blob_path(sha256):
+    """Шлях до вмісту на диску; None, якщо бекенд не локальний."""
+    return backend().local_path(sha256)
+
+
+def path_of(file_record):
+    """Шлях до байтів файлу заявки (нового чи збереженого до появи сховища); None — не на диску."""
+    if file_record.blob_sha256 is None:
+        return os.path.join(_folder(), file_record.filename)
+    return blob_path(file_record.blob_sha256)
+
+
+def exists(file_record):
+    if file_record.blob_sha256 is None:
+        return os.path.exists(path_of(file_record))
+    return backend().exists(file_record.blob_sha256)
+
+
+def opener(file_record):
+    """opener(offset=0) -> потік для читання байтів файлу заявки.
+
+    Бекенд визначається одразу, тож opener працює й поза контекстом
+    застосунку — у генераторі тіла відповіді.
+    """
+    if file_record.blob_sha256 is None:
+        path = path_of(file_record)
+
+        def open_legacy(offset=0):
+            f = open(path, "rb")
+            f.seek(offset)
+            return f
+        return open_legacy
+    return functools.partial(backend().open, file_record.blob_sha256)
+
+
+def size_of(file_record):
+    if file_record.blob_sha256 is None:
+        return os.path.getsize(path_of(file_record))
+    return file_record.blob.size
+
+
+class _LazyReader:
+    """Потік, що відкривається лише при першому читанні.
+
+    Для 304 бекенд узагалі не чіпається, а для Range make_conditional
+    спершу "перемотує" потік — і GET іде вже з потрібної позиції.
+    """
+
+    def __init__(self, opener):
+        self._opener = opener
+        self._offset = 0
+        self._stream = None
+
+    def seekable(self):
+        return self._stream is None
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._offset = offset
+        return offset
+
+    def tell(self):
+        return self._offset
+
+    def read(self, size=-1):
+        if self._stream is None:
+            self._stream = self._opener(self._offset)
+        return self._stream.read(size)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+
+
+def send(file_record):
+    """Відповідь на завантаження файлу заявки (права доступу перевіряє маршрут — до виклику).
+
+    Файл у сховищі незмінний, тож ETag — сильний, із SHA-256 вмісту, а
+    браузер може тримати копію FILE_CACHE_MAX_AGE секунд (private: файл
+    видно лише після входу). If-None-Match / If-Modified-Since дають 304.
+    Старі файли поза сховищем — ETag від часу зміни й розміру, з
+    перевіркою на кожен запит.
+
+    Без FILE_OFFLOAD байти віддає send_file: Range/If-Range — 206, а цілий
+    файл — через wsgi.file_wrapper (gunicorn і uWSGI роблять sendfile без
+    копіювання в Python). З FILE_OFFLOAD застосунок віддає лише заголовки,
+    а файл — проксі: "x-sendfile" (Apache mod_xsendfile, lighttpd) чи
+    "x-accel-redirect" (nginx, internal location на FILE_ACCEL_REDIRECT_PREFIX,
+    що дивиться в UPLOAD_FOLDER). Діапазони тоді теж обробляє проксі, а
+    умовні запити — ще тут, щоб 304 не доходив до диска.
+
+    Вміст у мережевому бекенді (S3) застосунок передає сам, порціями;
+    FILE_OFFLOAD до нього не застосовується.
+    """
+    settings = _settings()
+    path = path_of(file_record)
+    stored = file_record.blob_sha256 is not None
+    if path is None:
+        return _send_remote(file_record, settings)
+    offload = settings["FILE_OFFLOAD"]
+    response = _send_file(
+        path, request.environ, download_name=file_record.filename,
+        etag=file_record.blob_sha256 if stored else True,
+        max_age=settings["FILE_CACHE_MAX_AGE"] if stored else None,
+        conditional=offload is None,
+        use_x_sendfile=offload is not None,
+        response_class=current_app.response_class,
+    )
+    response.cache_control.private = True
+    response.cache_control.public = None
+    if offload is None:
+        return response
+    # Тіло віддає проксі — вона ж рахує Content-Length для діапазонів
+    response.headers.pop("Content-Length", None)
+    if offload == "x-accel-redirect":
+        response.headers.pop("X-Sendfile", None)
+        relative = os.path.relpath(path, _folder()).replace(os.sep, "/")
+        response.headers["X-Accel-Redirect"] = settings["FILE_ACCEL_REDIRECT_PREFIX"] + quote(relative)
+    response.make_conditional(request)
+    if response.status_code == 304:
+        response.headers.pop("X-Sendfile", None)
+        response.headers.pop("X-Accel-Redirect", None)
+    return response
+
+
+def _send_remote(file_record, settings):
+    sha256 = file_record.blob_sha256
+    response = _send_file(
+        _LazyReader(opener(file_record)), request.environ,
+        download_name=file_record.filename, etag=sha256, last_modified=file_record.created_at,
+        max_age=settings["FILE_CACHE_MAX_AGE"], conditional=False,
+        response_class=current_app.response_class,
+    )
+    response.cache_control.private = True
+    response.cache_control.public = None
+    size = size_of(file_record)
+    response.content_length = size
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+
+class FileTooLarge(RequestEntityTooLarge):
+    """Один із файлів завантаження більший за MAX_FILE_SIZE."""
+
+
+class HashingSpool:
+    """Файл у UPLOAD_FOLDER/.tmp, що рахує SHA-256 і розмір під час запису.
+
+    Парсер multipart пише в нього частину запиту, потім перемотує на
+    початок і загортає у FileStorage — тож читати його теж можна. Якщо
+    вміст так і не забрали через claim(), close() (його викликає Flask
+    наприкінці запиту) видаляє тимчасовий файл.
+    """
+
+    def __init__(self, max_size=None):
+        tmp_dir = os.path.join(_folder(), ".tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "w+b")
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+        self._claimed = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise FileTooLarge()
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def claim(self):
+        """Забирає готовий файл: (sha256, розмір, шлях). Далі за файл відповідає викликаючий код."""
+        self._file.flush()
+        self._claimed = True
+        return self._digest.hexdigest(), self.size, self.path
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        if not self._claimed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+
+class UploadRequest(Request):
+    """Запит, у якому файли multipart одразу пишуться у сховище (див. HashingSpool)."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = HashingSpool(max_size=_settings()["MAX_FILE_SIZE"])
+        # Якщо парсинг обірветься (413), уже записані частини не потраплять у request.files
+        self.__dict__.setdefault("_spools", []).append(spool)
+        return spool
+
+    def close(self):
+        super().close()
+        for spool in self.__dict__.pop("_spools", ()):
+            spool.close()
+
+
+def spool(stream):
+    """Копіює потік у тимчасовий файл поруч зі сховищем, рахуючи SHA-256.
+
+    Повертає (sha256, розмір, шлях до тимчасового файлу).
+    """
+    if isinstance(stream, HashingSpool):
+        return stream.claim()
+    target = HashingSpool()
+    try:
+        chunk_size = _settings()["FILE_STORE_CHUNK_SIZE"]
+        while chunk := stream.read(chunk_size):
+            target.write(chunk)
+        return target.claim()
+    finally:
+        target.close()
+
+
+def _upload_ahead(sha256, tmp_path):
+    """Мережевому бекенду — вміст заздалегідь, поки транзакція ще нічого не записала.
+
+    Інакше PUT ішов би під блокуванням запису SQLite, і всі інші записи в
+    БД стояли б на час передачі. PUT того самого вмісту за тим самим
+    ключем ідемпотентний.
+    """
+    storage_backend = backend()
+    if storage_backend.remote and not storage_backend.exists(sha256):
+        storage_backend.put_file(sha256, tmp_path)
+
+
+def _acquire(sha256, size, tmp_path):
+    """+1 посилання на вміст; байти з tmp_path потрапляють у бекенд, якщо їх там ще немає.
+
+    Мережевий бекенд на цей момент уже має вміст (_upload_ahead), тож під
+    блокуванням лишаються UPSERT і перевірка наявності.
+    """
+    refcount = db.session.execute(_ACQUIRE, {"sha256": sha256, "size": size}).scalar()
+    # Уже під блокуванням: паралельне видалення останнього посилання могло прибрати вміст
+    storage_backend = backend()
+    if not storage_backend.exists(sha256):
+        storage_backend.put_file(sha256, tmp_path)
+    counters.bump(counters.STORAGE_FILES, 1)
+    counters.bump(counters.STORAGE_LOGICAL_BYTES, size)
+    if refcount == 1:
+        counters.bump(counters.STORAGE_BLOBS, 1)
+        counters.bump(counters.STORAGE_PHYSICAL_BYTES, size)
+
+
+def prepare(uploads):
+    """Перша фаза attach(): файли (werkzeug FileStorage) — у .tmp і, для мережевого бекенду, у сховище.
+
+    Маршрут викликає її до першого flush, поки транзакція не взяла
+    блокування запису. Повертає список Prepared для attach(); тимчасові
+    файли прибирає attach(), а те, що не дійшло до нього, — discard().
+    """
+    prepared = []
+    try:
+        for upload in uploads:
+            sha256, size, tmp_path = spool(upload.stream)
+            prepared.append(Prepared(upload.filename, sha256, size, tmp_path))
+            _upload_ahead(sha256, tmp_path)
+    except Exception:
+        discard(prepared)
+        raise
+    return prepared
+
+
+def discard(prepared):
+    for item in prepared:
+        if os.path.exists(item.tmp_path):
+            os.remove(item.tmp_path)
+
+
+def attach(application_id, upload):
+    """Прикріплює файл до заявки: upload — результат prepare() або werkzeug FileStorage.
+
+    Повертає новий ApplicationFile (доданий у сесію; commit — у викликаючому коді).
+    """
+    [prepared] = [upload] if isinstance(upload, Prepared) else prepare([upload])
+    try:
+        return _attach_spooled(application_id, prepared.filename, prepared.sha256, prepared.size,
+                               prepared.tmp_path)
+    finally:
+        discard([prepared])
+
+
+def adopt(application_id, filename, path):
+    """Прикріплює до заявки готовий файл на диску (зібране відновлюване завантаження).
+
+    Сам файл лишається на місці: у сховище йде його жорстке посилання з
+    .tmp, тож невдалу спробу можна повторити. Прибрати файл після commit —
+    справа викликаючого коду. Вміст один раз перечитується порціями для SHA-256.
+    """
+    digest, size = hashlib.sha256(), 0
+    chunk_size = _settings()["FILE_STORE_CHUNK_SIZE"]
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+    tmp_path = _stage(path)
+    try:
+        _upload_ahead(digest.hexdigest(), tmp_path)
+        return _attach_spooled(application_id, filename, digest.hexdigest(), size, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _stage(path):
+    """Жорстке посилання на path у UPLOAD_FOLDER/.tmp (копія, якщо ФС їх не підтримує)."""
+    tmp_dir = os.path.join(_folder(), ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    staged = os.path.join(tmp_dir, "adopt-" + secrets.token_hex(8))
+    try:
+        os.link(path, staged)
+    except OSError:
+        shutil.copyfile(path, staged)
+    return staged
+
+
+def _attach_spooled(application_id, filename, sha256, size, tmp_path):
+    """Прикріплює вміст із tmp_path; tmp_path прибирає викликаючий код (після помилки теж)."""
+    _acquire(sha256, size, tmp_path)
+    record = ApplicationFile(filename=secure_filename(filename) or "file",
+                             application_id=application_id, blob_sha256=sha256)
+    db.session.add(record)
+    return record
+
+
+def detach(file_record):
+    """Видаляє файл заявки в поточній транзакції; байти — лише разом з останнім посиланням на них.
+
+    Повертає Orphan (або None), який після commit треба передати в
+    release(): до commit видаляти байти не можна — відкат транзакції
+    лишив би запис без вмісту.
+    """
+    sha256 = file_record.blob_sha256
+    orphan = None
+    if sha256 is None:
+        orphan = Orphan(None, path_of(file_record))
+    else:
+        refcount, size = db.session.execute(_RELEASE, {"sha256": sha256}).one()
+        counters.bump(counters.STORAGE_FILES, -1)
+        counters.bump(counters.STORAGE_LOGICAL_BYTES, -size)
+        if refcount <= 0:
+            # Рядок лишається з refcount 0 до release(); _ACQUIRE його відроджує
+            counters.bump(counters.STORAGE_BLOBS, -1)
+            counters.bump(counters.STORAGE_PHYSICAL_BYTES, -size)
+            orphan = Orphan(sha256, None)
+    db.session.delete(file_record)
+    return orphan
+
+
+def release(orphan):
+    """Друга фаза detach(), окремою транзакцією після commit.
+
+    Вміст видаляється, лише якщо його рядок і досі має refcount 0
+    (DELETE … RETURNING повернув рядок): нове завантаження того ж вмісту
+    між транзакціями його відродило б. Файлова операція — під
+    блокуванням запису цієї транзакції. Помилка лише логується: рядок із
+    refcount 0 і байти лишаються, наступне завантаження вмісту їх підхопить.
+    """
+    if orphan is None:
+        return
+    try:
+        if orphan.sha256 is None:
+            if os.path.exists(orphan.path):
+                os.remove(orphan.path)
+            return
+        if db.session.execute(_DROP, {"sha256": orphan.sha256}).first() is not None:
+            backend().delete(orphan.sha256)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Не вдалося видалити вміст %s", orphan.sha256 or orphan.path)
+
+
+def report():
+    """Дедуплікація сховища з лічильників: скільки байтів прикріплено і скільки лежить на диску."""
+    from models import Counter
+    values = dict(db.session.execute(
+        select(Counter.name, Counter.value).where(Counter.name.in_(counters.STORAGE_COUNTERS))
+    ).all())
+    logical = values.get(counters.STORAGE_LOGICAL_BYTES, 0)
+    physical = values.get(counters.STORAGE_PHYSICAL_BYTES, 0)
+    return {
+        "files": values.get(counters.STORAGE_FILES, 0),
+        "blobs": values.get(counters.STORAGE_BLOBS, 0),
+        "logical_bytes": logical,
+        "physical_bytes": physical,
+        "saved_bytes": logical - physical,
+        "ratio": logical / physical if physical else 1.0,
+    }
+
+
+def legacy_count():
+    return db.session.scalar(select(func.count(ApplicationFile.id)).where(ApplicationFile.blob_sha256.is_(None)))
+
+
+def migrate_legacy(batch_size=200, progress=None):
+    """Переносить файли, збережені як app_<id>_<ім'я>, у сховище.
+
+    Старий файл видаляється лише після коміту пачки. Повертає
+    (перенесено, не знайдено на диску).
+    """
+    migrated, missing, last_id = 0, 0, 0
+    while True:
+        batch = db.session.execute(
+            select(ApplicationFile)
+            .where(ApplicationFile.blob_sha256.is_(None), ApplicationFile.id > last_id)
+            .order_by(ApplicationFile.id).limit(batch_size)
+        ).scalars().all()
+        if not batch:
+            break
+        # Спершу вся пачка — у .tmp і мережеве сховище, без блокування запису;
+        # потім під ним лише UPSERT-и
+        staged = []
+        try:
+            for record in batch:
+                legacy = path_of(record)
+                if not os.path.exists(legacy):
+                    missing += 1
+                    continue
+                with open(legacy, "rb") as f:
+                    sha256, size, tmp_path = spool(f)
+                staged.append((record, legacy, Prepared(record.filename, sha256, size, tmp_path)))
+                _upload_ahead(sha256, tmp_path)
+            done = []
+            for record, legacy, prepared in staged:
+                _acquire(prepared.sha256, prepared.size, prepared.tmp_path)
+                prefix = f"app_{record.application_id}_"
+                if record.filename.startswith(prefix):
+                    record.filename = record.filename[len(prefix):] or record.filename
+                record.blob_sha256 = prepared.sha256
+                done.append(legacy)
+            db.session.commit()
+        finally:
+            discard([prepared for _, _, prepared in staged])
+        for legacy in done:
+            try:
+                os.remove(legacy)
+            except OSError:
+                pass
+        migrated += len(done)
+        last_id = batch[-1].id
+        if progress:
+            progress(migrated)
+    return migrated, missing
+
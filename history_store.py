@@ -0,0 +1,325 @@
+"""Стиснуте зберігання знімків історії заявки.
+
+Раніше кожна подія копіювала повні назву, опис і коментар. Довгий опис,
+що пройшов десяток циклів "редагування — на доопрацювання", лежав у базі
+десяток разів. Тепер у стовпці snapshot_data зберігається:
+
+    ключовий кадр — повний знімок (назва, опис, коментар); пишеться для
+                    першої події заявки і далі кожні KEYFRAME_INTERVAL подій;
+    дельта        — різниця з попередньою подією цієї ж заявки: для кожного
+                    поля або нічого (не змінилося), або список операцій
+                    "скопіювати n символів / пропустити n / вставити текст".
+
+Вміст — JSON; якщо він довший за COMPRESS_MIN байтів і zlib його
+зменшує, зберігається стиснутим (перший байт — b"z", інакше b"j").
+Дельта знає свою базу ("b") і ключовий кадр ланцюжка ("k"), тож
+відновлення — один запит по індексу (application_id, id) у межах
+від кадру до потрібної події.
+
+Відновлення ліниве: знімок рахується, лише коли шаблон звертається до
+event.snapshot_title / snapshot_description / snapshot_comment.
+Готові знімки лежать у LRU-кеші процесу — стрічка подій, що
+рендериться від нових до старих, відновлює кожен ланцюжок один раз.
+Ключ кешу — (id, crc32 вмісту): id після відкату транзакції можуть
+повторюватися, а вміст — ні.
+
+Рядки, записані до появи стиснення, мають snapshot_data = NULL і читаються
+зі старих стовпців; `flask compress-history` переводить їх у новий формат.
+"""
+import difflib
+import json
+import re
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import func, select, text
+
+from extensions import db
+from models import ApplicationHistory
+
+KEYFRAME_INTERVAL = 16
+COMPRESS_MIN = 64
+# Більшу за це (у словах) змінену середину тексту записуємо заміною без пошуку збігів
+DIFF_MAX_WORDS = 20000
+
+Snapshot = namedtuple("Snapshot", "title description comment")
+
+_WORD = re.compile(r"\w+|\W", re.UNICODE)
+
+
+class StateCache:
+    """LRU-кеш відновлених знімків: (id, crc) -> (Snapshot, глибина, id кадру)."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def put(self, key, item):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = item
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+state_cache = StateCache()
+
+
+# --- Формат ---
+
+def _pack(payload):
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    if len(raw) >= COMPRESS_MIN:
+        packed = zlib.compress(raw, 9)
+        if len(packed) < len(raw):
+            return b"z" + packed
+    return b"j" + raw
+
+
+def _unpack(data):
+    raw = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return json.loads(raw)
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    lo, hi = 0, n
+    # Бінарний пошук по зрізах — порівняння рядків іде на рівні C
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def diff(old, new):
+    """Операції, що перетворюють old на new: n>0 — копія, n<0 — пропуск, рядок — вставка.
+
+    Правки зазвичай локальні, тож спершу відкидаємо спільні початок і кінець,
+    а середину порівнюємо по словах: посимвольний SequenceMatcher на довгому
+    тексті з повторами знаходить погані збіги і працює квадратично.
+    """
+    ops = []
+
+    def emit(op):
+        if not op:
+            return
+        if ops and type(ops[-1]) is type(op) and (isinstance(op, str) or (ops[-1] > 0) == (op > 0)):
+            ops[-1] += op
+        else:
+            ops.append(op)
+
+    prefix = _common_prefix(old, new)
+    suffix = _common_prefix(old[prefix:][::-1], new[prefix:][::-1])
+    a = _WORD.findall(old[prefix:len(old) - suffix])
+    b = _WORD.findall(new[prefix:len(new) - suffix])
+
+    emit(prefix)
+    if len(a) + len(b) > DIFF_MAX_WORDS:
+        # Текст переписано цілком — дельта не окупить часу на її пошук
+        a, b = ["".join(a)], ["".join(b)]
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            emit(sum(map(len, a[i1:i2])))
+            continue
+        emit(-sum(map(len, a[i1:i2])))
+        emit("".join(b[j1:j2]))
+    emit(suffix)
+    return ops
+
+
+def patch(old, ops):
+    out, pos = [], 0
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif op > 0:
+            out.append(old[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return "".join(out)
+
+
+def _field_delta(old, new):
+    if old == new:
+        return None
+    if old is None or new is None:
+        return {"v": new}
+    return diff(old, new)
+
+
+def _apply_field(old, delta):
+    if delta is None:
+        return old
+    if isinstance(delta, dict):
+        return delta["v"]
+    return patch(old, delta)
+
+
+def encode(snapshot, parent=None):
+    """Вміст snapshot_data для нової події.
+
+    parent — (id, Snapshot, глибина, id кадру) попередньої події заявки або None.
+    Повертає (байти, глибина нової події).
+    """
+    if parent is None or parent[2] + 1 >= KEYFRAME_INTERVAL:
+        return _pack({"s": list(snapshot)}), 0
+    parent_id, base, depth, keyframe_id = parent
+    fields = [_field_delta(a, b) for a, b in zip(base, snapshot)]
+    return _pack({"b": parent_id, "k": keyframe_id, "d": fields}), depth + 1
+
+
+# --- Відновлення ---
+
+def _key(event_id, data):
+    return event_id, zlib.crc32(data)
+
+
+def _legacy(row):
+    return Snapshot(row._legacy_title, row._legacy_description, row._legacy_comment)
+
+
+def _resolve(event_id, data, application_id):
+    """(Snapshot, глибина, id кадру) події зі стисненим знімком."""
+    cached = state_cache.get(_key(event_id, data))
+    if cached is not None:
+        return cached
+    payload = _unpack(data)
+    if "s" in payload:
+        item = (Snapshot(*payload["s"]), 0, event_id)
+        state_cache.put(_key(event_id, data), item)
+        return item
+
+    rows = {row.id: row.snapshot_data for row in db.session.execute(
+        select(ApplicationHistory.id, ApplicationHistory.snapshot_data)
+        .where(ApplicationHistory.application_id == application_id,
+               ApplicationHistory.id.between(payload["k"], event_id))
+        .order_by(ApplicationHistory.id)
+    )}
+    rows[event_id] = data
+
+    # Від події по базах до кадру (або до вже відомого знімка), далі — вперед
+    path, current, item = [], event_id, None
+    while True:
+        cached = state_cache.get(_key(current, rows[current]))
+        if cached is not None:
+            item = cached
+            break
+        payload = _unpack(rows[current])
+        if "s" in payload:
+            item = (Snapshot(*payload["s"]), 0, current)
+            state_cache.put(_key(current, rows[current]), item)
+            break
+        path.append((current, payload))
+        current = payload["b"]
+
+    for current, payload in reversed(path):
+        state, depth, keyframe_id = item
+        item = (Snapshot(*(_apply_field(v, d) for v, d in zip(state, payload["d"]))), depth + 1, keyframe_id)
+        state_cache.put(_key(current, rows[current]), item)
+    return item
+
+
+def snapshot_of(event):
+    """Повний знімок події історії."""
+    if event.snapshot_data is None:
+        return _legacy(event)
+    return _resolve(event.id, event.snapshot_data, event.application_id)[0]
+
+
+def latest(application_id):
+    """(id, Snapshot, глибина, id кадру) останньої події заявки або None."""
+    last = db.session.execute(
+        select(ApplicationHistory)
+        .where(ApplicationHistory.application_id == application_id)
+        .order_by(ApplicationHistory.id.desc())
+        .limit(1)
+    ).scalar()
+    if last is None or last.snapshot_data is None:
+        # Після старого рядка починаємо новий ланцюжок з кадру
+        return None
+    return (last.id, *_resolve(last.id, last.snapshot_data, application_id))
+
+
+# --- Міграція старих рядків ---
+
+_LEGACY_BYTES = text("""
+    SELECT coalesce(sum(length(CAST(snapshot_title AS BLOB)) + length(CAST(snapshot_description AS BLOB))
+                        + coalesce(length(CAST(snapshot_comment AS BLOB)), 0)), 0)
+    FROM application_history WHERE snapshot_data IS NULL
+""")
+
+
+def compress_existing(batch_size=500, progress=None):
+    """Переводить рядки без snapshot_data у ключові кадри й дельти.
+
+    Історія кожної заявки перебудовується цілком (старі рядки відносно
+    новіших), тож ланцюжки нових подій після міграції починаються з кадру.
+    Повертає (кількість рядків, байтів до, байтів після).
+    """
+
+    before = db.session.execute(_LEGACY_BYTES).scalar()
+    converted, after, last_app = 0, 0, 0
+    while True:
+        app_ids = db.session.execute(
+            select(ApplicationHistory.application_id).distinct()
+            .where(ApplicationHistory.snapshot_data.is_(None), ApplicationHistory.application_id > last_app)
+            .order_by(ApplicationHistory.application_id).limit(batch_size)
+        ).scalars().all()
+        if not app_ids:
+            break
+        for application_id in app_ids:
+            events = db.session.execute(
+                select(ApplicationHistory).where(ApplicationHistory.application_id == application_id)
+                .order_by(ApplicationHistory.id)
+            ).scalars().all()
+            parent = None
+            for event in events:
+                snapshot = snapshot_of(event)
+                data, depth = encode(snapshot, parent)
+                if event.snapshot_data is None:
+                    converted += 1
+                    after += len(data)
+                event.snapshot_data = data
+                event._legacy_title = event._legacy_description = event._legacy_comment = None
+                parent = (event.id, snapshot, depth, event.id if depth == 0 else parent[3])
+        db.session.commit()
+        last_app = app_ids[-1]
+        if progress:
+            progress(converted)
+    return converted, before, after
+
+
+def stored_bytes():
+    """Скільки байтів займають знімки історії зараз (старі стовпці + snapshot_data)."""
+    compressed = db.session.execute(
+        select(func.coalesce(func.sum(func.length(ApplicationHistory.snapshot_data)), 0))
+    ).scalar()
+    return db.session.execute(_LEGACY_BYTES).scalar() + compressed
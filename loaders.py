@@ -0,0 +1,57 @@
+"""Профілі завантаження (loader options) для сторінок заявок.
+
+Шаблони ходять по зв'язках (`app.owner.email`, `application.files`,
+`event.changed_by.email`), і без підказок кожен такий доступ — окремий
+лінивий SELECT на кожен рядок. Тут для кожного виду сторінки зібрано
+опції, які підтягують усе потрібне фіксованою кількістю запитів:
+
+    LIST_OPTIONS   — списки заявок з автором (JOIN на users);
+    DETAIL_OPTIONS — сторінка заявки: автор і файли.
+
+Історію заявки сторінки не вантажать цілком: history_page() повертає
+сторінку найновіших подій (з авторами), а старіші догортаються
+фрагментами через /applications/<id>/history?after=...
+
+Використання: `db.get_or_404(Application, id, options=DETAIL_OPTIONS)`
+або `select(Application).options(*LIST_OPTIONS)`.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Application, ApplicationFile, ApplicationHistory
+
+# many-to-one: JOIN у тому ж запиті не множить рядки
+LIST_OPTIONS = (
+    joinedload(Application.owner),
+)
+
+# one-to-many: окремий SELECT ... WHERE application_id IN (...) на кожну колекцію
+DETAIL_OPTIONS = (
+    joinedload(Application.owner),
+    selectinload(Application.files),
+)
+
+
+def count_files(application_id):
+    """Кількість файлів заявки без завантаження самих записів."""
+    from extensions import db
+    return db.session.scalar(
+        select(func.count(ApplicationFile.id)).where(ApplicationFile.application_id == application_id)
+    )
+
+
+def history_page(application_id, after=None):
+    """Сторінка історії заявки від нових подій до старих (pagination.KeysetPage).
+
+    Ключ (created_at, id) іде по індексу ix_application_history_app_created,
+    тож будь-яка сторінка коштує один запит незалежно від довжини історії.
+    """
+    from flask import current_app
+    from pagination import keyset_paginate
+    stmt = (
+        select(ApplicationHistory)
+        .where(ApplicationHistory.application_id == application_id)
+        .options(joinedload(ApplicationHistory.changed_by))
+    )
+    return keyset_paginate(stmt, [ApplicationHistory.created_at, ApplicationHistory.id], after=after,
+                           page_size=current_app.config.get("HISTORY_PAGE_SIZE", 10), descending=True)
@@ -0,0 +1,202 @@
+"""Черга вихідних листів (outbox) та пул фонових воркерів.
+
+Маршрути не працюють з SMTP напряму: вони лише додають рядок `OutboxEmail`
+у ту ж транзакцію, що й основна зміна. Воркери періодично забирають
+пачку листів, відправляють її через `MailTransport` (одне SMTP-з'єднання
+на багато листів) і при помилці переносять спробу на пізніше
+з експоненційною затримкою.
+"""
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask_mail import Message
+from sqlalchemy import update, or_, and_
+
+from extensions import db
+from mail_transport import MailTransport
+from models import OutboxEmail
+
+
+def _utcnow():
+    # SQLite зберігає дати без часової зони, тому порівнюємо з "наївним" UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue_email(subject, recipients, body, html=None):
+    """Додає лист у чергу. db.session.commit() робиться у викликаючому коді."""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    entry = OutboxEmail(
+        subject=subject,
+        recipients=",".join(recipients),
+        body=body,
+        html=html,
+        status="pending",
+        next_attempt_at=_utcnow(),
+    )
+    db.session.add(entry)
+    return entry
+
+
+def backoff_delay(attempts, base, maximum):
+    """Затримка перед наступною спробою: base * 2^(n-1) з випадковим розкидом."""
+    delay = min(maximum, base * (2 ** max(attempts - 1, 0)))
+    # Розкид +-20%, щоб листи після збою SMTP не поверталися всі одночасно
+    return delay * random.uniform(0.8, 1.2)
+
+
+def build_message(entry):
+    msg = Message(entry.subject, recipients=entry.recipients.split(","))
+    msg.body = entry.body
+    if entry.html:
+        msg.html = entry.html
+    return msg
+
+
+class MailWorkerPool:
+    """Пул потоків, які вичитують `email_outbox` і відправляють листи."""
+
+    def __init__(self, app, workers=None, batch_size=None, poll_interval=None):
+        cfg = app.config
+        self.app = app
+        self.workers = workers or cfg.get("MAIL_QUEUE_WORKERS", 2)
+        self.batch_size = batch_size or cfg.get("MAIL_QUEUE_BATCH_SIZE", 20)
+        self.poll_interval = poll_interval or cfg.get("MAIL_QUEUE_POLL_INTERVAL", 2.0)
+        self.max_attempts = cfg.get("MAIL_QUEUE_MAX_ATTEMPTS", 5)
+        self.backoff_base = cfg.get("MAIL_QUEUE_BACKOFF_BASE", 30)
+        self.backoff_max = cfg.get("MAIL_QUEUE_BACKOFF_MAX", 3600)
+        self.lock_timeout = cfg.get("MAIL_QUEUE_LOCK_TIMEOUT", 300)
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    # --- Керування потоками ---
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, args=(f"{self._prefix}:{i}",),
+                                 name=f"mail-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _run(self, worker_id):
+        # Транспорт живе весь час роботи потоку: з'єднання переживає кілька пачок
+        with self.app.app_context():
+            transport = MailTransport()
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once(worker_id, transport)
+            except Exception as e:
+                print(f"[MAIL QUEUE ERROR] {worker_id}: {e}")
+                processed = 0
+            # Якщо черга порожня — чекаємо; інакше одразу беремо наступну пачку
+            if not processed:
+                transport.close_if_idle()
+                self._stop.wait(self.poll_interval)
+        transport.close()
+
+    # --- Обробка однієї пачки ---
+
+    def claim_batch(self, worker_id):
+        """Атомарно резервує пачку листів за воркером і повертає їх."""
+        now = _utcnow()
+        stale = now - timedelta(seconds=self.lock_timeout)
+        due = (
+            db.select(OutboxEmail.id)
+            .where(or_(
+                and_(OutboxEmail.status == "pending", OutboxEmail.next_attempt_at <= now),
+                # Лист "завис" у sending — воркер упав посеред відправки
+                and_(OutboxEmail.status == "sending", OutboxEmail.locked_at < stale),
+            ))
+            .order_by(OutboxEmail.id)
+            .limit(self.batch_size)
+        )
+        db.session.execute(
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_(due.scalar_subquery()))
+            .values(status="sending", locked_by=worker_id, locked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        stmt = (
+            db.select(OutboxEmail)
+            .filter_by(status="sending", locked_by=worker_id)
+            .order_by(OutboxEmail.id)
+        )
+        return db.session.execute(stmt).scalars().all()
+
+    def drain_once(self, worker_id=None, transport=None):
+        """Відправляє одну пачку листів. Повертає кількість оброблених."""
+        worker_id = worker_id or f"{self._prefix}:sync"
+        with self.app.app_context():
+            batch = self.claim_batch(worker_id)
+            if not batch:
+                return 0
+
+            own_transport = transport is None
+            if own_transport:
+                transport = MailTransport()
+            try:
+                entries = {}
+                messages = []
+                for entry in batch:
+                    msg = build_message(entry)
+                    entries[id(msg)] = entry
+                    messages.append(msg)
+                for msg, error in transport.send_many(messages):
+                    if error is None:
+                        self._mark_sent(entries[id(msg)])
+                    else:
+                        self._mark_failed(entries[id(msg)], error)
+            finally:
+                if own_transport:
+                    transport.close()
+
+            db.session.commit()
+            return len(batch)
+
+    def _mark_sent(self, entry):
+        entry.status = "sent"
+        entry.sent_at = _utcnow()
+        entry.locked_by = None
+        entry.locked_at = None
+        entry.last_error = None
+
+    def _mark_failed(self, entry, error):
+        entry.attempts += 1
+        entry.last_error = str(error)
+        entry.locked_by = None
+        entry.locked_at = None
+        if entry.attempts >= self.max_attempts:
+            entry.status = "failed"
+            print(f"[MAIL QUEUE] Лист #{entry.id} не відправлено після {entry.attempts} спроб: {error}")
+        else:
+            entry.status = "pending"
+            delay = backoff_delay(entry.attempts, self.backoff_base, self.backoff_max)
+            entry.next_attempt_at = _utcnow() + timedelta(seconds=delay)
+
+    def drain(self, timeout=None):
+        """Синхронно відправляє все, що готово до відправки (для CLI та тестів)."""
+        deadline = time.monotonic() + timeout if timeout else None
+        total = 0
+        with self.app.app_context():
+            transport = MailTransport()
+        try:
+            while True:
+                processed = self.drain_once(transport=transport)
+                total += processed
+                if not processed or (deadline and time.monotonic() > deadline):
+                    return total
+        finally:
+            transport.close()
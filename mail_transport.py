@@ -0,0 +1,116 @@
+"""Транспорт листів поверх Flask-Mail з повторним використанням з'єднання.
+
+`mail.send(msg)` щоразу відкриває нове з'єднання: TCP, STARTTLS і AUTH
+на кожен лист. `MailTransport` накопичує листи і відправляє їх пачками
+через одне автентифіковане з'єднання `mail.connect()`, а саме з'єднання
+тримає відкритим між пачками, доки воно не простоїть `idle_timeout` секунд.
+
+Один екземпляр транспорту не потокобезпечний — кожен воркер має свій.
+"""
+import smtplib
+import time
+
+from flask import current_app
+from flask_mail import BadHeaderError
+
+from extensions import mail
+
+# Помилки, що стосуються конкретного листа: з'єднання лишається робочим
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    BadHeaderError,
+    AssertionError,
+)
+
+
+class MailTransport:
+    def __init__(self, batch_size=None, idle_timeout=None):
+        cfg = current_app.config
+        self.batch_size = batch_size or cfg.get("MAIL_TRANSPORT_BATCH_SIZE", 50)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else cfg.get("MAIL_TRANSPORT_IDLE_TIMEOUT", 30)
+
+        self._pending = []
+        self._conn = None
+        self._last_used = 0.0
+        self.connections_opened = 0
+
+    # --- З'єднання ---
+
+    def _connection(self):
+        if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._conn is None:
+            self._conn = mail.connect().__enter__()
+            self._last_used = time.monotonic()
+            self.connections_opened += 1
+        return self._conn
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                # Сервер міг уже сам закрити з'єднання
+                pass
+
+    def close_if_idle(self):
+        if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        self.close()
+
+    # --- Відправка ---
+
+    def add(self, message):
+        """Додає лист до пачки. Повна пачка відправляється одразу.
+
+        Повертає результати відправленої пачки (див. flush) або порожній список.
+        """
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """Відправляє накопичені листи. Повертає список пар (message, error|None)."""
+        pending, self._pending = self._pending, []
+        results = []
+        for i, message in enumerate(pending):
+            try:
+                self._send_one(message)
+            except MESSAGE_ERRORS as e:
+                results.append((message, e))
+            except Exception as e:
+                # З'єднання зламане: решта пачки теж не піде
+                self.close()
+                results.extend((m, e) for m in pending[i:])
+                break
+            else:
+                results.append((message, None))
+        return results
+
+    def send_many(self, messages):
+        results = []
+        for message in messages:
+            results.extend(self.add(message))
+        results.extend(self.flush())
+        return results
+
+    def _send_one(self, message):
+        conn = self._connection()
+        try:
+            conn.send(message)
+        except smtplib.SMTPServerDisconnected:
+            # Сервер закрив з'єднання під час простою — одна повторна спроба
+            self.close()
+            conn = self._connection()
+            conn.send(message)
+        self._last_used = time.monotonic()
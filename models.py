@@ -13,12 +13,20 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     def set_password(self, raw_password: str) -> None:
-        from werkzeug.security import generate_password_hash
-        self.password_hash = generate_password_hash(raw_password)
+        from passwords import password_hasher
+        self.password_hash = password_hasher.hash(raw_password)
 
     def check_password(self, raw_password: str) -> bool:
-        from werkzeug.security import check_password_hash
-        return check_password_hash(self.password_hash, raw_password)
+        """Перевіряє пароль; застарілий хеш непомітно перераховується.
+
+        Після перерахунку модель змінена — коміт робить викликаючий код.
+        """
+        from passwords import password_hasher
+        if not password_hasher.verify(self.password_hash, raw_password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(raw_password)
+        return True
 
 
 class PasswordResetToken(db.Model):
@@ -54,24 +62,82 @@ class Application(db.Model):
     )
 
     owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    owner = db.relationship("User", backref="applications")
+    owner = db.relationship("User", backref="applications", foreign_keys=[owner_id])
+
+    # Черга розгляду (див. review_queue.py): хто з експертів узяв заявку і з якого
+    # моменту її знову можна брати (час подання або кінець оренди)
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    claimed_by = db.relationship("User", foreign_keys=[claimed_by_id])
+    available_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Оптимістичне блокування: кожен UPDATE з ORM додає WHERE version = <прочитана>
+    # і збільшує її; якщо рядок уже змінили, SQLAlchemy кидає StaleDataError
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     # Зв'язок з файлами
     files = db.relationship("ApplicationFile", backref="application", cascade="all, delete-orphan")
 
-    # НОВЕ: Зв'язок з історією (сортування від нових до старих)
+    # НОВЕ: Зв'язок з історією (сортування від нових до старих).
+    # Динамічний: app.history — запит, а не список, тож звернення до нього не
+    # вантажить тисячі подій; сторінки рендерять loaders.history_page()
     history = db.relationship("ApplicationHistory", backref="application", cascade="all, delete-orphan",
-                              order_by="desc(ApplicationHistory.created_at)")
+                              lazy="dynamic",
+                              order_by="desc(ApplicationHistory.created_at), desc(ApplicationHistory.id)")
+
+    __table_args__ = (
+        # my_applications: WHERE owner_id = ? ORDER BY created_at
+        db.Index("ix_applications_owner_created", "owner_id", "created_at"),
+        # expert_dashboard: WHERE status = 'submitted' ORDER BY created_at
+        db.Index("ix_applications_status_created", "status", "created_at"),
+        # черга розгляду: WHERE status = 'submitted' AND available_at <= ? ORDER BY available_at
+        db.Index("ix_applications_queue", "status", "available_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class FileBlob(db.Model):
+    """Вміст завантаженого файлу, адресований SHA-256 (див. file_store.py).
+
+    Однакові документи, прикріплені до різних заявок, зберігаються один раз;
+    refcount — скільки записів ApplicationFile на нього посилаються.
+    """
+    __tablename__ = 'file_blobs'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
 
 class ApplicationFile(db.Model):
     """Файл, прикріплений до заявки."""
     __tablename__ = 'application_files'
     id = db.Column(db.Integer, primary_key=True)
+    # Ім'я, яке бачить користувач. Для файлів, завантажених до появи сховища
+    # (blob_sha256 IS NULL), це ще й ім'я на диску: app_<id>_<ім'я>
     filename = db.Column(db.String(255), nullable=False)
 
-    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False, index=True)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey("file_blobs.sha256"), nullable=True, index=True)
+    blob = db.relationship("FileBlob")
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class UploadSession(db.Model):
+    """Незавершене відновлюване завантаження файлу до заявки (див. resumable.py).
+
+    Байти, що вже надійшли, лежать у UPLOAD_FOLDER/.partial/<id>;
+    received — скільки з них підтверджено (з цього місця клієнт продовжує).
+    """
+    __tablename__ = 'upload_sessions'
+    id = db.Column(db.String(32), primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False, index=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    length = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    application = db.relationship("Application")
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
 
 class ApplicationHistory(db.Model):
@@ -87,10 +153,132 @@ class ApplicationHistory(db.Model):
     # Тип події: 'created', 'edited', 'status_change'
     event_type = db.Column(db.String(50), nullable=False)
 
-    # Знімок даних на момент зміни
-    snapshot_title = db.Column(db.String(255), nullable=True)
-    snapshot_description = db.Column(db.Text, nullable=True)
+    # Знімок даних на момент зміни. Статус — окремим стовпцем (по ньому
+    # рахує analytics.py), решта — ключовим кадром або дельтою в snapshot_data
+    # (див. history_store.py). Старі стовпці лишаються для рядків, записаних
+    # до стиснення; `flask compress-history` їх переносить.
     snapshot_status = db.Column(db.String(50), nullable=True)
-    snapshot_comment = db.Column(db.Text, nullable=True)
+    snapshot_data = db.Column(db.LargeBinary, nullable=True)
+    _legacy_title = db.Column("snapshot_title", db.String(255), nullable=True)
+    _legacy_description = db.Column("snapshot_description", db.Text, nullable=True)
+    _legacy_comment = db.Column("snapshot_comment", db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # loaders.history_page: WHERE application_id = ? ORDER BY created_at DESC, id DESC
+        db.Index("ix_application_history_app_created", "application_id", "created_at"),
+        # Відновлення дельт: WHERE application_id = ? AND id BETWEEN кадр AND подія
+        db.Index("ix_application_history_app_id", "application_id", "id"),
+    )
+
+    def _snapshot(self):
+        import history_store
+        return history_store.snapshot_of(self)
+
+    # Поля знімка відновлюються ліниво, лише коли їх читають. Запис іде
+    # у старі стовпці — так створюються рядки без стиснення (тести, імпорт).
+    @property
+    def snapshot_title(self):
+        return self._snapshot().title
+
+    @snapshot_title.setter
+    def snapshot_title(self, value):
+        self._legacy_title = value
+
+    @property
+    def snapshot_description(self):
+        return self._snapshot().description
+
+    @snapshot_description.setter
+    def snapshot_description(self, value):
+        self._legacy_description = value
+
+    @property
+    def snapshot_comment(self):
+        return self._snapshot().comment
+
+    @snapshot_comment.setter
+    def snapshot_comment(self, value):
+        self._legacy_comment = value
+
+
+class OutboxEmail(db.Model):
+    """Лист у черзі на відправку (outbox).
+
+    Маршрути лише додають рядок у цю таблицю, а фонові воркери
+    (`mail_queue.MailWorkerPool`) забирають його та відправляють через SMTP.
+    """
+    __tablename__ = 'email_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # адреси через кому
+    body = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+
+    # pending -> sending -> sent; після вичерпання спроб -> failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Який воркер зараз обробляє лист (для відновлення після падіння)
+    locked_by = db.Column(db.String(64), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+
+class RateLimitCounter(db.Model):
+    """Спільний лічильник ковзного вікна (див. rate_limit.DatabaseBackend)."""
+    __tablename__ = 'rate_limit_counters'
+    key = db.Column(db.String(255), primary_key=True)
+    window_index = db.Column(db.Integer, nullable=False, index=True)
+    current_count = db.Column(db.Integer, nullable=False, default=0)
+    previous_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Counter(db.Model):
+    """Іменований лічильник, що оновлюється разом зі змінами (див. counters.py)."""
+    __tablename__ = 'counters'
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnalyticsRollup(db.Model):
+    """Денний агрегат для /admin/analytics (див. analytics.py).
+
+    metric: 'submissions' (key = 0), 'decisions' (key = id експерта),
+    'latency' (key = номер логарифмічного кошика часу до рішення).
+    """
+    __tablename__ = 'analytics_rollups'
+    metric = db.Column(db.String(20), primary_key=True)
+    day = db.Column(db.Integer, primary_key=True)  # днів від 1970-01-01 (UTC)
+    key = db.Column(db.Integer, primary_key=True, default=0)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnalyticsOpenSubmission(db.Model):
+    """Заявка, подана на розгляд, але ще без рішення (стан між запусками rollup)."""
+    __tablename__ = 'analytics_open_submissions'
+    application_id = db.Column(db.Integer, primary_key=True)
+    submitted_ts = db.Column(db.Float, nullable=False)  # секунди epoch (UTC)
+
+
+class ApplicationMinHash(db.Model):
+    """MinHash-підпис тексту заявки (див. duplicates.py)."""
+    __tablename__ = 'application_minhash'
+    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)  # NUM_PERM x uint32
+
 
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+class ApplicationLSHBand(db.Model):
+    """Кошик LSH: заявки з однаковою смугою підпису потрапляють в один bucket."""
+    __tablename__ = 'application_lsh_bands'
+    bucket = db.Column(db.BigInteger, primary_key=True)  # хеш (номер смуги, значення смуги)
+    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), primary_key=True, index=True)
@@ -0,0 +1,116 @@
+"""Курсорна (keyset) пагінація для списків.
+
+Замість OFFSET запит продовжується від ключа останнього показаного рядка:
+
+    WHERE (created_at, id) > (:created_at, :id) ORDER BY created_at, id LIMIT :n
+
+Тож будь-яка сторінка коштує один пошук по індексу + n рядків, незалежно
+від того, наскільки глибоко користувач догортав, а вставки нових рядків
+не зсувають уже показані сторінки. Курсор — це значення ключа,
+закодовані в base64 (`?after=...` або `?before=...`).
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import DateTime, tuple_
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, columns):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong cursor length")
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        abort(400)
+
+
+def _key(columns):
+    # Один стовпець порівнюємо напряму, кілька — як кортеж (row value)
+    return columns[0] if len(columns) == 1 else tuple_(*columns)
+
+
+def _row_key(obj, columns):
+    return [getattr(obj, col.key) for col in columns]
+
+
+def keyset_paginate(stmt, columns, after=None, before=None, page_size=None, descending=False):
+    """Повертає KeysetPage для select(Model) з порядком за `columns`.
+
+    `columns` мають однозначно впорядковувати рядки (останнім іде первинний ключ).
+    """
+    from extensions import db
+
+    page_size = page_size or current_app.config.get("PAGE_SIZE", 20)
+    key = _key(columns)
+    backwards = before is not None
+
+    if after is not None:
+        values = decode_cursor(after, columns)
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        stmt = stmt.where(key < bound if descending else key > bound)
+    elif backwards:
+        values = decode_cursor(before, columns)
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        stmt = stmt.where(key > bound if descending else key < bound)
+
+    # Назад ідемо у зворотному порядку, а потім розвертаємо результат
+    reverse = descending != backwards
+    stmt = stmt.order_by(*[col.desc() if reverse else col.asc() for col in columns])
+    rows = db.session.execute(stmt.limit(page_size + 1)).scalars().all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage([])
+
+    first, last = encode_cursor(_row_key(rows[0], columns)), encode_cursor(_row_key(rows[-1], columns))
+    if backwards:
+        return KeysetPage(rows, next_cursor=last, prev_cursor=first if has_more else None)
+    return KeysetPage(rows, next_cursor=last if has_more else None,
+                      prev_cursor=first if after is not None else None)
+
+
+def paginate_request(stmt, columns, descending=False):
+    """keyset_paginate з курсорами з рядка запиту (?after=... / ?before=...)."""
+    return keyset_paginate(
+        stmt, columns,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        descending=descending,
+    )
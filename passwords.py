@@ -0,0 +1,155 @@
+"""Хешування та перевірка паролів в окремому пулі процесів.
+
+KDF Werkzeug (scrypt/pbkdf2) навмисно повільний. Якщо рахувати його в потоці
+запиту, хвиля логінів тримає GIL і воркери WSGI, і решта сторінок стоїть.
+Тут обчислення винесено в ProcessPoolExecutor, а кількість одночасних
+запитів обмежена семафором: хто не дочекався місця за
+PASSWORD_HASH_QUEUE_TIMEOUT секунд, отримує PasswordHashBusy (відповідь 503).
+
+Налаштування (app.config):
+    PASSWORD_HASH_METHOD        — поточна політика, напр. "scrypt" або "pbkdf2:sha256:600000"
+    PASSWORD_HASH_WORKERS       — кількість процесів; 0 — рахувати в поточному потоці
+    PASSWORD_HASH_MAX_PENDING   — скільки операцій можуть одночасно чекати/виконуватись
+    PASSWORD_HASH_QUEUE_TIMEOUT — скільки секунд чекати на вільне місце
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULTS = {
+    "PASSWORD_HASH_METHOD": "scrypt",
+    "PASSWORD_HASH_WORKERS": 2,
+    "PASSWORD_HASH_MAX_PENDING": 8,
+    "PASSWORD_HASH_QUEUE_TIMEOUT": 5.0,
+}
+
+
+class PasswordHashBusy(Exception):
+    """Усі місця в черзі хешування зайняті довше за дозволений час."""
+
+
+# --- Функції, що виконуються у процесах пулу ---
+
+def _hash_job(password, method):
+    started = time.time()
+    return started, generate_password_hash(password, method=method)
+
+
+def _verify_job(pwhash, password):
+    started = time.time()
+    return started, check_password_hash(pwhash, password)
+
+
+def _policy_prefix(method):
+    # "scrypt" -> "scrypt:32768:8:1": Werkzeug дописує параметри за замовчуванням
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_workers = None
+        self._slots = None
+        self._slots_size = None
+        self._policy = {}
+
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.run_time_total = 0.0
+
+    def _settings(self):
+        from flask import current_app, has_app_context
+        cfg = current_app.config if has_app_context() else {}
+        return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+    def _get_slots(self, size):
+        with self._lock:
+            if self._slots is None or self._slots_size != size:
+                self._slots = threading.BoundedSemaphore(size)
+                self._slots_size = size
+            return self._slots
+
+    def _get_executor(self, workers):
+        with self._lock:
+            if self._executor is None or self._executor_workers != workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                # spawn: дочірні процеси не успадковують потоки та з'єднання з БД
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._executor_workers = workers
+            return self._executor
+
+    def _run(self, job, *args):
+        settings = self._settings()
+        requested = time.time()
+        slots = self._get_slots(settings["PASSWORD_HASH_MAX_PENDING"])
+        if not slots.acquire(timeout=settings["PASSWORD_HASH_QUEUE_TIMEOUT"]):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHashBusy()
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            workers = settings["PASSWORD_HASH_WORKERS"]
+            if workers:
+                started, result = self._get_executor(workers).submit(job, *args).result()
+            else:
+                started, result = job(*args)
+            finished = time.time()
+        finally:
+            slots.release()
+            with self._lock:
+                self.in_flight -= 1
+
+        queued = max(0.0, started - requested)
+        with self._lock:
+            self.completed += 1
+            self.queue_time_total += queued
+            self.queue_time_max = max(self.queue_time_max, queued)
+            self.run_time_total += finished - started
+        return result
+
+    # --- Публічний API ---
+
+    def hash(self, password):
+        return self._run(_hash_job, password, self._settings()["PASSWORD_HASH_METHOD"])
+
+    def verify(self, pwhash, password):
+        return self._run(_verify_job, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Чи створено хеш за старішою політикою, ніж PASSWORD_HASH_METHOD."""
+        method = self._settings()["PASSWORD_HASH_METHOD"]
+        if method not in self._policy:
+            self._policy[method] = _policy_prefix(method)
+        return pwhash.split("$", 1)[0] != self._policy[method]
+
+    def stats(self):
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "avg_queue_ms": self.queue_time_total / done * 1000,
+                "max_queue_ms": self.queue_time_max * 1000,
+                "avg_run_ms": self.run_time_total / done * 1000,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.completed = self.rejected = 0
+            self.queue_time_total = self.queue_time_max = self.run_time_total = 0.0
+
+
+password_hasher = PasswordHasher()
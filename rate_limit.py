@@ -0,0 +1,161 @@
+"""Обмеження частоти запитів (ковзне вікно) для логіну та відновлення пароля.
+
+Лічильник на ключ — лише три числа: номер поточного вікна, кількість
+спроб у ньому та в попередньому. Оцінка для ковзного вікна:
+
+    previous * (частка попереднього вікна, що ще "в кадрі") + current
+
+Бекенди:
+    MemoryBackend   — словник у процесі, обмежений RATELIMIT_MAX_KEYS (LRU);
+    DatabaseBackend — таблиця rate_limit_counters у спільній БД, тож кілька
+                      воркер-процесів мають один бюджет на ключ.
+
+Перевірка робиться на початку обробника — до хешування пароля й запитів до БД
+(для DatabaseBackend це один атомарний UPSERT в окремій транзакції).
+"""
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+DEFAULTS = {
+    "RATELIMIT_ENABLED": True,
+    "RATELIMIT_BACKEND": "memory",  # memory | database
+    "RATELIMIT_MAX_KEYS": 100000,
+    # (кількість спроб, вікно в секундах)
+    "RATELIMIT_LOGIN_PER_IP": (20, 60),
+    "RATELIMIT_LOGIN_PER_EMAIL": (5, 60),
+    "RATELIMIT_RESET_PER_IP": (5, 300),
+    "RATELIMIT_RESET_PER_EMAIL": (3, 3600),
+}
+
+
+def sliding_estimate(current, previous, now, window):
+    elapsed = (now % window) / window
+    return previous * (1.0 - elapsed) + current
+
+
+def retry_after(current, previous, now, window, limit):
+    """Через скільки секунд наступна спроба вкладеться в ліміт.
+
+    Відхилена спроба теж рахується, а повтор додасть ще одну. У поточному вікні:
+    previous * (1 - t/window) + current + 1 <= limit; у наступному (поточне стане
+    "попереднім"): current * (1 - t/window) + 1 <= limit.
+    """
+    offset = now % window
+    if previous and current < limit:
+        wait = math.ceil(window * (1.0 - (limit - current - 1) / previous) - offset)
+        if offset + wait < window:
+            return max(1, wait)
+    # Кінець поточного вікна плюс час, поки його спроби "вийдуть з кадру"
+    wait = window - offset + window * max(0.0, 1.0 - (limit - 1) / current)
+    return max(1, math.ceil(wait))
+
+
+class MemoryBackend:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._data = OrderedDict()  # key -> [window_index, current, previous]
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, now):
+        index = int(now // window)
+        with self._lock:
+            counter = self._data.get(key)
+            if counter is None or counter[0] < index - 1:
+                counter = [index, 0, 0]
+            elif counter[0] == index - 1:
+                counter = [index, 0, counter[1]]
+            counter[1] += 1
+            self._data[key] = counter
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return counter[1], counter[2]
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DatabaseBackend:
+    """Лічильники в таблиці rate_limit_counters (модель RateLimitCounter)."""
+
+    UPSERT = text("""
+        INSERT INTO rate_limit_counters (key, window_index, current_count, previous_count)
+        VALUES (:key, :index, 1, 0)
+        ON CONFLICT (key) DO UPDATE SET
+            previous_count = CASE
+                WHEN window_index = :index THEN previous_count
+                WHEN window_index = :index - 1 THEN current_count
+                ELSE 0 END,
+            current_count = CASE WHEN window_index = :index THEN current_count + 1 ELSE 1 END,
+            window_index = :index
+        RETURNING current_count, previous_count
+    """)
+
+    def __init__(self, cleanup_probability=0.01):
+        self.cleanup_probability = cleanup_probability
+
+    def hit(self, key, window, now):
+        from extensions import db
+        index = int(now // window)
+        # Окрема транзакція: не чіпаємо сесію запиту
+        with db.engine.begin() as conn:
+            current, previous = conn.execute(self.UPSERT, {"key": key, "index": index}).one()
+            if random.random() < self.cleanup_probability:
+                # Прибираємо ключі, що не оновлювалися два вікна (обмежує розмір таблиці)
+                conn.execute(text("DELETE FROM rate_limit_counters WHERE window_index < :stale"),
+                             {"stale": index - 1})
+        return current, previous
+
+    def reset(self):
+        from extensions import db
+        with db.engine.begin() as conn:
+            conn.execute(text("DELETE FROM rate_limit_counters"))
+
+
+class RateLimiter:
+    def __init__(self):
+        self._memory = None
+
+    def _settings(self):
+        from flask import current_app
+        return {key: current_app.config.get(key, default) for key, default in DEFAULTS.items()}
+
+    def _backend(self, settings):
+        if settings["RATELIMIT_BACKEND"] == "database":
+            return DatabaseBackend()
+        if self._memory is None:
+            self._memory = MemoryBackend(settings["RATELIMIT_MAX_KEYS"])
+        self._memory.max_keys = settings["RATELIMIT_MAX_KEYS"]
+        return self._memory
+
+    def check(self, scope, ip=None, email=None):
+        """Рахує спробу. Повертає None, якщо можна, або кількість секунд до повтору."""
+        settings = self._settings()
+        if not settings["RATELIMIT_ENABLED"]:
+            return None
+
+        backend = self._backend(settings)
+        now = time.time()
+        wait = 0
+        prefix = scope.upper()
+        for kind, value in (("IP", ip), ("EMAIL", email)):
+            if not value:
+                continue
+            limit, window = settings[f"RATELIMIT_{prefix}_PER_{kind}"]
+            current, previous = backend.hit(f"{scope}:{kind.lower()}:{value.lower()}", window, now)
+            if sliding_estimate(current, previous, now, window) > limit:
+                wait = max(wait, retry_after(current, previous, now, window, limit))
+        return wait or None
+
+    def reset(self):
+        if self._memory is not None:
+            self._memory.reset()
+
+
+rate_limiter = RateLimiter()
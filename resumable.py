@@ -0,0 +1,210 @@
+"""Відновлювані завантаження великих файлів (протокол у дусі tus).
+
+Форма заявки надсилає файли одним multipart-запитом до MAX_CONTENT_LENGTH:
+якщо зв'язок обірвався на 90 %, користувач починає спочатку. Тут файл
+передається частинами в межах сесії завантаження (маршрути — upload_routes.py):
+
+    POST   /applications/<id>/uploads      Upload-Length, Upload-Metadata: filename <base64>
+                                           → 201, Location: /upload-sessions/<token>
+    HEAD   /upload-sessions/<token>        → Upload-Offset: скільки байтів уже прийнято
+    PATCH  /upload-sessions/<token>        Upload-Offset: n, тіло — байти з позиції n
+           (PUT — те саме)                 → 204, Upload-Offset: нове значення
+    POST   /upload-sessions/<token>/finish → 201, файл прикріплено до заявки
+    DELETE /upload-sessions/<token>        → 204, сесію скасовано
+
+Після обриву клієнт питає HEAD і досилає лише відсутнє. Частина пишеться
+саме з вказаного зсуву, тож повтор уже прийнятої частини (коли загубилася
+відповідь) нічого не псує: ті самі байти лягають на те саме місце. Зсув,
+більший за прийняте, — 409: між ними лишилася б дірка.
+
+Тіло запиту читається порціями FILE_STORE_CHUNK_SIZE прямо в
+UPLOAD_FOLDER/.partial/<token> — пам'ять на запит стала. Запити до однієї
+сесії серіалізує flock на цьому файлі (другий паралельний отримує 423), а
+received у БД оновлюється лише після fsync, ще під блокуванням. Байти, що
+встигли лягти на диск до обриву з'єднання, теж зараховуються.
+
+Незавершені сесії, які не оновлювалися UPLOAD_SESSION_TTL секунд,
+прибирає `flask uploads-expire`.
+"""
+import fcntl
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+from werkzeug.exceptions import ClientDisconnected, Conflict, Locked, RequestEntityTooLarge
+
+import file_store
+from extensions import db
+from models import UploadSession
+
+DEFAULTS = {
+    "FILE_STORE_CHUNK_SIZE": 1024 * 1024,
+    "UPLOAD_SESSION_MAX_SIZE": 1024 * 1024 * 1024,
+    "UPLOAD_SESSION_TTL": 24 * 3600,
+}
+
+
+class OffsetMismatch(Conflict):
+    """Частина починається не там, де закінчуються прийняті байти."""
+
+
+class UploadIncomplete(Conflict):
+    """Завершити можна лише завантаження, в якому прийнято всі Upload-Length байтів."""
+
+
+class SessionBusy(Locked):
+    """У цю сесію зараз пише інший запит."""
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    """Файл більший за UPLOAD_SESSION_MAX_SIZE або тіло виходить за Upload-Length."""
+
+
+def _settings():
+    cfg = current_app.config if has_app_context() else {}
+    return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def _utcnow():
+    # Як і в review_queue.py: SQLite зберігає час без поясу
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def max_size():
+    return _settings()["UPLOAD_SESSION_MAX_SIZE"]
+
+
+def partial_path(token):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], ".partial", token)
+
+
+def open_count(application_id):
+    """Скільки незавершених завантажень у заявки (займають місця з ліміту файлів)."""
+    return db.session.scalar(
+        select(func.count(UploadSession.id)).where(UploadSession.application_id == application_id)
+    )
+
+
+def start(application_id, owner_id, filename, length):
+    """Відкриває сесію завантаження файлу довжиною length байтів."""
+    limit = max_size()
+    if limit is not None and length > limit:
+        raise UploadTooLarge()
+    upload = UploadSession(id=secrets.token_hex(16), application_id=application_id, owner_id=owner_id,
+                           filename=filename, length=length, received=0)
+    path = partial_path(upload.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "xb").close()
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+class _locked:
+    """flock на файлі сесії; без очікування — зайнята сесія дає SessionBusy (423)."""
+
+    def __init__(self, upload):
+        self.upload = upload
+
+    def __enter__(self):
+        self.file = open(partial_path(self.upload.id), "r+b")
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.file.close()
+            raise SessionBusy()
+        # Під блокуванням — свіжий стан: попередній запит міг щойно закомітити received
+        db.session.refresh(self.upload)
+        return self.file
+
+    def __exit__(self, *exc):
+        self.file.close()  # знімає flock
+
+
+def write(upload, offset, stream):
+    """Пише тіло запиту в сесію з позиції offset. Повертає нове значення received."""
+    if offset > upload.received:
+        raise OffsetMismatch()
+    chunk_size = _settings()["FILE_STORE_CHUNK_SIZE"]
+    with _locked(upload) as f:
+        if offset > upload.received:
+            raise OffsetMismatch()
+        # Хвіст від обірваного запиту, якого немає в БД, — відкидаємо
+        f.truncate(upload.received)
+        f.seek(offset)
+        position, disconnected = offset, None
+        try:
+            while chunk := stream.read(chunk_size):
+                if position + len(chunk) > upload.length:
+                    raise UploadTooLarge()
+                f.write(chunk)
+                position += len(chunk)
+        except ClientDisconnected as e:
+            disconnected = e
+        f.flush()
+        os.fsync(f.fileno())
+        upload.received = max(upload.received, position)
+        upload.updated_at = _utcnow()
+        db.session.commit()
+    if disconnected is not None:
+        raise disconnected
+    return upload.received
+
+
+def finish(upload):
+    """Прикріплює зібраний файл до заявки й закриває сесію. Повертає ApplicationFile.
+
+    Частковий файл прибирається лише після commit: якщо прикріпити не
+    вдалося, сесія лишається як була, і finish можна повторити.
+    """
+    with _locked(upload):
+        if upload.received != upload.length:
+            raise UploadIncomplete()
+        try:
+            record = file_store.adopt(upload.application_id, upload.filename, partial_path(upload.id))
+            db.session.delete(upload)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        _discard(upload.id)
+    return record
+
+
+def cancel(upload):
+    try:
+        with _locked(upload):
+            db.session.delete(upload)
+            db.session.commit()
+            _discard(upload.id)
+    except FileNotFoundError:
+        # Часткового файлу вже немає — блокувати нічого, лишається сам рядок
+        db.session.delete(upload)
+        db.session.commit()
+
+
+def _discard(token):
+    try:
+        os.remove(partial_path(token))
+    except FileNotFoundError:
+        pass
+
+
+def expire(ttl=None):
+    """Видаляє сесії, які не оновлювалися ttl секунд (за замовчуванням UPLOAD_SESSION_TTL).
+
+    Сесії, в які саме зараз пишуть, пропускаються. Повертає кількість видалених.
+    """
+    ttl = _settings()["UPLOAD_SESSION_TTL"] if ttl is None else ttl
+    cutoff = _utcnow() - timedelta(seconds=ttl)
+    stale = db.session.execute(select(UploadSession).where(UploadSession.updated_at < cutoff)).scalars().all()
+    removed = 0
+    for upload in stale:
+        try:
+            cancel(upload)
+        except SessionBusy:
+            continue
+        removed += 1
+    return removed
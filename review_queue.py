@@ -0,0 +1,130 @@
+"""Черга розгляду заявок з орендою (lease).
+
+Раніше кожен експерт бачив той самий список поданих заявок, і двоє могли
+одночасно розглядати одну заявку — перемагав останній запис. Тепер заявку
+треба взяти: експерт отримує оренду на REVIEW_LEASE_SECONDS, і поки вона
+діє, інші експерти цю заявку не отримають і рішення по ній не збережуть.
+Кинута робота повертається в чергу сама, щойно оренда спливає.
+
+Стан черги — два стовпці applications:
+
+    claimed_by_id — хто з експертів узяв заявку останнім;
+    available_at  — з якого моменту заявку можна брати: час подання,
+                    а для взятої — кінець оренди.
+
+Заявка вільна, якщо status = 'submitted' AND available_at <= now. Індекс
+(status, available_at) дає і фільтр, і порядок, тож "наступні N" — це
+пошук у B-дереві плюс N рядків, скільки б заявок і експертів не було.
+Взяття — один UPDATE ... WHERE id IN (SELECT ... LIMIT n) RETURNING id:
+SQLite виконує його під блокуванням запису, і дві паралельні спроби не
+отримають одну заявку.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text, update
+
+from extensions import db
+from models import Application
+
+DEFAULTS = {
+    "REVIEW_LEASE_SECONDS": 30 * 60,
+    "REVIEW_CLAIM_BATCH": 5,
+}
+
+
+def _utcnow():
+    # SQLite зберігає дати без часової зони, тому порівнюємо з "наївним" UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _settings():
+    from flask import current_app, has_app_context
+    cfg = current_app.config if has_app_context() else {}
+    return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def _lease(expert_id, where, now):
+    """UPDATE, що видає оренду; повертає id взятих заявок. Коміт — тут же."""
+    until = now + timedelta(seconds=_settings()["REVIEW_LEASE_SECONDS"])
+    claimed = db.session.execute(
+        update(Application)
+        .where(*where)
+        # Оренда — не зміна заявки: updated_at лишаємо як є
+        .values(claimed_by_id=expert_id, available_at=until, updated_at=Application.updated_at)
+        .returning(Application.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return claimed
+
+
+def available(expert_id, now):
+    """Вільні заявки, які цей експерт може взяти, у порядку черги."""
+    return (
+        select(Application.id)
+        .where(Application.status == "submitted", Application.available_at <= now,
+               Application.owner_id != expert_id)
+        .order_by(Application.available_at)
+    )
+
+
+def claim_next(expert_id, count=None):
+    """Атомарно бере до `count` наступних вільних заявок. Повертає їхні id."""
+    now = _utcnow()
+    count = count or _settings()["REVIEW_CLAIM_BATCH"]
+    return _lease(expert_id, [Application.id.in_(available(expert_id, now).limit(count).scalar_subquery())], now)
+
+
+def claim(application_id, expert_id):
+    """Бере конкретну заявку або продовжує власну оренду. True — заявка за експертом."""
+    now = _utcnow()
+    return bool(_lease(expert_id, [
+        Application.id == application_id,
+        Application.status == "submitted",
+        Application.owner_id != expert_id,
+        (Application.claimed_by_id == expert_id) | (Application.available_at <= now),
+    ], now))
+
+
+def release(application_id, expert_id):
+    """Повертає свою заявку в чергу, не чекаючи кінця оренди."""
+    released = db.session.execute(
+        update(Application)
+        .where(Application.id == application_id, Application.claimed_by_id == expert_id,
+               Application.status == "submitted")
+        .values(claimed_by_id=None, available_at=_utcnow(), updated_at=Application.updated_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return bool(released)
+
+
+def leases(expert_id):
+    """Заявки, які експерт зараз тримає, — від тієї, чия оренда спливає першою."""
+    return db.session.execute(
+        select(Application)
+        .where(Application.status == "submitted", Application.available_at > _utcnow(),
+               Application.claimed_by_id == expert_id)
+        .order_by(Application.available_at)
+    ).scalars().all()
+
+
+def enqueue(app_obj):
+    """Ставить заявку в кінець черги (при поданні). Коміт робить викликаючий код."""
+    app_obj.claimed_by_id = None
+    app_obj.available_at = _utcnow()
+
+
+def holder(app_obj):
+    """id експерта з чинною орендою або None."""
+    if (app_obj.status == "submitted" and app_obj.claimed_by_id
+            and app_obj.available_at.replace(tzinfo=None) > _utcnow()):
+        return app_obj.claimed_by_id
+    return None
+
+
+def backfill(connection):
+    """Заявки з бази, створеної до появи черги, стають у чергу за часом подання."""
+    connection.execute(text(
+        "UPDATE applications SET available_at = coalesce(updated_at, created_at) WHERE available_at IS NULL"
+    ))
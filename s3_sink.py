@@ -0,0 +1,162 @@
+"""Локальна S3-сумісна заглушка для тестів і вимірювань storage.S3Storage.
+
+Підтримує те, чим користується застосунок: PUT, GET (з Range), HEAD і
+DELETE об'єктів за path-style адресою /<bucket>/<key>. Кожен запит
+перевіряється як справжнім S3: підпис Signature V4 перераховується з
+отриманих заголовків (чужий ключ чи не той заголовок — 403), а хеш тіла
+PUT звіряється з x-amz-content-sha256 (400 при розбіжності). Об'єкти
+зберігаються в пам'яті. Параметр `latency` імітує мережеву затримку.
+
+Запуск окремим процесом:
+    python s3_sink.py --port 9000
+"""
+import argparse
+import hashlib
+import http.server
+import re
+import threading
+import time
+
+from storage import sign_v4
+
+_AUTH = re.compile(r"AWS4-HMAC-SHA256 Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request, "
+                   r"SignedHeaders=([^,]+), Signature=([0-9a-f]{64})")
+
+
+class _S3Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _authorized(self):
+        sink = self.server.sink
+        match = _AUTH.fullmatch(self.headers.get("Authorization", ""))
+        if not match or match.group(1) != sink.access_key:
+            return False
+        _, _, region, signed, signature = match.groups()
+        headers = {name: self.headers.get(name, "") for name in signed.split(";")}
+        expected = sign_v4(self.command, self.path, "", headers, self.headers.get("x-amz-content-sha256", ""),
+                           access_key=sink.access_key, secret_key=sink.secret_key, region=region,
+                           service="s3", amz_date=self.headers.get("x-amz-date", ""))
+        return expected.endswith(signature) and "host" in headers and "x-amz-content-sha256" in headers
+
+    def _handle(self):
+        sink = self.server.sink
+        if sink.latency:
+            time.sleep(sink.latency)
+        body = b""
+        if self.command == "PUT":
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with sink.lock:
+            sink.requests.append((self.command, self.path))
+        if not self._authorized():
+            return self._reply(403, b"SignatureDoesNotMatch")
+
+        if self.command == "PUT":
+            if self.headers.get("x-amz-content-sha256") != hashlib.sha256(body).hexdigest():
+                return self._reply(400, b"XAmzContentSHA256Mismatch")
+            with sink.lock:
+                sink.objects[self.path] = body
+            return self._reply(200)
+        with sink.lock:
+            data = sink.objects.get(self.path)
+            if self.command == "DELETE":
+                sink.objects.pop(self.path, None)
+        if self.command == "DELETE":
+            return self._reply(204)
+        if data is None:
+            return self._reply(404, b"NoSuchKey")
+        if self.command == "HEAD":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            return None
+        start = 0
+        if match := re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", "")):
+            start = int(match.group(1))
+            return self._reply(206, data[start:], {"Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"})
+        return self._reply(200, data)
+
+    do_GET = do_HEAD = do_PUT = do_DELETE = _handle
+
+
+class _ThreadingServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class S3Sink:
+    """S3-заглушка у фоновому потоці. Порт 0 — обрати вільний автоматично."""
+
+    def __init__(self, host="127.0.0.1", port=0, bucket="uploads", access_key="test-key",
+                 secret_key="test-secret", latency=0.0):
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.requests = []
+
+        self._server = _ThreadingServer((host, port), _S3Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def keys(self):
+        prefix = f"/{self.bucket}/"
+        with self.lock:
+            return sorted(path[len(prefix):] for path in self.objects if path.startswith(prefix))
+
+    def storage_config(self):
+        """Налаштування застосунку для FILE_STORAGE_BACKEND = "s3" на цій заглушці."""
+        return {
+            "S3_ENDPOINT": f"http://{self.host}:{self.port}",
+            "S3_BUCKET": self.bucket,
+            "S3_ACCESS_KEY": self.access_key,
+            "S3_SECRET_KEY": self.secret_key,
+            "S3_REGION": "us-east-1",
+            "S3_PREFIX": "",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальна S3-заглушка")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--bucket", default="uploads")
+    parser.add_argument("--access-key", default="test-key")
+    parser.add_argument("--secret-key", default="test-secret")
+    args = parser.parse_args()
+
+    sink = S3Sink(args.host, args.port, args.bucket, args.access_key, args.secret_key)
+    print(f"S3-заглушка слухає http://{sink.host}:{sink.port}/{sink.bucket}/ (ключ {sink.access_key})")
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nОб'єктів: {len(sink.objects)}, запитів: {len(sink.requests)}")
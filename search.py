@@ -0,0 +1,119 @@
+"""Повнотекстовий пошук заявок (SQLite FTS5).
+
+Віртуальна таблиця applications_fts — індекс із зовнішнім вмістом
+(content='applications'): сам текст не дублюється, зберігаються лише
+інвертовані списки для title, short_description та expert_comment.
+Тригери на applications оновлюють індекс у тій же транзакції, що й зміну
+заявки, тож окремої синхронізації не потрібно.
+
+Пошук іде по інвертованому індексу, а не обходом таблиці. Порядок —
+bm25 з вагами колонок (назва важить найбільше) по всіх збігах, тож
+найкращий збіг знаходиться незалежно від віку заявки. Ціна — bm25 для
+кожного збігу: для частих слів час росте з довжиною їхнього
+інвертованого списку (див. benchmarks/bench_search.py), а глибина
+гортання обмежена MAX_PAGE сторінками.
+
+Для бази, створеної до появи пошуку, `flask init-db` створює таблицю
+і будує індекс з наявних заявок (`ensure_index`).
+"""
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, DateTime, Integer, String, event, text
+
+from models import Application
+
+# Назва важить найбільше, потім опис, потім коментар експерта
+RANK = "bm25(10.0, 3.0, 1.0)"
+MAX_TERMS = 8
+# Глибше за цю сторінку не гортаємо: OFFSET змушує оцінити всі попередні збіги
+MAX_PAGE = 50
+
+_CREATE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5(
+        title, short_description, expert_comment,
+        content='applications', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS applications_fts_ai AFTER INSERT ON applications BEGIN
+        INSERT INTO applications_fts (rowid, title, short_description, expert_comment)
+        VALUES (new.id, new.title, new.short_description, new.expert_comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS applications_fts_ad AFTER DELETE ON applications BEGIN
+        INSERT INTO applications_fts (applications_fts, rowid, title, short_description, expert_comment)
+        VALUES ('delete', old.id, old.title, old.short_description, old.expert_comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS applications_fts_au
+    AFTER UPDATE OF title, short_description, expert_comment ON applications BEGIN
+        INSERT INTO applications_fts (applications_fts, rowid, title, short_description, expert_comment)
+        VALUES ('delete', old.id, old.title, old.short_description, old.expert_comment);
+        INSERT INTO applications_fts (rowid, title, short_description, expert_comment)
+        VALUES (new.id, new.title, new.short_description, new.expert_comment);
+    END""",
+    f"INSERT INTO applications_fts (applications_fts, rank) VALUES ('rank', '{RANK}')",
+]
+
+for _statement in _CREATE:
+    event.listen(Application.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+# Тригери зникають разом з applications, а віртуальну таблицю прибираємо самі
+event.listen(Application.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS applications_fts").execute_if(dialect="sqlite"))
+
+_SEARCH = text("""
+    SELECT a.id, a.title, a.status, a.created_at,
+           snippet(applications_fts, -1, char(2), char(3), '…', 16) AS fragment
+    FROM applications_fts
+    JOIN applications a ON a.id = applications_fts.rowid
+    WHERE applications_fts MATCH :query
+    ORDER BY applications_fts.rank
+    LIMIT :limit OFFSET :offset
+""").columns(id=Integer, title=String, status=String, created_at=DateTime, fragment=String)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_index(connection):
+    """Створює індекс у вже наявній базі та заповнює його. Повертає True, якщо створено."""
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'applications_fts'"
+    )).first()
+    if exists:
+        return False
+    for statement in _CREATE:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO applications_fts (applications_fts) VALUES ('rebuild')"))
+    return True
+
+
+def build_query(raw):
+    """Рядок користувача -> запит FTS5: усі слова обов'язкові, кожне — як префікс.
+
+    Префікс замість точного слова, бо стемера для української немає:
+    "алгоритм" знаходить і "алгоритми", і "алгоритму". Синтаксис FTS5
+    (лапки, NEAR, OR, *) з вводу не пропускаємо.
+    """
+    terms = _TERM.findall(raw or "")[:MAX_TERMS]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def highlight(fragment):
+    """Екранує фрагмент і замінює маркери збігів на <mark>."""
+    return Markup(str(escape(fragment or "")).replace("\x02", "<mark>").replace("\x03", "</mark>"))
+
+
+def search(raw, page=1, page_size=20):
+    """Повертає (результати, чи є наступна сторінка) для сторінки `page` (з 1)."""
+    from extensions import db
+    query = build_query(raw)
+    if not query:
+        return [], False
+    page = max(1, min(page, MAX_PAGE))
+    rows = db.session.execute(_SEARCH, {
+        "query": query, "limit": page_size + 1, "offset": (page - 1) * page_size,
+    }).all()
+    results = [
+        {"id": row.id, "title": row.title, "status": row.status,
+         "created_at": row.created_at, "fragment": highlight(row.fragment)}
+        for row in rows[:page_size]
+    ]
+    return results, len(rows) > page_size and page < MAX_PAGE
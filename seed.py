@@ -2,6 +2,7 @@ import random
 from app import app
 from extensions import db
 from models import User, Application, ApplicationFile
+import counters
 
 # --- КОНФІГУРАЦІЯ ---
 PASSWORD = "Pass1234"
@@ -76,6 +77,9 @@ def seed_data():
             db.session.add(fake_file)
 
         db.session.commit()
+
+        # Заявки створено напряму, без save_history — перераховуємо статистику
+        counters.rebuild()
         print("\n>>> ЗАВЕРШЕНО! База даних готова.")
 
 
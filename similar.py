@@ -0,0 +1,408 @@
+"""Схожі розглянуті заявки: хешований TF-IDF і косинусна близькість.
+
+Текст заявки (назва + короткий опис) розбивається на слова; кожне слово
+обрізається до STEM символів (грубий стемінг: "алгоритми" і "алгоритму"
+дають одну ознаку) і хешується в одну з DIM ознак. Вага ознаки —
+(1 + log tf) * idf, вектор нормується, тож скалярний добуток двох
+векторів — косинус між ними.
+
+Індекс складається з двох частин:
+
+    сегмент — стиснута матриця, яку будує `flask similar-compact`: для
+              кожної ознаки список документів і ваг (CSC, float16), файли
+              .npy в SIMILAR_INDEX_DIR відкриваються через mmap і спільні
+              для всіх процесів через кеш сторінок ОС;
+    дельта  — зміни після побудови сегмента. Маршрути створення,
+              редагування, подання та рішення експерта пишуть подію в
+              application_history (save_history); кожен процес дочитує
+              нові події від high-water mark сегмента і тримає вектори
+              змінених заявок у пам'яті, а їхні рядки в сегменті вважає
+              застарілими.
+
+Запит не обходить усі документи: сумуються лише списки документів для
+ознак запиту (часті ознаки, що трапляються більш ніж у MAX_DF документів,
+пропускаються — їхній внесок у косинус мізерний, а списки найдовші).
+Кілька запитів рахуються однією пачкою через np.bincount.
+
+Компактизацію варто запускати періодично (`--loop`): дельта росте, і
+idf у ній рахується за статистикою старого сегмента. Новий сегмент
+пишеться в прихований каталог .build-<покоління> і з'являється під своїм
+ім'ям одним rename, лише потім на нього перемикається CURRENT. Попереднє
+покоління не видаляється одразу: процес міг щойно прочитати CURRENT і
+ще відкривати файли. Прибираються лише покоління, старші за
+SIMILAR_GENERATION_GRACE секунд (крім поточного й попереднього), а
+refresh(), якщо каталог усе ж зник, перечитує CURRENT або лишається на
+вже відкритому сегменті.
+
+refresh() працює всередині запиту, тож дельта обмежена: з нових подій
+береться лише остання для кожної заявки, а якщо їх більше за
+SIMILAR_REFRESH_MAX_EVENTS (свіже розгортання без сегмента, зупинена
+компактизація), процес лишається на старому стані й пише попередження —
+наздоганяти має `flask similar-compact`, а не запит.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+
+import numpy as np
+from sqlalchemy import select, text
+
+DEFAULTS = {
+    "SIMILAR_INDEX_DIR": None,  # None — <instance>/similar
+    "SIMILAR_COMPACT_INTERVAL": 600,
+    # Скільки секунд після заміни ще зберігати старі покоління сегмента
+    "SIMILAR_GENERATION_GRACE": 600,
+    # Більше нових подій запит не дочитує — чекає на компактизацію
+    "SIMILAR_REFRESH_MAX_EVENTS": 5000,
+}
+
+DIM = 1 << 20
+STEM = 6
+# Частка документів, з якої ознака вважається надто частою для запиту
+MAX_DF = 0.1
+# ...але в невеликому індексі не відкидаємо жодної ознаки
+MIN_DF_LIMIT = 1000
+# Нижче цієї схожості заявки не показуємо
+MIN_SCORE = 0.1
+DECIDED = ("approved", "rejected")
+# Скільки запитів рахувати однією матрицею (пам'ять: QUERY_BATCH x документів)
+QUERY_BATCH = 4
+
+_TOKEN = re.compile(r"\w{2,}", re.UNICODE)
+
+_FILES = ("ids", "eligible", "indptr", "postings", "weights", "idf")
+
+logger = logging.getLogger(__name__)
+
+
+def _settings():
+    from flask import current_app, has_app_context
+    cfg = current_app.config if has_app_context() else {}
+    return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def index_dir():
+    from flask import current_app
+    return _settings()["SIMILAR_INDEX_DIR"] or os.path.join(current_app.instance_path, "similar")
+
+
+def terms(texts):
+    """Частоти хешованих ознак для списку текстів.
+
+    Повертає (номер тексту, ознака, частота) — три масиви, відсортовані
+    за номером тексту, а в його межах — за ознакою.
+    """
+    lengths, hashes = [], []
+    for value in texts:
+        found = [zlib.crc32(token[:STEM].encode()) for token in _TOKEN.findall((value or "").lower())]
+        lengths.append(len(found))
+        hashes.extend(found)
+    doc = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    keys = (doc << 20) | (np.array(hashes, dtype=np.int64) & (DIM - 1))
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys >> 20, (keys & (DIM - 1)).astype(np.int32), counts
+
+
+def application_text(title, description):
+    return f"{title or ''} {description or ''}"
+
+
+def vector(value, idf):
+    """Нормований вектор тексту: (відсортовані ознаки, ваги float32)."""
+    _, cols, counts = terms([value])
+    weights = ((1.0 + np.log(counts)) * idf[cols]).astype(np.float32)
+    norm = np.sqrt(np.dot(weights, weights))
+    return cols, (weights / norm if norm else weights)
+
+
+# --- Сегмент на диску ---
+
+class _Segment:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        self.hwm = meta["hwm"]
+        for name in _FILES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    @classmethod
+    def empty(cls):
+        segment = cls.__new__(cls)
+        segment.hwm = 0
+        segment.ids = np.zeros(0, dtype=np.int64)
+        segment.eligible = np.zeros(0, dtype=bool)
+        segment.indptr = np.zeros(DIM + 1, dtype=np.int64)
+        segment.postings = np.zeros(0, dtype=np.int32)
+        segment.weights = np.zeros(0, dtype=np.float16)
+        segment.idf = np.ones(DIM, dtype=np.float32)
+        return segment
+
+
+def _current_generation(directory):
+    try:
+        with open(os.path.join(directory, "CURRENT"), encoding="utf-8") as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def compact(directory=None, batch_size=5000):
+    """Будує новий сегмент з усіх заявок і перемикає на нього індекс.
+
+    Повертає (кількість документів, high-water mark історії).
+    """
+    from extensions import db
+    from models import Application
+
+    directory = directory or index_dir()
+    ids, eligible, rows, cols, counts = [], [], [], [], []
+    offset = 0
+    with db.engine.connect() as connection:
+        # Спочатку hwm, потім заявки: зміни між ними дельта застосує ще раз
+        hwm = connection.execute(text("SELECT coalesce(max(id), 0) FROM application_history")).scalar()
+        after = 0
+        while True:
+            batch = connection.execute(
+                select(Application.id, Application.title, Application.short_description, Application.status)
+                .where(Application.id > after).order_by(Application.id).limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            doc, feature, tf = terms([application_text(r.title, r.short_description) for r in batch])
+            rows.append(doc + offset)
+            cols.append(feature)
+            counts.append(tf)
+            ids.append(np.array([r.id for r in batch], dtype=np.int64))
+            eligible.append(np.array([r.status in DECIDED for r in batch], dtype=bool))
+            after = batch[-1].id
+            offset += len(batch)
+
+    ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+    eligible = np.concatenate(eligible) if eligible else np.zeros(0, dtype=bool)
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int32)
+    counts = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+
+    df = np.bincount(cols, minlength=DIM)
+    idf = (np.log((len(ids) + 1) / (df + 1)) + 1.0).astype(np.float32)
+    weights = (1.0 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(ids)))
+    weights /= norms[rows]
+
+    # Транспонуємо: документи кожної ознаки лежать поруч
+    order = np.argsort(cols, kind="stable")
+    arrays = {
+        "ids": ids,
+        "eligible": eligible,
+        "indptr": np.concatenate([[0], np.cumsum(df)]).astype(np.int64),
+        "postings": rows[order].astype(np.int32),
+        "weights": weights[order].astype(np.float16),
+        "idf": idf,
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    # pid — щоб дві одночасні компактизації не писали в один каталог
+    generation = f"{hwm}-{time.time_ns()}-{os.getpid()}"
+    build = os.path.join(directory, f".build-{generation}")
+    os.makedirs(build)
+    for name, array in arrays.items():
+        np.save(os.path.join(build, f"{name}.npy"), array)
+    with open(os.path.join(build, "meta.json"), "w", encoding="utf-8") as fh:
+        json.dump({"hwm": hwm, "docs": len(ids), "nnz": len(cols)}, fh)
+    os.rename(build, os.path.join(directory, generation))
+
+    previous = _current_generation(directory)
+    pointer = os.path.join(directory, f"CURRENT.{generation}.tmp")
+    with open(pointer, "w", encoding="utf-8") as fh:
+        fh.write(generation)
+    os.replace(pointer, os.path.join(directory, "CURRENT"))
+
+    _retire(directory, keep={generation, previous}, grace=_settings()["SIMILAR_GENERATION_GRACE"])
+    return len(ids), hwm
+
+
+def _retire(directory, keep, grace):
+    """Видаляє покоління й недобудовані каталоги, які не змінювалися grace секунд (крім keep)."""
+    cutoff = time.time() - grace
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name in keep or not os.path.isdir(path):
+            continue
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except FileNotFoundError:
+            pass  # прибрала паралельна компактизація
+
+
+def _open_current(directory, attempts=3):
+    """(покоління, сегмент) за CURRENT або None, якщо каталог щоразу зникав до відкриття."""
+    for _ in range(attempts):
+        generation = _current_generation(directory)
+        if generation is None:
+            return None, _Segment.empty()
+        try:
+            return generation, _Segment(os.path.join(directory, generation))
+        except FileNotFoundError:
+            continue  # CURRENT уже перемкнули далі — читаємо ще раз
+    return None
+
+
+# --- Індекс у процесі ---
+
+class SimilarIndex:
+    """Сегмент, відкритий через mmap, і дельта змін після нього."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._generation = None
+            self._segment = _Segment.empty()
+            self._hwm = 0
+            self._delta = {}  # application_id -> (ознаки, ваги, чи розглянута)
+            self._live = np.zeros(0, dtype=np.float32)
+            self._packed = None
+            self._lagging = None  # hwm, для якого вже попереджали про відставання
+
+    def refresh(self, session, directory):
+        """Підхоплює новий сегмент (якщо його збудовано) і дочитує нові події історії."""
+        with self._lock:
+            opened = None
+            if _current_generation(directory) != self._generation:
+                opened = _open_current(directory)
+                # None — сегмент не вдалося відкрити: працюємо зі старим до наступного запиту
+            if opened is not None:
+                self._generation, self._segment = opened
+                self._hwm = self._segment.hwm
+                self._delta = {}
+                self._live = self._segment.eligible.astype(np.float32)
+                self._packed = None
+
+            from models import ApplicationHistory
+            limit = _settings()["SIMILAR_REFRESH_MAX_EVENTS"]
+            # На одну більше за межу — так видно, що черга завелика (діапазон первинного ключа)
+            pending = session.execute(
+                select(ApplicationHistory.id, ApplicationHistory.application_id)
+                .where(ApplicationHistory.id > self._hwm).order_by(ApplicationHistory.id).limit(limit + 1)
+            ).all()
+            if len(pending) > limit:
+                if self._lagging != self._hwm:
+                    self._lagging = self._hwm
+                    logger.warning("Індекс схожих заявок відстає більш ніж на %d подій після %d — "
+                                   "запустіть `flask similar-compact`", limit, self._hwm)
+                return
+
+            # Лише остання подія кожної заявки: проміжні стани однаково перекриваються.
+            # Назва й опис у історії стиснуті дельтами — читаємо через модель (див. history_store.py)
+            latest = {application_id: event_id for event_id, application_id in pending}
+            events = session.execute(
+                select(ApplicationHistory).where(ApplicationHistory.id.in_(list(latest.values())))
+                .order_by(ApplicationHistory.id)
+            ).scalars().all() if latest else []
+            for event in events:
+                cols, weights = vector(application_text(event.snapshot_title, event.snapshot_description),
+                                       self._segment.idf)
+                self._delta[event.application_id] = (cols, weights, event.snapshot_status in DECIDED)
+                position = np.searchsorted(self._segment.ids, event.application_id)
+                if position < len(self._segment.ids) and self._segment.ids[position] == event.application_id:
+                    self._live[position] = 0.0
+            if pending:
+                self._hwm = pending[-1].id
+                self._packed = None
+
+    def vector(self, title, description):
+        return vector(application_text(title, description), self._segment.idf)
+
+    def _pack_delta(self):
+        """Дельта як три пласкі масиви (рядок, ознака, вага) для векторного підрахунку."""
+        if self._packed is None:
+            ids = np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta))
+            entries = list(self._delta.values())
+            lengths = [len(cols) for cols, _, _ in entries]
+            self._packed = (
+                ids,
+                np.array([eligible for _, _, eligible in entries], dtype=np.float32),
+                np.repeat(np.arange(len(entries)), lengths),
+                np.concatenate([cols for cols, _, _ in entries]) if entries else np.zeros(0, dtype=np.int32),
+                np.concatenate([w for _, w, _ in entries]) if entries else np.zeros(0, dtype=np.float32),
+            )
+        return self._packed
+
+    def _score_segment(self, queries):
+        """Матриця косинусів len(queries) x документів сегмента."""
+        segment = self._segment
+        n = len(segment.ids)
+        limit = max(MAX_DF * n, MIN_DF_LIMIT)
+        docs, values = [], []
+        for b, (cols, weights) in enumerate(queries):
+            starts, ends = segment.indptr[cols], segment.indptr[cols + 1]
+            for start, end, weight in zip(starts, ends, weights):
+                if start == end or end - start > limit:
+                    continue
+                docs.append(segment.postings[start:end] + b * n)
+                values.append(segment.weights[start:end].astype(np.float32) * weight)
+        if not docs:
+            return np.zeros((len(queries), n), dtype=np.float64)
+        scores = np.bincount(np.concatenate(docs).astype(np.int64), np.concatenate(values),
+                             minlength=len(queries) * n)
+        return scores.reshape(len(queries), n) * self._live
+
+    def _score_delta(self, cols, weights, packed):
+        _, eligible, rows, delta_cols, delta_weights = packed
+        if not len(delta_cols) or not len(cols):
+            return np.zeros(len(eligible))
+        position = np.minimum(np.searchsorted(cols, delta_cols), len(cols) - 1)
+        match = cols[position] == delta_cols
+        return np.bincount(rows[match], delta_weights[match] * weights[position[match]],
+                           minlength=len(eligible)) * eligible
+
+    def query(self, queries, k=5, exclude=()):
+        """Top-k розглянутих заявок для кожного вектора: [[(application_id, схожість)]]."""
+        with self._lock:
+            packed = self._pack_delta()
+            results = []
+            for start in range(0, len(queries), QUERY_BATCH):
+                chunk = queries[start:start + QUERY_BATCH]
+                scores = self._score_segment(chunk)
+                # Запас на заявку, яку виключаємо, щоб не втратити k-ту
+                take = min(k + 1, scores.shape[1])
+                if take and take < scores.shape[1]:
+                    top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+                else:
+                    top = np.tile(np.arange(scores.shape[1]), (len(chunk), 1))
+                for b, (cols, weights) in enumerate(chunk):
+                    found = {int(self._segment.ids[i]): float(scores[b, i]) for i in top[b]}
+                    delta = self._score_delta(cols, weights, packed)
+                    for i in np.flatnonzero(delta >= MIN_SCORE):
+                        found[int(packed[0][i])] = float(delta[i])
+                    ranked = sorted(((score, app_id) for app_id, score in found.items()
+                                     if score >= MIN_SCORE and app_id not in exclude), reverse=True)
+                    results.append([(app_id, score) for score, app_id in ranked[:k]])
+            return results
+
+
+similar_index = SimilarIndex()
+
+
+def similar_prior(application, limit=5):
+    """Найсхожіші розглянуті (схвалені чи відхилені) заявки: [(Application, схожість)]."""
+    from extensions import db
+    from models import Application
+
+    similar_index.refresh(db.session, index_dir())
+    [found] = similar_index.query([similar_index.vector(application.title, application.short_description)],
+                                  k=limit, exclude={application.id})
+    if not found:
+        return []
+    apps = {a.id: a for a in db.session.execute(
+        select(Application).where(Application.id.in_([app_id for app_id, _ in found]))
+    ).scalars()}
+    return [(apps[app_id], score) for app_id, score in found if app_id in apps]
@@ -0,0 +1,140 @@
+"""Локальний SMTP-сервер-заглушка для тестів та вимірювання пропускної здатності.
+
+Приймає листи без реальної доставки і просто рахує/зберігає їх у пам'яті.
+Параметр `connect_delay` імітує вартість TCP + TLS + AUTH реального сервера,
+тож різницю між "з'єднання на кожен лист" і "з'єднання на пачку" видно офлайн.
+
+Запуск окремим процесом:
+    python smtp_sink.py --port 1025
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        sink = self.server.sink
+        if sink.connect_delay:
+            time.sleep(sink.connect_delay)
+        with sink.lock:
+            sink.connections += 1
+
+        self._reply("220 smtp-sink ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            cmd = line[:4].upper()
+
+            if cmd in ("HELO", "EHLO"):
+                if cmd == "EHLO":
+                    self._reply("250-smtp-sink")
+                    self._reply("250-AUTH PLAIN LOGIN")
+                    self._reply("250 8BITMIME")
+                else:
+                    self._reply("250 smtp-sink")
+            elif cmd == "AUTH":
+                # Приймаємо будь-які облікові дані
+                self._reply("235 Authentication successful")
+            elif cmd == "MAIL":
+                mail_from, rcpt_to = line[10:].strip(), []
+                self._reply("250 OK")
+            elif cmd == "RCPT":
+                rcpt_to.append(line[8:].strip())
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b".\r\n":
+                        break
+                    chunks.append(data)
+                sink.store(mail_from, rcpt_to, b"".join(chunks))
+                self._reply("250 OK: queued")
+            elif cmd == "RSET":
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK")
+            elif cmd == "NOOP":
+                self._reply("250 OK")
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """SMTP-заглушка у фоновому потоці. Порт 0 — обрати вільний автоматично."""
+
+    def __init__(self, host="127.0.0.1", port=0, connect_delay=0.0, keep_messages=True):
+        self.connect_delay = connect_delay
+        self.keep_messages = keep_messages
+        self.lock = threading.Lock()
+        self.messages = []
+        self.received = 0
+        self.connections = 0
+
+        self._server = _ThreadingServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def store(self, mail_from, rcpt_to, data):
+        with self.lock:
+            self.received += 1
+            if self.keep_messages:
+                self.messages.append((mail_from, list(rcpt_to), data))
+
+    def mail_config(self):
+        """Налаштування Flask-Mail для відправки на цю заглушку."""
+        return {
+            "MAIL_SERVER": self.host,
+            "MAIL_PORT": self.port,
+            "MAIL_USE_TLS": False,
+            "MAIL_USE_SSL": False,
+            "MAIL_SUPPRESS_SEND": False,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальна SMTP-заглушка")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--connect-delay", type=float, default=0.0,
+                        help="Штучна затримка на кожне з'єднання, сек.")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.connect_delay, keep_messages=False)
+    print(f"SMTP-заглушка слухає {sink.host}:{sink.port}")
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nОтримано листів: {sink.received}, з'єднань: {sink.connections}")
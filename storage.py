@@ -0,0 +1,309 @@
+"""Де лежать байти файлів заявок: бекенди сховища для file_store.py.
+
+file_store.py вирішує, ЩО зберігати (вміст за SHA-256, refcount у
+file_blobs), а бекенд — ДЕ. Ключ — це sha256 вмісту. Інтерфейс
+(StorageBackend) навмисно вузький:
+
+    exists(key)              — чи є вміст;
+    put_file(key, path)      — покласти готовий локальний файл (локальний
+                               бекенд його переміщує, мережевий — копіює);
+    open(key, offset=0)      — потік для читання з позиції offset;
+    delete(key)              — видалити (відсутній вміст — не помилка);
+    local_path(key)          — шлях на диску для send_file / X-Sendfile
+                               або None, якщо байти не локальні.
+
+LocalStorage — каталог із розкладкою за префіксом хешу:
+UPLOAD_FOLDER/ab/cd/abcd…, тобто FILE_STORAGE_SHARD_DEPTH рівнів по два
+шістнадцяткові символи. У кожному каталозі тисячі, а не сотні тисяч
+записів, тож пошук імені, exists() і резервні копії не деградують з
+ростом сховища. Вміст, покладений до розкладки (UPLOAD_FOLDER/<sha256>),
+читається й видаляється за старим місцем, доки `flask storage-transfer
+flat local` його не перенесе.
+
+S3Storage — S3-сумісне сховище (AWS S3, MinIO, Ceph RGW) через http.client
+з підписом AWS Signature V4, без сторонніх бібліотек. Адресація
+path-style: <endpoint>/<bucket>/<S3_PREFIX><sha256>. Для PUT хеш тіла,
+якого вимагає підпис, — це сам ключ. Для тестів і локальної розробки є
+заглушка s3_sink.py.
+
+Переїзд у S3 без простою: `flask storage-transfer local s3 --keep-source`,
+перемкнути FILE_STORAGE_BACKEND на "s3", ще раз `flask storage-transfer
+local s3` — він докопіює завантажене за цей час і прибере локальні копії.
+
+Тимчасові файли (UPLOAD_FOLDER/.tmp, .partial) завжди локальні — бекенд
+отримує вже готовий, перевірений файл.
+"""
+import datetime
+import hashlib
+import hmac
+import http.client
+import os
+import shutil
+from urllib.parse import quote, urlsplit
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+COPY_CHUNK = 1024 * 1024
+
+
+class StorageError(OSError):
+    """Бекенд відповів помилкою (не "немає такого вмісту" — то FileNotFoundError)."""
+
+
+class StorageBackend:
+    """Інтерфейс бекенду сховища (див. докстрінг модуля)."""
+
+    # Чи ходить бекенд у мережу: file_store тоді вивантажує вміст до
+    # блокування запису SQLite, а не під ним
+    remote = False
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def put_file(self, key, path):
+        raise NotImplementedError
+
+    def open(self, key, offset=0):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Каталог на диску; depth=0 — плоска розкладка, як до появи шардування."""
+
+    def __init__(self, root, depth=2):
+        self.root = root
+        self.depth = depth
+
+    def path(self, key):
+        shards = [key[2 * i:2 * i + 2] for i in range(self.depth)]
+        return os.path.join(self.root, *shards, key)
+
+    def _locate(self, key):
+        """Де вміст лежить зараз: у розкладці чи ще за старим (плоским) місцем."""
+        path = self.path(key)
+        if self.depth and not os.path.exists(path):
+            flat = os.path.join(self.root, key)
+            if os.path.exists(flat):
+                return flat
+        return path
+
+    def exists(self, key):
+        return os.path.exists(self._locate(key))
+
+    def put_file(self, key, path):
+        target = self.path(key)
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            # Каталог шарду створюється раз — з першим вмістом у ньому
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+
+    def open(self, key, offset=0):
+        f = open(self._locate(key), "rb")
+        if offset:
+            f.seek(offset)
+        return f
+
+    def delete(self, key):
+        for path in {self.path(key), os.path.join(self.root, key)}:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def local_path(self, key):
+        return self._locate(key)
+
+
+# --- AWS Signature Version 4 ---
+
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(method, path, query, headers, payload_hash, *, access_key, secret_key, region, service, amz_date):
+    """Значення заголовка Authorization (AWS4-HMAC-SHA256).
+
+    path — уже закодований URI, query — уже закодований рядок запиту,
+    headers — усі заголовки, які треба підписати (серед них host і x-amz-date).
+    """
+    canonical_headers = {name.lower(): " ".join(str(value).split()) for name, value in headers.items()}
+    signed = ";".join(sorted(canonical_headers))
+    canonical_query = "&".join(sorted(pair for pair in query.split("&") if pair))
+    canonical_request = "\n".join([
+        method, path, canonical_query,
+        "".join(f"{name}:{canonical_headers[name]}\n" for name in sorted(canonical_headers)),
+        signed, payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), amz_date[:8])
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, SignedHeaders={signed}, Signature={signature}"
+
+
+class _S3Body:
+    """Тіло відповіді GET; close() закриває й з'єднання."""
+
+    def __init__(self, connection, response):
+        self._connection = connection
+        self._response = response
+
+    def read(self, size=-1):
+        return self._response.read(None if size is None or size < 0 else size)
+
+    def close(self):
+        self._response.close()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class S3Storage(StorageBackend):
+    """S3-сумісне сховище (path-style, Signature V4)."""
+
+    remote = True
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1", prefix="", timeout=30):
+        parts = urlsplit(endpoint)
+        self.secure = parts.scheme == "https"
+        self.host = parts.netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def _path(self, key):
+        return "/" + quote(f"{self.bucket}/{self.prefix}{key}", safe="/~")
+
+    def _send(self, method, key, body=None, payload_hash=EMPTY_SHA256, headers=None):
+        path = self._path(key)
+        amz_date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        signed = {"host": self.host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash}
+        authorization = sign_v4(method, path, "", signed, payload_hash, access_key=self.access_key,
+                                secret_key=self.secret_key, region=self.region, service="s3", amz_date=amz_date)
+        connection_class = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        connection = connection_class(self.host, timeout=self.timeout)
+        try:
+            connection.request(method, path, body=body,
+                               headers={**signed, **(headers or {}), "Authorization": authorization})
+            return connection, connection.getresponse()
+        except Exception:
+            connection.close()
+            raise
+
+    def _call(self, method, key, ok=(200, 204), **kwargs):
+        connection, response = self._send(method, key, **kwargs)
+        try:
+            data = response.read()
+        finally:
+            connection.close()
+        if response.status == 404:
+            raise FileNotFoundError(key)
+        if response.status not in ok:
+            raise StorageError(f"S3 {method} {key}: {response.status} {data[:200]!r}")
+        return response
+
+    def exists(self, key):
+        try:
+            self._call("HEAD", key)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put_file(self, key, path):
+        # Ключ — SHA-256 вмісту, тож хеш тіла для підпису вже відомий
+        with open(path, "rb") as f:
+            self._call("PUT", key, body=f, payload_hash=key,
+                       headers={"Content-Length": str(os.fstat(f.fileno()).st_size)})
+
+    def open(self, key, offset=0):
+        connection, response = self._send("GET", key, headers={"Range": f"bytes={offset}-"} if offset else None)
+        if response.status in (200, 206):
+            return _S3Body(connection, response)
+        data = response.read()
+        connection.close()
+        if response.status == 404:
+            raise FileNotFoundError(key)
+        raise StorageError(f"S3 GET {key}: {response.status} {data[:200]!r}")
+
+    def delete(self, key):
+        try:
+            self._call("DELETE", key)
+        except FileNotFoundError:
+            pass
+
+
+def create(kind, config):
+    """Бекенд за назвою: "local" (з розкладкою), "flat" (без неї, для перенесення) або "s3"."""
+    if kind == "local":
+        return LocalStorage(config["UPLOAD_FOLDER"], depth=config.get("FILE_STORAGE_SHARD_DEPTH", 2))
+    if kind == "flat":
+        return LocalStorage(config["UPLOAD_FOLDER"], depth=0)
+    if kind == "s3":
+        return S3Storage(config["S3_ENDPOINT"], config["S3_BUCKET"], config["S3_ACCESS_KEY"],
+                         config["S3_SECRET_KEY"], region=config.get("S3_REGION", "us-east-1"),
+                         prefix=config.get("S3_PREFIX", ""))
+    raise ValueError(f"Невідомий бекенд сховища: {kind}")
+
+
+def transfer(keys, source, target, tmp_dir, workers=4, move=True):
+    """Переносить вміст із source у target паралельно (потоки — бо чекаємо на диск і мережу).
+
+    Наявне в target пропускається, тож перенесення можна переривати й
+    запускати знову. Повертає (перенесено, вже було, не знайдено).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def one(key):
+        path = source.local_path(key)
+        # Розкладка ще знаходить вміст за старим місцем — це не копія в цілі
+        same_place = path is not None and path == target.local_path(key)
+        if not same_place and target.exists(key):
+            if move and source.exists(key):
+                source.delete(key)
+            return "skipped"
+        if path is not None and not os.path.exists(path):
+            return "missing"
+        if path is not None and (move or target.remote):
+            # Локальний бекенд переміщує файл (той самий диск), мережевий — вивантажує копію
+            target.put_file(key, path)
+        else:
+            # Копія в .tmp: source не локальний або його файл треба зберегти
+            os.makedirs(tmp_dir, exist_ok=True)
+            staged = os.path.join(tmp_dir, f"transfer-{key}")
+            try:
+                with source.open(key) as src, open(staged, "wb") as dst:
+                    shutil.copyfileobj(src, dst, COPY_CHUNK)
+            except FileNotFoundError:
+                return "missing"
+            try:
+                target.put_file(key, staged)
+            finally:
+                if os.path.exists(staged):
+                    os.remove(staged)
+        if move:
+            source.delete(key)
+        return "moved"
+
+    results = {"moved": 0, "skipped": 0, "missing": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for outcome in pool.map(one, keys):
+            results[outcome] += 1
+    return results["moved"], results["skipped"], results["missing"]
@@ -1,6 +1,8 @@
+import io
 import os
 import sys
 import pytest
+from sqlalchemy import event, select
 
 # Додаємо корінь проекту в шляхи, щоб бачити app.py
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -8,20 +10,45 @@ if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
 from app import app as flask_app
-from extensions import db
-from models import User
+from extensions import db, mail
+from models import User, Application
+from smtp_sink import SMTPSink
+from s3_sink import S3Sink
+from user_cache import user_cache
+from history_store import state_cache
+from email_checks import deliverability
+from rate_limit import rate_limiter
+from similar import similar_index
 
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     """Створює екземпляр додатку для тестів."""
     flask_app.config.update({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
         "WTF_CSRF_ENABLED": False,
-        "SERVER_NAME": "localhost.localdomain"
+        "SERVER_NAME": "localhost.localdomain",
+        "SIMILAR_INDEX_DIR": str(tmp_path / "similar"),
+        # Сховище файлів адресоване вмістом — однакові тестові файли з різних тестів не мають перетинатися
+        "UPLOAD_FOLDER": str(tmp_path / "uploads"),
     })
 
+    # Кеш живе в процесі, а БД перестворюється на кожен тест — id повторюються
+    user_cache.configure(flask_app.config["USER_CACHE_SIZE"], flask_app.config["USER_CACHE_TTL"],
+                         str(tmp_path / "user_cache.stamp"))
+    state_cache.clear()
+
+    # DNS у тестах не використовуємо: будь-який домен вважається робочим
+    deliverability.clear()
+    deliverability.resolver = lambda domain, timeout: ("ok", None)
+
+    # Усі тести "приходять" з 127.0.0.1 — кожен починає з чистими лічильниками
+    rate_limiter.reset()
+
+    # Індекс схожих заявок дочитує історію від свого high-water mark — починаємо з нуля
+    similar_index.reset()
+
     with flask_app.app_context():
         db.create_all()
         yield flask_app
@@ -41,6 +68,65 @@ def runner(app):
     return app.test_cli_runner()
 
 
+@pytest.fixture
+def smtp_sink(app):
+    """Локальна SMTP-заглушка; Flask-Mail на час тесту дивиться на неї."""
+    original_state = app.extensions['mail']
+    with SMTPSink() as sink:
+        app.extensions['mail'] = mail.init_mail({**app.config, **sink.mail_config()})
+        yield sink
+    app.extensions['mail'] = original_state
+
+
+@pytest.fixture
+def s3_sink(app):
+    """Локальна S3-заглушка; файли заявок на час тесту зберігаються в ній."""
+    with S3Sink() as sink:
+        config = {"FILE_STORAGE_BACKEND": "s3", **sink.storage_config()}
+        original = {key: app.config.get(key) for key in config}
+        app.config.update(config)
+        yield sink
+    app.config.update(original)
+
+
+@pytest.fixture
+def create_application(client):
+    """Створює заявку з файлами через форму від імені поточного користувача."""
+    def create(title, *files):
+        client.post("/applications/new", content_type="multipart/form-data", data={
+            "title": title, "short_description": "Опис",
+            "files": [(io.BytesIO(content), name) for name, content in files],
+        })
+        return db.session.scalar(select(Application).filter_by(title=title))
+    return create
+
+
+class SQLRecorder:
+    """Записує всі SQL-запити (текст і параметри), виконані через db.engine."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def selects(self):
+        return [(sql, params) for sql, params in self.statements
+                if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+    def clear(self):
+        self.statements = []
+
+
+@pytest.fixture
+def sql_recorder(app):
+    """Фікстура для перевірки запитів, які виконує маршрут."""
+    recorder = SQLRecorder()
+    event.listen(db.engine, "before_cursor_execute", recorder)
+    yield recorder
+    event.remove(db.engine, "before_cursor_execute", recorder)
+
+
 # --- ФІКСТУРИ КОРИСТУВАЧІВ (ОБ'ЄКТИ) ---
 
 @pytest.fixture
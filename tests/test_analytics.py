@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from extensions import db
+from models import User, Application, ApplicationHistory
+import analytics
+
+
+def _history(app_id, user_id, status, when):
+    return ApplicationHistory(application_id=app_id, changed_by_id=user_id, event_type="status_change",
+                              snapshot_title="Т", snapshot_status=status, created_at=when)
+
+
+def _setup(app):
+    """Дві заявки: одна отримує рішення через 2 год, інша — через 8 год після повторного подання."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None).replace(hour=12, minute=0, second=0, microsecond=0)
+    day_ago = now - timedelta(days=1)
+    with app.app_context():
+        owner = User(email="owner@test.com", password_hash="x")
+        expert = User(email="expert@test.com", password_hash="x", role="expert")
+        db.session.add_all([owner, expert])
+        db.session.flush()
+        apps = [Application(title=f"A{i}", short_description="Опис", owner_id=owner.id) for i in range(2)]
+        db.session.add_all(apps)
+        db.session.flush()
+        first, second = apps[0].id, apps[1].id
+        db.session.add_all([
+            _history(first, owner.id, "submitted", day_ago),
+            _history(second, owner.id, "submitted", day_ago),
+            _history(first, expert.id, "approved", day_ago + timedelta(hours=2)),
+            _history(second, expert.id, "needs_changes", day_ago + timedelta(hours=1)),
+            _history(second, owner.id, "submitted", now - timedelta(hours=8)),
+            _history(second, expert.id, "rejected", now),
+        ])
+        db.session.commit()
+        return expert.id
+
+
+def test_aggregate_pairs_decisions_with_submissions():
+    """Векторний агрегатор рахує час від останнього подання, зокрема перенесеного з минулої пачки."""
+    day = 86400.0
+    events = np.array([
+        # id, заявка, хто, час, вид
+        [1, 10, 1, 10 * day, analytics.SUBMIT],
+        [2, 11, 7, 10 * day + 100, analytics.DECIDE],      # подання заявки 11 — у попередній пачці
+        [3, 10, 7, 10 * day + 3600, analytics.DECIDE],
+        [4, 12, 1, 11 * day, analytics.SUBMIT],
+        [5, 13, 1, 11 * day, analytics.OTHER],
+    ])
+    rows, opened, closed = analytics.aggregate(events, {11: 10 * day - 60})
+
+    assert ("submissions", 10, 0, 1) in rows and ("submissions", 11, 0, 1) in rows
+    assert ("decisions", 10, 7, 2) in rows
+    latency = {key for metric, _, key, _ in rows if metric == "latency"}
+    assert latency == {int(analytics.latency_bucket(160.0)), int(analytics.latency_bucket(3600.0))}
+    assert opened == {12: 11 * day}
+    assert sorted(closed) == [10, 11]
+
+
+def test_rollup_is_incremental(app):
+    """Пачки по 2 події дають той самий результат, а повторний запуск нічого не подвоює."""
+    expert_id = _setup(app)
+    with app.app_context():
+        assert analytics.run(batch_size=2) == 6
+        assert analytics.run(batch_size=2) == 0
+
+        report = analytics.report(days=7)
+        assert sum(s for _, s, _ in report["daily"]) == 3
+        assert sum(d for _, _, d in report["daily"]) == 3
+        assert report["experts"] == [("expert@test.com", 3)]
+        # Рішення з відомим поданням: 2 год, 1 год і 8 год
+        assert report["decided"] == 3
+        assert report["percentiles"][50] == analytics.format_duration(
+            float(analytics.bucket_upper_bound(analytics.latency_bucket(7200.0))))
+
+        db.session.add(_history(1, expert_id, "approved", datetime.now(timezone.utc).replace(tzinfo=None)))
+        db.session.commit()
+        assert analytics.run() == 1
+        assert analytics.report(days=7)["experts"] == [("expert@test.com", 4)]
+
+
+def test_analytics_page(client, app, admin_headers):
+    """Сторінка аналітики відкривається для адміна."""
+    _setup(app)
+    with app.app_context():
+        analytics.run()
+    response = client.get("/admin/analytics")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Аналітика рішень" in html and "expert@test.com" in html
@@ -35,12 +35,14 @@ def test_edit_application(client, auth_headers, app):
     client.post("/applications/new", data={"title": "Old", "short_description": "Desc"}, headers=auth_headers)
 
     with app.app_context():
-        app_id = Application.query.filter_by(title="Old").first().id
+        app_obj = Application.query.filter_by(title="Old").first()
+        app_id, version = app_obj.id, app_obj.version
 
     # Редагуємо
     response = client.post(f"/applications/{app_id}/edit", data={
         "title": "New Title",
-        "short_description": "New Desc"
+        "short_description": "New Desc",
+        "version": version,
     }, headers=auth_headers, follow_redirects=True)
 
     assert response.status_code == 200
@@ -55,12 +57,15 @@ def test_submit_and_cancel_application(client, auth_headers, app):
         app_id = Application.query.filter_by(title="Submit App").first().id
 
     # Подача
-    client.post(f"/applications/{app_id}/submit", headers=auth_headers, follow_redirects=True)
+    client.post(f"/applications/{app_id}/submit", data={"version": 1}, headers=auth_headers, follow_redirects=True)
     with app.app_context():
-        assert db.session.get(Application, app_id).status == "submitted"
+        app_obj = db.session.get(Application, app_id)
+        assert app_obj.status == "submitted"
+        version = app_obj.version
 
     # Скасування
-    client.post(f"/applications/{app_id}/cancel", headers=auth_headers, follow_redirects=True)
+    client.post(f"/applications/{app_id}/cancel", data={"version": version}, headers=auth_headers,
+                follow_redirects=True)
     with app.app_context():
         assert db.session.get(Application, app_id).status == "cancelled"
 
@@ -0,0 +1,62 @@
+from sqlalchemy import text
+from extensions import db
+from models import User, Application
+import counters
+
+
+def _stats(app):
+    with app.app_context():
+        return counters.read_stats()
+
+
+def test_counters_follow_status_transitions(client, app, auth_headers):
+    """Створення, подання та рішення експерта змінюють лічильники в тій же транзакції."""
+    client.post("/applications/new", data={"title": "Т", "short_description": "Опис"})
+    with app.app_context():
+        app_id = Application.query.filter_by(title="Т").first().id
+    assert _stats(app)[0]["draft"] == 1
+
+    client.post(f"/applications/{app_id}/submit", data={"version": 1})
+    by_status, _ = _stats(app)
+    assert by_status["draft"] == 0 and by_status["submitted"] == 1
+
+    expert = app.test_client()
+    with app.app_context():
+        u = User(email="counter_expert@test.com", role="expert")
+        u.set_password("password")
+        db.session.add(u)
+        db.session.commit()
+    expert.post("/login", data={"email": "counter_expert@test.com", "password": "password"})
+    expert.post(f"/expert/applications/{app_id}", data={"decision": "approved", "comment": "", "version": 2})
+
+    by_status, total_users = _stats(app)
+    assert by_status["submitted"] == 0 and by_status["approved"] == 1
+    assert total_users == 2
+    with app.app_context():
+        assert counters.verify() == {}
+
+
+def test_stats_page_reads_counters(client, app, admin_headers, sql_recorder):
+    """Сторінка статистики не агрегує таблиці заявок і користувачів."""
+    client.get("/admin/stats")
+    sql = " ".join(s for s, _ in sql_recorder.selects())
+    assert "FROM applications" not in sql and "FROM users" not in sql
+
+
+def test_rebuild_counters_cli(app, runner, admin):
+    """--verify знаходить розбіжність, а rebuild-counters її виправляє."""
+    with app.app_context():
+        db.session.add(Application(title="Поза save_history", short_description="Опис",
+                                   status="submitted", owner_id=User.query.first().id))
+        db.session.execute(text("UPDATE counters SET value = 7 WHERE name = 'users.total'"))
+        db.session.commit()
+
+    result = runner.invoke(args=["rebuild-counters", "--verify"])
+    assert result.exit_code == 1
+    assert "applications.status.submitted: збережено 0, фактично 1" in result.output
+
+    result = runner.invoke(args=["rebuild-counters"])
+    assert "виправлено: 2" in result.output
+    assert runner.invoke(args=["rebuild-counters", "--verify"]).exit_code == 0
+    with app.app_context():
+        assert counters.read_stats()[1] == 1
@@ -0,0 +1,103 @@
+from sqlalchemy import func, select
+from extensions import db
+from models import User, Application, ApplicationMinHash, ApplicationLSHBand
+import duplicates
+
+BASE = "Інноваційний алгоритм для навчання. Система автоматично добирає вправи за рівнем студента."
+
+
+def _add(title, description, owner_id):
+    a = Application(title=title, short_description=description, owner_id=owner_id, status="submitted")
+    db.session.add(a)
+    db.session.commit()
+    return a
+
+
+def _owner():
+    u = User(email="owner@test.com", password_hash="x")
+    db.session.add(u)
+    db.session.commit()
+    return u.id
+
+
+def test_signature_estimates_similarity():
+    """Майже однакові тексти мають високу оцінку, різні — низьку."""
+    sig = duplicates.signature(BASE)
+    near = duplicates.signature(BASE.replace("студента", "учня"))
+    other = duplicates.signature("Квантовий двигун для космосу з новою системою охолодження")
+    scores = duplicates.similarity(sig, duplicates.np.stack([near, other]))
+    assert scores[0] > 0.7 and scores[1] < 0.2
+
+
+def test_likely_duplicates_follow_create_and_edit(app):
+    """Кошики LSH заповнюються при створенні й оновлюються при редагуванні."""
+    with app.app_context():
+        owner_id = _owner()
+        original = _add("Алгоритм навчання", BASE, owner_id)
+        resubmitted = _add("Алгоритм навчання (повторно)", BASE + " Додано приклад.", owner_id)
+        _add("Квантовий двигун", "Двигун для космосу з новою системою охолодження", owner_id)
+
+        found = duplicates.likely_duplicates(resubmitted)
+        assert [a.id for a, _ in found] == [original.id]
+        assert found[0][1] >= duplicates.THRESHOLD
+        assert db.session.scalar(select(func.count()).select_from(ApplicationLSHBand)
+                                 .where(ApplicationLSHBand.application_id == original.id)) == duplicates.BANDS
+
+        original.title = "Інша назва"
+        original.short_description = "Зовсім інший опис пристрою для вимірювання тиску"
+        db.session.commit()
+        assert duplicates.likely_duplicates(resubmitted) == []
+
+
+def test_real_duplicate_survives_crowded_bucket(app):
+    """Понад MAX_CANDIDATES слабких збігів в одному кошику не витісняють справжній дублікат."""
+    with app.app_context():
+        owner_id = _owner()
+        target = _add("Алгоритм навчання", BASE, owner_id)
+        # Найменший ключ: індекс по кошиках переглядається саме з нього
+        bucket = min(duplicates.band_buckets(duplicates.signature(
+            duplicates.application_text(target.title, target.short_description))))
+        weak = [Application(title=f"Пристрій {i}", short_description=f"Вимірювач тиску модель {i}",
+                            owner_id=owner_id, status="submitted")
+                for i in range(duplicates.MAX_CANDIDATES + 50)]
+        db.session.add_all(weak)
+        db.session.commit()
+        db.session.execute(db.insert(ApplicationLSHBand),
+                           [{"bucket": bucket, "application_id": a.id} for a in weak])
+        db.session.commit()
+        original = _add("Алгоритм навчання", BASE + " Додано приклад.", owner_id)
+
+        assert [a.id for a, _ in duplicates.likely_duplicates(target)] == [original.id]
+
+
+def test_review_page_lists_duplicates(client, app, expert_headers):
+    """Експерт бачить можливі дублікати на сторінці розгляду."""
+    with app.app_context():
+        owner_id = _owner()
+        first = _add("Алгоритм навчання", BASE, owner_id)
+        second = _add("Алгоритм навчання", BASE, owner_id)
+        first_id, second_id = first.id, second.id
+
+    html = client.get(f"/expert/applications/{second_id}").get_data(as_text=True)
+    assert "Можливі дублікати" in html
+    assert f"№{first_id}" in html and "100% схожості" in html
+
+
+def test_backfill_rebuilds_index(app, runner):
+    """minhash-backfill відновлює підписи та кошики для всіх заявок."""
+    with app.app_context():
+        owner_id = _owner()
+        ids = [_add(f"Заявка {i}", BASE, owner_id).id for i in range(5)]
+        expected = {i: db.session.get(ApplicationMinHash, i).signature for i in ids}
+        db.session.execute(db.delete(ApplicationLSHBand))
+        db.session.execute(db.delete(ApplicationMinHash))
+        db.session.commit()
+
+    result = runner.invoke(args=["minhash-backfill", "--workers", "2", "--batch-size", "2"])
+    assert "для 5 заявок" in result.output
+
+    with app.app_context():
+        stored = dict(db.session.execute(select(ApplicationMinHash.application_id, ApplicationMinHash.signature)).all())
+        assert stored == expected
+        assert db.session.scalar(select(func.count()).select_from(ApplicationLSHBand)) == 5 * duplicates.BANDS
+        assert [a.id for a, _ in duplicates.likely_duplicates(db.session.get(Application, ids[0]))]
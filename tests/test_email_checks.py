@@ -0,0 +1,76 @@
+import threading
+import time
+from email_checks import DeliverabilityChecker
+from extensions import db
+from models import User
+
+
+class FakeResolver:
+    """Офлайн-резолвер: відповідає за заздалегідь заданою таблицею і рахує виклики."""
+
+    def __init__(self, answers, delay=None):
+        self.answers = answers
+        self.calls = []
+        self.release = threading.Event()
+        if delay is None:
+            self.release.set()
+
+    def __call__(self, domain, timeout):
+        self.calls.append(domain)
+        self.release.wait(1)
+        return self.answers.get(domain, ("ok", None))
+
+
+def _register(client, email):
+    return client.post("/register", data={
+        "email": email, "password": "StrongPass1", "confirm_password": "StrongPass1",
+    }, follow_redirects=True)
+
+
+def test_domain_result_is_cached(client, app):
+    """Домен перевіряється один раз; негативний результат теж кешується."""
+    from email_checks import deliverability
+    resolver = FakeResolver({"nomail.org": ("bad", "The domain name nomail.org does not accept email.")})
+    deliverability.resolver = resolver
+
+    _register(client, "a@goodmail.com")
+    _register(client, "b@goodmail.com")
+    first = _register(client, "x@nomail.org")
+    second = _register(client, "y@nomail.org")
+
+    assert resolver.calls == ["goodmail.com", "nomail.org"]
+    assert "Домен nomail.org не приймає електронну пошту" in first.get_data(as_text=True)
+    assert "Домен nomail.org не приймає електронну пошту" in second.get_data(as_text=True)
+    with app.app_context():
+        assert User.query.filter_by(email="b@goodmail.com").first() is not None
+
+
+def test_async_mode_accepts_immediately(client, app, monkeypatch):
+    """В режимі async реєстрація не чекає DNS, а домен перевіряється у фоні."""
+    from email_checks import deliverability
+    monkeypatch.setitem(app.config, "EMAIL_DELIVERABILITY_MODE", "async")
+    resolver = FakeResolver({"slowmail.net": ("bad", "The domain name slowmail.net does not exist.")}, delay=True)
+    deliverability.resolver = resolver
+
+    response = _register(client, "first@slowmail.net")
+    assert "Реєстрація успішна" in response.get_data(as_text=True)
+
+    # Відпускаємо фонову перевірку і чекаємо, доки результат потрапить у кеш
+    resolver.release.set()
+    for _ in range(100):
+        if deliverability.cached("slowmail.net"):
+            break
+        time.sleep(0.01)
+
+    response = _register(client, "second@slowmail.net")
+    assert "Домен slowmail.net не існує" in response.get_data(as_text=True)
+
+
+def test_timeouts_are_not_cached():
+    """Невизначений результат (таймаут DNS) не потрапляє в кеш."""
+    resolver = FakeResolver({"flaky.net": ("unknown", "timeout")})
+    checker = DeliverabilityChecker(resolver=resolver)
+    checker.check("flaky.net")
+    checker.check("flaky.net")
+    assert resolver.calls == ["flaky.net", "flaky.net"]
+    assert checker.cached("flaky.net") is None
@@ -0,0 +1,45 @@
+from extensions import db
+from email_templates import render_status_update, render_status_updates
+from models import User, Application
+
+
+def _make_app(title, comment=None):
+    owner = User(email="owner@test.com", role="applicant")
+    owner.set_password("password")
+    app_obj = Application(title=title, short_description="Опис", status="rejected",
+                          expert_comment=comment, owner=owner)
+    db.session.add(app_obj)
+    db.session.commit()
+    return app_obj
+
+
+def test_status_email_escapes_user_input(app):
+    """Назва заявки та коментар експерта екрануються в HTML-листі."""
+    app_obj = _make_app("<script>alert(1)</script>", comment="<b>погано</b>")
+
+    email = render_status_update(app_obj)
+
+    assert "<script>" not in email.html
+    assert "&lt;script&gt;" in email.html
+    assert "&lt;b&gt;погано&lt;/b&gt;" in email.html
+    # Текстова версія не екранується
+    assert "<script>alert(1)</script>" in email.body
+    assert email.recipients == ["owner@test.com"]
+    assert f"/applications/{app_obj.id}" in email.body
+
+
+def test_status_email_css_is_inlined(app):
+    """Прості CSS-правила вбудовані в style, а весь CSS — у <style>."""
+    email = render_status_update(_make_app("Заявка"))
+
+    assert 'class="btn" style="background-color: #065f46' in email.html
+    assert "/* email.css */" not in email.html
+    assert ".header h1" in email.html
+
+
+def test_render_many_notifications(app):
+    """Пакетний рендер повертає по листу на кожну заявку."""
+    app_obj = _make_app("Заявка")
+    emails = render_status_updates([app_obj] * 100)
+    assert len(emails) == 100
+    assert all("Відхилено" in e.body for e in emails)
@@ -19,7 +19,7 @@ def test_expert_can_approve_application(client, app, auth_headers):
         app_obj = Application.query.filter_by(title="For Expert").first()
         app_id = app_obj.id
 
-    client.post(f"/applications/{app_id}/submit", headers=auth_headers)
+    client.post(f"/applications/{app_id}/submit", data={"version": 1}, headers=auth_headers)
 
     # 2. ЗМІНА КОРИСТУВАЧА: Вихід юзера -> Вхід Експерта
     client.get("/logout")
@@ -38,7 +38,7 @@ def test_expert_can_approve_application(client, app, auth_headers):
     with patch("expert_routes.send_status_update_email"):
         response = client.post(
             f"/expert/applications/{app_id}",
-            data={"decision": "approved", "comment": "Good job"},
+            data={"decision": "approved", "comment": "Good job", "version": 2},
             follow_redirects=True
         )
 
@@ -53,7 +53,7 @@ def test_expert_invalid_decision(client, app, auth_headers):
     client.post("/applications/new", data={"title": "Bad Request", "short_description": "D"}, headers=auth_headers)
     with app.app_context():
         app_id = Application.query.filter_by(title="Bad Request").first().id
-    client.post(f"/applications/{app_id}/submit", headers=auth_headers)
+    client.post(f"/applications/{app_id}/submit", data={"version": 1}, headers=auth_headers)
 
     # 2. Логін як експерт
     client.get("/logout")
@@ -68,7 +68,7 @@ def test_expert_invalid_decision(client, app, auth_headers):
     # 3. Відправляємо неіснуючий статус
     response = client.post(
         f"/expert/applications/{app_id}",
-        data={"decision": "super_status", "comment": ""},
+        data={"decision": "super_status", "comment": "", "version": 2},
         follow_redirects=True
     )
     assert "Невірний статус рішення" in response.get_data(as_text=True)
@@ -0,0 +1,303 @@
+import io
+import os
+import threading
+
+import pytest
+
+from sqlalchemy import func, select
+from werkzeug.datastructures import FileStorage
+from extensions import db
+from models import User, Application, ApplicationFile, FileBlob
+import counters
+import file_store
+
+THREADS = 6
+ROUNDS = 10
+
+
+def _storage_drift():
+    """Розбіжності лічильників сховища з фактичними даними (заявки тут створюються й без лічильників статусів)."""
+    return {name: v for name, v in counters.verify().items() if name in counters.STORAGE_COUNTERS}
+
+
+def _blobs():
+    return {b.sha256: b.refcount for b in db.session.execute(select(FileBlob)).scalars()}
+
+
+def test_identical_uploads_share_one_blob(client, app, auth_headers, create_application):
+    """Однаковий документ у двох заявках зберігається на диску один раз."""
+    first = create_application("Перша", ("plan.pdf", b"%PDF spec"))
+    second = create_application("Друга", ("copy.pdf", b"%PDF spec"), ("other.txt", b"other"))
+
+    [shared] = first.files
+    assert shared.filename == "plan.pdf"
+    assert _blobs()[shared.blob_sha256] == 2
+    stored = [name for root, _, names in os.walk(app.config["UPLOAD_FOLDER"]) if ".tmp" not in root for name in names]
+    assert sorted(stored) == sorted(_blobs())
+    assert {f.filename for f in second.files} == {"copy.pdf", "other.txt"}
+
+    report = file_store.report()
+    assert (report["files"], report["blobs"]) == (3, 2)
+    assert report["saved_bytes"] == len(b"%PDF spec")
+    assert _storage_drift() == {}
+
+
+def test_bytes_removed_with_last_reference(client, app, auth_headers, create_application):
+    """Видалення файлу прибирає байти лише тоді, коли на них більше ніхто не посилається."""
+    first = create_application("Перша", ("a.txt", b"same"))
+    second = create_application("Друга", ("b.txt", b"same"))
+    sha256 = first.files[0].blob_sha256
+    path = file_store.blob_path(sha256)
+
+    client.post(f"/applications/file/{first.files[0].id}/delete")
+    assert os.path.exists(path) and _blobs() == {sha256: 1}
+
+    client.post(f"/applications/file/{second.files[0].id}/delete")
+    assert not os.path.exists(path) and _blobs() == {}
+    assert _storage_drift() == {}
+
+
+def test_bytes_survive_until_release_and_reupload(client, app, auth_headers, monkeypatch, caplog, create_application):
+    """Байти видаляються лише після commit і лише якщо вміст між транзакціями не завантажили знову."""
+    first = create_application("Перша", ("a.txt", b"same"))
+    sha256 = first.files[0].blob_sha256
+    path = file_store.blob_path(sha256)
+
+    orphan = file_store.detach(first.files[0])
+    db.session.commit()
+    assert os.path.exists(path) and _blobs() == {sha256: 0}
+    second = create_application("Друга", ("b.txt", b"same"))  # відроджує рядок з refcount 0
+    file_store.release(orphan)
+    assert os.path.exists(path) and _blobs() == {sha256: 1}
+    assert _storage_drift() == {}
+
+    def refuse(self, key):
+        raise OSError("немає доступу")
+
+    monkeypatch.setattr(file_store.storage.LocalStorage, "delete", refuse)
+    orphan = file_store.detach(second.files[0])
+    db.session.commit()
+    file_store.release(orphan)
+    assert f"Не вдалося видалити вміст {sha256}" in caplog.text
+    assert os.path.exists(path) and _blobs() == {sha256: 0}  # рядок і байти разом — нічого не загублено
+    assert _storage_drift() == {}
+
+
+def test_upload_is_written_once(client, app, auth_headers, monkeypatch, create_application):
+    """Частина multipart пишеться відразу у сховище: без тимчасових файлів werkzeug і без копіювання."""
+    import werkzeug.formparser
+    monkeypatch.setattr(werkzeug.formparser, "default_stream_factory",
+                        lambda *a, **kw: pytest.fail("werkzeug створив тимчасовий файл"))
+    copies = []
+    monkeypatch.setattr(file_store.HashingSpool, "read", lambda self, size=-1: copies.append(size) or b"")
+
+    app_obj = create_application("Заявка", ("big.bin", b"x" * 3_000_000))
+    assert copies == []  # вміст ніхто не перечитував
+    assert _blobs() == {app_obj.files[0].blob_sha256: 1}
+    assert os.path.getsize(file_store.path_of(app_obj.files[0])) == 3_000_000
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".tmp")) == []
+
+
+def test_per_file_limit_is_enforced_while_streaming(client, app, auth_headers):
+    """Файл, більший за MAX_FILE_SIZE, обриває запит з 413 і не лишає слідів на диску."""
+    app.config["MAX_FILE_SIZE"] = 1024 * 1024
+    try:
+        response = client.post("/applications/new", content_type="multipart/form-data", follow_redirects=True, data={
+            "title": "Заявка", "short_description": "Опис",
+            "files": [(io.BytesIO(b"ok"), "small.txt"), (io.BytesIO(b"x" * 1_500_000), "big.txt")],
+        })
+    finally:
+        app.config["MAX_FILE_SIZE"] = 20 * 1024 * 1024
+    assert "більший за 1 МБ" in response.get_data(as_text=True)
+    assert db.session.scalar(select(func.count(Application.id))) == 0
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".tmp")) == []
+
+
+def test_same_name_does_not_overwrite(client, app, auth_headers, create_application):
+    """Повторне завантаження файлу з тим самим ім'ям не затирає попередній."""
+    app_obj = create_application("Заявка", ("doc.txt", b"v1"), ("doc.txt", b"v2"))
+    contents = [client.get(f"/files/{f.id}").data for f in app_obj.files]
+    assert sorted(contents) == [b"v1", b"v2"]
+
+
+def test_download_requires_access(client, app, auth_headers, create_application):
+    """Чужий заявник не може завантажити файл заявки."""
+    app_obj = create_application("Заявка", ("doc.txt", b"secret"))
+    file_id = app_obj.files[0].id
+    response = client.get(f"/files/{file_id}")
+    assert response.data == b"secret"
+    assert 'filename=doc.txt' in response.headers["Content-Disposition"]
+
+    other = User(email="other@test.com", role="applicant")
+    other.set_password("password")
+    db.session.add(other)
+    db.session.commit()
+    client.get("/logout")
+    client.post("/login", data={"email": "other@test.com", "password": "password"})
+    assert client.get(f"/files/{file_id}").status_code == 403
+
+
+def test_storage_migrate_command(app, runner):
+    """`flask storage-migrate` переносить файли зі старими іменами у сховище."""
+    owner = User(email="owner@test.com", password_hash="x")
+    db.session.add(owner)
+    db.session.flush()
+    apps = [Application(title=f"Заявка {i}", short_description="Опис", owner_id=owner.id) for i in range(2)]
+    db.session.add_all(apps)
+    db.session.flush()
+    folder = app.config["UPLOAD_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    for a in apps:
+        with open(os.path.join(folder, f"app_{a.id}_plan.txt"), "wb") as f:
+            f.write(b"legacy plan")
+        db.session.add(ApplicationFile(filename=f"app_{a.id}_plan.txt", application_id=a.id))
+    db.session.add(ApplicationFile(filename="app_1_lost.txt", application_id=apps[0].id))
+    db.session.commit()
+
+    result = runner.invoke(args=["storage-migrate", "--batch-size", "2"])
+    assert "Перенесено у сховище файлів: 2. Не знайдено на диску: 1." in result.output
+    result = runner.invoke(args=["storage-report"])
+    assert "дедуплікація 2.00x" in result.output
+    assert "поза сховищем" in result.output
+
+    db.session.expire_all()
+    migrated = db.session.execute(select(ApplicationFile).where(ApplicationFile.blob_sha256.is_not(None))).scalars().all()
+    assert [f.filename for f in migrated] == ["plan.txt", "plan.txt"]
+    assert not any(name.startswith("app_") and name != "app_1_lost.txt" for name in os.listdir(folder))
+    with open(file_store.path_of(migrated[0]), "rb") as f:
+        assert f.read() == b"legacy plan"
+
+
+def test_parallel_attach_and_detach_keep_refcounts(app):
+    """Паралельні прикріплення й видалення того самого вмісту не губляться і не лишають рядок без байтів."""
+    assert db.engine.url.database not in (None, "", ":memory:")
+    owner = User(email="owner@test.com", password_hash="x")
+    db.session.add(owner)
+    db.session.flush()
+    a = Application(title="Заявка", short_description="Опис", owner_id=owner.id)
+    db.session.add(a)
+    db.session.commit()
+    app_id = a.id
+    errors = []
+
+    def worker(n):
+        try:
+            with app.app_context():
+                for i in range(ROUNDS):
+                    record = file_store.attach(app_id, FileStorage(io.BytesIO(b"shared"), f"f{n}_{i}.txt"))
+                    db.session.commit()
+                    if i % 2:
+                        orphan = file_store.detach(db.session.get(ApplicationFile, record.id))
+                        db.session.commit()
+                        file_store.release(orphan)
+        except Exception as e:  # pragma: no cover — видно в assert нижче
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    [(sha256, refcount)] = _blobs().items()
+    assert refcount == db.session.scalar(select(func.count(ApplicationFile.id))) == THREADS * ROUNDS // 2
+    assert os.path.exists(file_store.blob_path(sha256))
+    assert _storage_drift() == {}
+
+
+def test_download_supports_conditional_and_range_requests(client, app, auth_headers, create_application):
+    """Сильний ETag з SHA-256: повторний перегляд — 304, частина файлу — 206."""
+    app_obj = create_application("Заявка", ("doc.pdf", b"0123456789" * 100))
+    url = f"/files/{app_obj.files[0].id}"
+    response = client.get(url)
+    assert response.headers["ETag"] == f'"{app_obj.files[0].blob_sha256}"'
+    assert "private" in response.headers["Cache-Control"]
+
+    assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": response.headers["Last-Modified"]}).status_code == 304
+    part = client.get(url, headers={"Range": "bytes=10-19"})
+    assert part.status_code == 206 and part.data == b"0123456789"
+    assert part.headers["Content-Range"] == "bytes 10-19/1000"
+
+
+def test_download_offload_to_proxy(client, app, auth_headers, create_application):
+    """З FILE_OFFLOAD застосунок віддає лише заголовок для проксі — і лише після перевірки прав."""
+    app_obj = create_application("Заявка", ("doc.pdf", b"%PDF offload"))
+    record = app_obj.files[0]
+    url = f"/files/{record.id}"
+    try:
+        app.config["FILE_OFFLOAD"] = "x-accel-redirect"
+        response = client.get(url)
+        sha256 = record.blob_sha256
+        assert response.headers["X-Accel-Redirect"] == f"/protected-uploads/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+        assert response.data == b"" and "X-Sendfile" not in response.headers
+        assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+        app.config["FILE_OFFLOAD"] = "x-sendfile"
+        assert client.get(url).headers["X-Sendfile"] == file_store.path_of(record)
+
+        client.get("/logout")
+        anonymous = client.get(url)
+        assert anonymous.status_code == 302 and "X-Sendfile" not in anonymous.headers
+    finally:
+        app.config["FILE_OFFLOAD"] = None
+
+
+def test_legacy_download_checks_access(client, app, auth_headers, create_application):
+    """/uploads/<ім'я> віддає лише старі файли заявок і лише тим, хто бачить заявку."""
+    app_obj = create_application("Заявка", ("doc.txt", b"new"))
+    legacy = f"app_{app_obj.id}_old.txt"
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], legacy), "wb") as f:
+        f.write(b"legacy")
+    missing = f"app_{app_obj.id}_gone.txt"
+    db.session.add(ApplicationFile(filename=legacy, application_id=app_obj.id))
+    db.session.add(ApplicationFile(filename=missing, application_id=app_obj.id))
+    db.session.commit()
+
+    assert client.get(f"/uploads/{legacy}").data == b"legacy"
+    assert client.get(f"/uploads/{missing}").status_code == 404
+    # Вміст сховища за хешем через старий маршрут не віддається
+    assert client.get(f"/uploads/{app_obj.files[0].blob_sha256}").status_code == 404
+
+    other = User(email="other@test.com", role="applicant")
+    other.set_password("password")
+    db.session.add(other)
+    db.session.commit()
+    client.get("/logout")
+    client.post("/login", data={"email": "other@test.com", "password": "password"})
+    assert client.get(f"/uploads/{legacy}").status_code == 403
+    # Чужий не відрізнить наявний файл від зниклого
+    assert client.get(f"/uploads/{missing}").status_code == 403
+
+
+def test_zip_of_all_files_is_streamed(client, app, auth_headers, create_application):
+    """Архів усіх файлів віддається порціями; стиснуті формати — без повторного стиснення."""
+    import zipfile
+    text = b"plain text " * 50_000
+    pdf = os.urandom(300_000)
+    app_obj = create_application("Заявка", ("notes.txt", text), ("scan.pdf", pdf), ("notes.txt", b"v2"))
+    app.config["FILE_STORE_CHUNK_SIZE"] = 64 * 1024
+    try:
+        response = client.get(f"/applications/{app_obj.id}/files.zip", buffered=False)
+        parts = list(response.response)
+    finally:
+        app.config["FILE_STORE_CHUNK_SIZE"] = 1024 * 1024
+    assert response.mimetype == "application/zip" and "Content-Length" not in response.headers
+    assert len(parts) > 5 and max(len(p) for p in parts) <= 70 * 1024  # жодна порція не тримає цілий файл
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(parts)))
+    assert archive.testzip() is None
+    info = {i.filename: i for i in archive.infolist()}
+    assert sorted(info) == ["notes (2).txt", "notes.txt", "scan.pdf"]
+    assert info["scan.pdf"].compress_type == zipfile.ZIP_STORED
+    assert info["notes.txt"].compress_type == zipfile.ZIP_DEFLATED and info["notes.txt"].compress_size < len(text) // 10
+    assert archive.read("scan.pdf") == pdf and archive.read("notes (2).txt") == b"v2"
+
+    other = User(email="other@test.com", role="applicant")
+    other.set_password("password")
+    db.session.add(other)
+    db.session.commit()
+    client.get("/logout")
+    client.post("/login", data={"email": "other@test.com", "password": "password"})
+    assert client.get(f"/applications/{app_obj.id}/files.zip").status_code == 403
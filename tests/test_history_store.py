@@ -0,0 +1,129 @@
+import random
+
+from sqlalchemy import func, select
+from extensions import db
+from models import User, Application, ApplicationHistory
+from helpers import save_history
+import history_store
+
+LONG = "Система автоматично добирає вправи за рівнем студента та відстежує прогрес. " * 40
+
+
+def _owner():
+    u = User(email="owner@test.com", password_hash="x")
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+def _edits(owner, count):
+    """Заявка з `count` подіями історії; повертає її та очікувані знімки по порядку."""
+    a = Application(title="Заявка", short_description=LONG, status="draft", owner_id=owner.id)
+    db.session.add(a)
+    db.session.flush()
+    expected = []
+    rng = random.Random(1)
+    for i in range(count):
+        if i:
+            position = rng.randrange(len(a.short_description))
+            a.short_description = a.short_description[:position] + f" правка {i} " + a.short_description[position + 5:]
+            a.title = f"Заявка v{i}" if i % 3 == 0 else a.title
+            a.expert_comment = None if i % 4 else f"Коментар {i}"
+        save_history(a, owner, "created" if i == 0 else "edited")
+        db.session.commit()
+        expected.append(history_store.Snapshot(a.title, a.short_description, a.expert_comment))
+    return a, expected
+
+
+def _events(app_id):
+    return db.session.execute(
+        select(ApplicationHistory).where(ApplicationHistory.application_id == app_id).order_by(ApplicationHistory.id)
+    ).scalars().all()
+
+
+def test_diff_patch_roundtrip():
+    """Дельта відтворює новий текст зі старого, включно з порожніми рядками."""
+    rng = random.Random(7)
+    for _ in range(50):
+        old = "".join(rng.choice("абв гд\n") for _ in range(rng.randrange(0, 200)))
+        new = list(old)
+        for _ in range(rng.randrange(0, 10)):
+            new.insert(rng.randrange(len(new) + 1), rng.choice("єжз "))
+        new = "".join(new)[rng.randrange(0, 5):]
+        assert history_store.patch(old, history_store.diff(old, new)) == new
+
+
+def test_history_is_reconstructed(app):
+    """Кожна подія відновлюється точно; повний знімок — раз на KEYFRAME_INTERVAL подій."""
+    with app.app_context():
+        owner = _owner()
+        a, expected = _edits(owner, 2 * history_store.KEYFRAME_INTERVAL + 3)
+        history_store.state_cache.clear()
+        db.session.expunge_all()
+
+        events = _events(a.id)
+        # Стрічка відображається від нових подій до старих
+        for event, snapshot in reversed(list(zip(events, expected))):
+            assert (event.snapshot_title, event.snapshot_description, event.snapshot_comment) == snapshot
+        keyframes = [e.id for e in events if "s" in history_store._unpack(e.snapshot_data)]
+        assert keyframes == [events[i].id for i in range(0, len(events), history_store.KEYFRAME_INTERVAL)]
+
+
+def test_deltas_are_small(app):
+    """Дрібна правка довгого опису займає в рази менше за повний знімок."""
+    with app.app_context():
+        owner = _owner()
+        a, _ = _edits(owner, 5)
+        sizes = [len(e.snapshot_data) for e in _events(a.id)]
+        assert sizes[0] < len(LONG.encode()) / 10  # ключовий кадр стиснутий zlib
+        assert max(sizes[1:]) < 200
+
+
+def test_reconstruction_reads_one_range(app, sql_recorder):
+    """Відновлення довгого ланцюжка — один запит, повторне читання — з кешу."""
+    with app.app_context():
+        owner = _owner()
+        a, expected = _edits(owner, history_store.KEYFRAME_INTERVAL)
+        history_store.state_cache.clear()
+        db.session.expunge_all()
+        last = _events(a.id)[-1]
+
+        sql_recorder.clear()
+        assert last.snapshot_description == expected[-1].description
+        assert len(sql_recorder.selects()) == 1
+        sql_recorder.clear()
+        assert last.snapshot_title == expected[-1].title
+        assert sql_recorder.selects() == []
+
+
+def test_compress_history_command(app, runner):
+    """`flask compress-history` переводить старі рядки у кадри й дельти без втрат."""
+    with app.app_context():
+        owner = _owner()
+        a = Application(title="Заявка", short_description=LONG, status="submitted", owner_id=owner.id)
+        db.session.add(a)
+        db.session.flush()
+        legacy = [history_store.Snapshot("Заявка", LONG + "x" * i, "Коментар" if i % 2 else None)
+                  for i in range(20)]
+        for snapshot in legacy:
+            db.session.add(ApplicationHistory(application_id=a.id, changed_by_id=owner.id, event_type="edited",
+                                              snapshot_status="submitted", snapshot_title=snapshot.title,
+                                              snapshot_description=snapshot.description,
+                                              snapshot_comment=snapshot.comment))
+        db.session.commit()
+        # Нова подія після старих починає власний ланцюжок з кадру
+        save_history(a, owner, "edited")
+        db.session.commit()
+        legacy.append(history_store.Snapshot(a.title, a.short_description, a.expert_comment))
+        before = history_store.stored_bytes()
+
+    result = runner.invoke(args=["compress-history", "--batch-size", "1", "--vacuum"])
+    assert "Стиснуто подій історії: 20" in result.output, result.output
+
+    with app.app_context():
+        history_store.state_cache.clear()
+        events = _events(a.id)
+        assert all(e.snapshot_data is not None and e._legacy_description is None for e in events)
+        assert [history_store.snapshot_of(e) for e in events] == legacy
+        assert history_store.stored_bytes() < before / 10
+        assert db.session.scalar(select(func.count()).where(ApplicationHistory.snapshot_status == "submitted")) == 21
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from extensions import db, mail
+from mail_queue import MailWorkerPool, enqueue_email
+from models import User, OutboxEmail
+
+
+def test_reset_request_only_enqueues_email(client, app):
+    """Запит на відновлення пароля лише додає лист у чергу, без SMTP."""
+    with app.app_context():
+        u = User(email="queue@test.com", role="applicant")
+        u.set_password("password")
+        db.session.add(u)
+        db.session.commit()
+
+    response = client.post('/password/reset/request', data={'email': 'queue@test.com'}, follow_redirects=True)
+    assert response.status_code == 200
+
+    with app.app_context():
+        entry = OutboxEmail.query.one()
+        assert entry.recipients == "queue@test.com"
+        assert entry.status == "pending"
+        assert "/password/reset/" in entry.body
+
+
+def test_worker_sends_batch_over_one_connection(app, smtp_sink):
+    """Воркер відправляє всю пачку через одне SMTP-з'єднання."""
+    with app.app_context():
+        for i in range(5):
+            enqueue_email(f"Лист {i}", [f"user{i}@test.com"], "Текст")
+        db.session.commit()
+
+    pool = MailWorkerPool(app, batch_size=10)
+    assert pool.drain() == 5
+
+    assert smtp_sink.received == 5
+    assert smtp_sink.connections == 1
+    with app.app_context():
+        assert {e.status for e in OutboxEmail.query.all()} == {"sent"}
+
+
+def test_worker_retries_with_backoff(app):
+    """Недоступний SMTP: лист повертається в чергу з відкладеною спробою."""
+    original_state = app.extensions['mail']
+    # Порт, на якому нікого немає
+    app.extensions['mail'] = mail.init_mail({**app.config, "MAIL_SERVER": "127.0.0.1", "MAIL_PORT": 1,
+                                             "MAIL_USE_TLS": False, "MAIL_SUPPRESS_SEND": False})
+    try:
+        with app.app_context():
+            enqueue_email("Тема", ["retry@test.com"], "Текст")
+            db.session.commit()
+
+        pool = MailWorkerPool(app)
+        pool.max_attempts = 2
+        pool.drain()
+
+        with app.app_context():
+            entry = OutboxEmail.query.one()
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            assert entry.status == "pending"
+            assert entry.attempts == 1
+            assert entry.next_attempt_at > now
+            assert entry.last_error
+
+            # Остання спроба — лист позначається як невдалий
+            entry.next_attempt_at = now
+            db.session.commit()
+        pool.drain()
+        with app.app_context():
+            assert OutboxEmail.query.one().status == "failed"
+    finally:
+        app.extensions['mail'] = original_state
@@ -0,0 +1,32 @@
+import time
+from flask_mail import Message
+from mail_transport import MailTransport
+
+
+def _messages(n):
+    return [Message(f"Лист {i}", recipients=[f"user{i}@test.com"], body="Текст") for i in range(n)]
+
+
+def test_transport_reuses_connection_across_batches(app, smtp_sink):
+    """Кілька пачок ідуть через одне з'єднання, доки воно не простоює."""
+    transport = MailTransport(batch_size=3, idle_timeout=60)
+    results = transport.send_many(_messages(7))
+    transport.close()
+
+    assert len(results) == 7
+    assert all(error is None for _, error in results)
+    assert smtp_sink.received == 7
+    assert smtp_sink.connections == 1
+    assert transport.connections_opened == 1
+
+
+def test_transport_reconnects_after_idle_timeout(app, smtp_sink):
+    """Після простою довше idle_timeout з'єднання відкривається заново."""
+    transport = MailTransport(batch_size=10, idle_timeout=0.05)
+    transport.send_many(_messages(2))
+    time.sleep(0.1)
+    transport.send_many(_messages(2))
+    transport.close()
+
+    assert smtp_sink.received == 4
+    assert transport.connections_opened == 2
@@ -0,0 +1,118 @@
+import re
+from datetime import datetime
+from extensions import db
+from models import User, Application, ApplicationHistory
+from pagination import keyset_paginate, encode_cursor
+
+
+def _make_apps(app, count, email="auth_user@test.com"):
+    """Заявки з однаковим created_at — порядок має розрізняти id."""
+    same_time = datetime(2025, 1, 1, 12, 0, 0)
+    with app.app_context():
+        owner = User.query.filter_by(email=email).first()
+        apps = [Application(title=f"Заявка {i:02d}", short_description="Опис", status="draft",
+                            owner_id=owner.id, created_at=same_time) for i in range(count)]
+        db.session.add_all(apps)
+        db.session.commit()
+
+
+def _cursor(html, direction):
+    match = re.search(direction + r"=([\w-]+)", html)
+    return match.group(1) if match else None
+
+
+def test_keyset_navigation_forward_and_back(app, auth_headers):
+    """Сторінки не перетинаються, а "назад" повертає ту саму попередню сторінку."""
+    _make_apps(app, 7)
+    order = [Application.created_at, Application.id]
+    with app.test_request_context():
+        stmt = db.select(Application)
+        first = keyset_paginate(stmt, order, page_size=3)
+        second = keyset_paginate(stmt, order, after=first.next_cursor, page_size=3)
+        third = keyset_paginate(stmt, order, after=second.next_cursor, page_size=3)
+
+        ids = [a.id for page in (first, second, third) for a in page]
+        assert ids == sorted(ids) and len(set(ids)) == 7
+        assert first.has_next and not first.has_prev
+        assert len(third) == 1 and not third.has_next
+
+        back = keyset_paginate(stmt, order, before=third.prev_cursor, page_size=3)
+        assert [a.id for a in back] == [a.id for a in second]
+        assert back.has_prev and back.has_next
+
+
+def test_my_applications_pages(client, app, auth_headers):
+    """Список заявок показує PAGE_SIZE записів і посилання на наступну сторінку."""
+    _make_apps(app, 5)
+    app.config["PAGE_SIZE"] = 2
+    try:
+        first = client.get("/applications").get_data(as_text=True)
+        assert first.count("Заявка ") == 2
+        assert "Заявка 04" in first  # найновіші першими (за id при однаковому часі)
+        assert _cursor(first, "before") is None
+
+        second = client.get(f"/applications?after={_cursor(first, 'after')}").get_data(as_text=True)
+        assert "Заявка 02" in second and "Заявка 04" not in second
+        assert _cursor(second, "before")
+    finally:
+        app.config["PAGE_SIZE"] = 20
+
+
+def test_invalid_cursor_returns_400(client, auth_headers):
+    """Зіпсований курсор — це 400, а не 500."""
+    assert client.get("/applications?after=not-a-cursor").status_code == 400
+    bad_length = encode_cursor([1, 2, 3])
+    assert client.get(f"/applications?after={bad_length}").status_code == 400
+
+
+def _history(app, count, email="auth_user@test.com"):
+    """Заявка з `count` подіями історії; коментар події — її порядковий номер."""
+    with app.app_context():
+        owner = User.query.filter_by(email=email).first()
+        a = Application(title="Заявка", short_description="Опис", status="submitted", owner_id=owner.id)
+        db.session.add(a)
+        db.session.flush()
+        db.session.add_all([ApplicationHistory(application_id=a.id, changed_by_id=owner.id, event_type="edited",
+                                               snapshot_status="submitted", snapshot_comment=f"Подія {i:03d}")
+                            for i in range(count)])
+        db.session.commit()
+        return a.id
+
+
+def test_history_timeline_pages(client, app, auth_headers):
+    """Сторінка заявки показує найновіші події, решта догортається фрагментами без повторів."""
+    app_id = _history(app, 25)
+    app.config["HISTORY_PAGE_SIZE"] = 10
+    html = client.get(f"/applications/{app_id}").get_data(as_text=True)
+    seen = re.findall(r"Подія (\d{3})", html)
+    assert seen == [f"{i:03d}" for i in range(24, 14, -1)]
+    assert 'class="status-badge status-submitted"' in html  # кольоровий статус події, як на всіх сторінках
+
+    while (cursor := _cursor(html, "after")) is not None:
+        response = client.get(f"/applications/{app_id}/history?after={cursor}")
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert "<html" not in html  # фрагмент, а не ціла сторінка
+        seen += re.findall(r"Подія (\d{3})", html)
+    assert seen == [f"{i:03d}" for i in range(24, -1, -1)]
+
+
+def test_history_page_cost_does_not_grow(client, app, auth_headers, sql_recorder):
+    """Сторінка заявки з тисячами подій робить стільки ж запитів, скільки з кількома."""
+    small, large = _history(app, 3), _history(app, 2000)
+    counts = []
+    for app_id in (small, large):
+        sql_recorder.clear()
+        assert client.get(f"/applications/{app_id}").status_code == 200
+        counts.append(len(sql_recorder.statements))
+    assert counts[0] == counts[1]
+
+
+def test_history_fragment_requires_access(client, app, auth_headers):
+    """Чужий заявник не може читати історію заявки через фрагмент."""
+    with app.app_context():
+        other = User(email="other@test.com", password_hash="x")
+        db.session.add(other)
+        db.session.commit()
+    app_id = _history(app, 1, email="other@test.com")
+    assert client.get(f"/applications/{app_id}/history").status_code == 403
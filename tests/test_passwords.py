@@ -0,0 +1,58 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models import User
+from passwords import password_hasher, PasswordHashBusy
+
+
+def test_login_rehashes_outdated_hash(client, app):
+    """Хеш за старою політикою (pbkdf2) перераховується при вдалому вході."""
+    with app.app_context():
+        u = User(email="legacy@test.com", role="applicant",
+                 password_hash=generate_password_hash("password", method="pbkdf2:sha256:1000"))
+        db.session.add(u)
+        db.session.commit()
+
+    response = client.post('/login', data={'email': 'legacy@test.com', 'password': 'password'},
+                           follow_redirects=True)
+    assert "Ви успішно увійшли в систему" in response.get_data(as_text=True)
+
+    with app.app_context():
+        new_hash = User.query.filter_by(email="legacy@test.com").first().password_hash
+        assert new_hash.startswith("scrypt:")
+        assert not password_hasher.needs_rehash(new_hash)
+
+
+def test_admission_limit_rejects_with_503(client, app, monkeypatch):
+    """Коли всі місця зайняті, хешування відхиляється, а логін повертає 503."""
+    monkeypatch.setitem(app.config, "PASSWORD_HASH_MAX_PENDING", 1)
+    monkeypatch.setitem(app.config, "PASSWORD_HASH_QUEUE_TIMEOUT", 0.01)
+    with app.app_context():
+        u = User(email="busy@test.com", role="applicant")
+        u.set_password("password")
+        db.session.add(u)
+        db.session.commit()
+
+    slots = password_hasher._get_slots(1)
+    slots.acquire()  # імітуємо операцію, що вже виконується
+    try:
+        with pytest.raises(PasswordHashBusy):
+            password_hasher.hash("another")
+        response = client.post('/login', data={'email': 'busy@test.com', 'password': 'password'})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+    finally:
+        slots.release()
+
+
+def test_hasher_records_queue_metrics(app):
+    """Пул рахує виконані операції та час очікування в черзі."""
+    password_hasher.reset_stats()
+    pwhash = password_hasher.hash("secret123")
+    assert password_hasher.verify(pwhash, "secret123") is True
+
+    stats = password_hasher.stats()
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["max_queue_ms"] >= 0
+    assert stats["avg_run_ms"] > 0
@@ -0,0 +1,84 @@
+"""
+Детектор N+1: скільки SQL-запитів виконує сторінка.
+
+Кожна сторінка рендериться на наборі з ROWS заявок, авторів, файлів і
+подій історії. Якщо шаблон лінь-завантажує зв'язок у циклі, кількість
+запитів росте разом з ROWS і перевищує бюджет маршруту. Бюджет рахує
+всі запити обробника (разом із сесією користувача), а не лише SELECT.
+"""
+import pytest
+from extensions import db
+from models import User, Application, ApplicationFile, ApplicationHistory
+
+ROWS = 6
+
+# (назва, роль, URL, максимум запитів): список — один SELECT,
+# сторінка заявки — заявка з автором + файли + перша сторінка історії з авторами подій
+BUDGETS = [
+    ("my_applications", "owner", "/applications", 1),
+    # + заявки, які експерт тримає в оренді
+    ("expert_dashboard", "expert", "/expert/applications", 2),
+    ("view_application", "owner", "/applications/{app_id}", 3),
+    ("edit_application", "owner", "/applications/{app_id}/edit", 3),
+    # фрагмент старіших подій: заявка (перевірка доступу) + сторінка історії
+    ("application_history", "owner", "/applications/{app_id}/history", 2),
+    # + UPDATE оренди, кандидати LSH, їхні підписи та самі схожі заявки,
+    # + нові події історії для індексу схожих і знайдені розглянуті заявки
+    ("expert_review", "expert", "/expert/applications/{app_id}", 9),
+    ("search", "expert", "/search?q=Заявка", 1),
+    ("admin_users", "admin", "/admin/users", 1),
+    ("admin_analytics", "admin", "/admin/analytics", 2),
+]
+
+
+@pytest.fixture
+def populated(app):
+    """ROWS поданих заявок від різних авторів; у першої — файли та історія від різних людей."""
+    with app.app_context():
+        users = {}
+        for role, email in (("owner", "owner@test.com"), ("expert", "expert@test.com"),
+                            ("admin", "admin@test.com")):
+            u = User(email=email, role="applicant" if role == "owner" else role)
+            u.set_password("password")
+            db.session.add(u)
+            users[role] = u
+        others = [User(email=f"author{i}@test.com", password_hash="x") for i in range(ROWS)]
+        db.session.add_all(others)
+        db.session.flush()
+
+        # Спільний опис: заявки схожі між собою, тож панель дублікатів не порожня
+        apps = [Application(title=f"Заявка {i}", short_description="Спільний опис винаходу для всіх заявок",
+                            status="submitted",
+                            owner_id=(users["owner"] if i == 0 else others[i]).id) for i in range(ROWS)]
+        apps[0].status = "draft"
+        db.session.add_all(apps)
+        db.session.flush()
+
+        target = apps[0]
+        for i, author in enumerate(others):
+            db.session.add(ApplicationFile(filename=f"app_{target.id}_{i}.txt", application_id=target.id))
+            db.session.add(ApplicationHistory(application_id=target.id, changed_by_id=author.id,
+                                              event_type="edited", snapshot_title=target.title,
+                                              snapshot_status="draft"))
+        db.session.commit()
+        return {"app_id": target.id}
+
+
+@pytest.mark.parametrize("name, role, url, budget", BUDGETS, ids=[b[0] for b in BUDGETS])
+def test_route_query_budget(client, app, populated, sql_recorder, name, role, url, budget):
+    """Кількість SQL-запитів сторінки не залежить від кількості рядків."""
+    client.post("/login", data={"email": f"{role}@test.com", "password": "password"})
+    if role == "expert":
+        with app.app_context():
+            db.session.execute(db.update(Application).values(status="submitted"))
+            db.session.commit()
+    client.get("/profile")  # прогріваємо кеш поточного користувача
+    sql_recorder.clear()
+
+    response = client.get(url.format(**populated))
+    assert response.status_code == 200
+
+    executed = [" ".join(sql.split()) for sql, _ in sql_recorder.statements]
+    assert len(executed) <= budget, (
+        f"{name}: {len(executed)} запитів при бюджеті {budget}:\n" + "\n".join(executed)
+    )
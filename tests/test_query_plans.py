@@ -0,0 +1,169 @@
+"""
+Регресійні тести планів запитів.
+
+Кожен маршрут викликається на невеликому наборі даних, а для кожного SELECT,
+який він виконав, береться EXPLAIN QUERY PLAN. Тест падає, якщо SQLite
+обходить таблицю повністю (SCAN) або сортує результат у тимчасовому B-дереві
+замість того, щоб узяти порядок з індексу. SCAN у порядку первинного ключа
+чи індексу з LIMIT і без WHERE (перша сторінка курсорної пагінації)
+дозволений: він читає лише n рядків.
+"""
+import io
+import re
+import pytest
+from extensions import db
+from models import User, Application, ApplicationFile, PasswordResetToken
+from helpers import save_history
+from pagination import encode_cursor
+
+# Маршрути, яким поки що дозволено повний обхід: вони за своєю суттю
+# читають усю таблицю. Прибирати звідси, щойно маршрут перестає це робити.
+KNOWN_FULL_SCANS = {}
+
+# (назва, роль, метод, URL, дані форми)
+ROUTES = [
+    ("register", None, "POST", "/register",
+     {"email": "new@example.com", "password": "StrongPass1", "confirm_password": "StrongPass1"}),
+    ("login", None, "POST", "/login", {"email": "owner@test.com", "password": "password"}),
+    ("reset_request", None, "POST", "/password/reset/request", {"email": "owner@test.com"}),
+    ("reset_form", None, "GET", "/password/reset/{token}", None),
+    ("profile", "owner", "GET", "/profile", None),
+    ("my_applications", "owner", "GET", "/applications", None),
+    ("my_applications_next", "owner", "GET", "/applications?after={owner_cursor}", None),
+    ("my_applications_prev", "owner", "GET", "/applications?before={owner_cursor}", None),
+    ("create_application", "owner", "POST", "/applications/new",
+     {"title": "Нова", "short_description": "Опис", "files": (io.BytesIO(b"data"), "plan.txt")}),
+    ("view_application", "owner", "GET", "/applications/{submitted_id}", None),
+    ("application_history", "owner", "GET", "/applications/{submitted_id}/history?after={history_cursor}", None),
+    ("edit_application", "owner", "GET", "/applications/{draft_id}/edit", None),
+    ("edit_application_post", "owner", "POST", "/applications/{draft_id}/edit",
+     {"title": "Змінена", "short_description": "Опис", "version": 1}),
+    ("submit_application", "owner", "POST", "/applications/{draft_id}/submit", {"version": 1}),
+    ("cancel_application", "owner", "POST", "/applications/{submitted_id}/cancel", {"version": 1}),
+    ("download_file", "owner", "GET", "/files/{file_id}", None),
+    ("download_files_zip", "expert", "GET", "/applications/{submitted_id}/files.zip", None),
+    ("delete_file", "owner", "POST", "/applications/file/{file_id}/delete", None),
+    ("expert_dashboard", "expert", "GET", "/expert/applications", None),
+    ("expert_dashboard_next", "expert", "GET", "/expert/applications?after={owner_cursor}", None),
+    ("expert_review", "expert", "GET", "/expert/applications/{submitted_id}", None),
+    ("expert_review_post", "expert", "POST", "/expert/applications/{submitted_id}",
+     {"decision": "approved", "comment": "Добре", "version": 1}),
+    ("search", "expert", "GET", "/search?q=Подана", None),
+    ("admin_users", "admin", "GET", "/admin/users", None),
+    ("admin_users_next", "admin", "GET", "/admin/users?after={user_cursor}", None),
+    ("admin_update_user", "admin", "POST", "/admin/users/{owner_id}/update", {"action": "toggle_block"}),
+    ("admin_stats", "admin", "GET", "/admin/stats", None),
+    ("admin_analytics", "admin", "GET", "/admin/analytics", None),
+]
+
+# "SCAN ... VIRTUAL TABLE" — це пошук по індексу FTS5, а не обхід таблиці
+BAD_PLAN = re.compile(r"^SCAN (?!CONSTANT ROW|anon_|\w+ VIRTUAL TABLE)|USE TEMP B-TREE FOR ORDER BY")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (RIGHT PART OF |LAST TERM OF )?ORDER BY")
+LIMITED = re.compile(r"\bORDER BY\b.*\bLIMIT\b", re.S)
+FILTERED = re.compile(r"\bWHERE\b")
+# Порядок за агрегатом (ранжування груп) індекс дати не може
+AGGREGATE_ORDER = re.compile(r"\bORDER BY (count|sum|max|min|avg)\(", re.I)
+ORDERED_SCAN = re.compile(r"^SCAN (\w+)( USING (INTEGER PRIMARY KEY|(COVERING )?INDEX \w+))?$")
+
+
+def ordered_scan(sql, line):
+    """SCAN у порядку індексу або rowid (ORDER BY <таблиця>.id) — без окремого сортування."""
+    match = ORDERED_SCAN.search(line)
+    return bool(match) and bool(match.group(2) or re.search(rf"\bORDER BY {match.group(1)}\.id\b", sql))
+
+
+def is_bad_plan(sql, plan):
+    # Обхід у порядку індексу, що зупиняється після LIMIT рядків, — лише без фільтра:
+    # з WHERE він може перебрати всю таблицю, поки набере LIMIT рядків
+    first_page = LIMITED.search(sql) and not FILTERED.search(sql)
+    if any(BAD_PLAN.search(line) and not TEMP_SORT.search(line) and not (first_page and ordered_scan(sql, line))
+           for line in plan):
+        return True
+    # Сортування груп за агрегатом допустиме: рядки вже знайдено пошуком по індексу,
+    # тож сортується лише вибране, а не вся таблиця
+    return any(TEMP_SORT.search(line) for line in plan) and not AGGREGATE_ORDER.search(sql)
+
+
+def test_limit_does_not_excuse_filtered_scan():
+    """LIMIT рятує лише обхід у порядку індексу без фільтра; SCAN з WHERE лишається поганим планом."""
+    assert not is_bad_plan("SELECT * FROM users ORDER BY users.id LIMIT ?", ["SCAN users"])
+    assert not is_bad_plan("SELECT * FROM t ORDER BY t.created_at LIMIT ?", ["SCAN t USING INDEX ix_t_created_at"])
+    assert is_bad_plan("SELECT * FROM users WHERE users.email LIKE ? ORDER BY users.id LIMIT ?", ["SCAN users"])
+    assert is_bad_plan("SELECT * FROM users ORDER BY users.email LIMIT ?", ["SCAN users"])
+
+
+def test_aggregate_order_needs_index_search():
+    """Ранжування груп за count(*) дозволене лише поверх пошуку по індексу."""
+    sql = "SELECT a FROM t WHERE b IN (?) GROUP BY a ORDER BY count(*) DESC LIMIT ?"
+    assert not is_bad_plan(sql, ["SEARCH t USING COVERING INDEX ix_t_b (b=?)",
+                                 "USE TEMP B-TREE FOR GROUP BY", "USE TEMP B-TREE FOR ORDER BY"])
+    assert is_bad_plan(sql, ["SCAN t", "USE TEMP B-TREE FOR GROUP BY", "USE TEMP B-TREE FOR ORDER BY"])
+
+
+@pytest.fixture
+def scenario(app):
+    """Заявник з чернеткою та поданою заявкою (файли, історія), експерт і адмін."""
+    with app.app_context():
+        users = {}
+        for role, email in (("owner", "owner@test.com"), ("expert", "expert@test.com"),
+                            ("admin", "admin@test.com")):
+            u = User(email=email, role="applicant" if role == "owner" else role)
+            u.set_password("password")
+            db.session.add(u)
+            users[role] = u
+        db.session.flush()
+
+        draft = Application(title="Чернетка", short_description="Опис", status="draft", owner=users["owner"])
+        submitted = Application(title="Подана", short_description="Опис", status="submitted",
+                                owner=users["owner"])
+        db.session.add_all([draft, submitted])
+        db.session.flush()
+        for app_obj in (draft, submitted):
+            save_history(app_obj, users["owner"], "created")
+        draft_file = ApplicationFile(filename="app_draft_doc.txt", application_id=draft.id)
+        db.session.add_all([
+            draft_file,
+            ApplicationFile(filename="app_submitted_doc.txt", application_id=submitted.id),
+            PasswordResetToken(token="plan-token", user=users["owner"]),
+        ])
+        db.session.commit()
+
+        return {
+            "token": "plan-token",
+            "owner_id": users["owner"].id,
+            "draft_id": draft.id,
+            "submitted_id": submitted.id,
+            "file_id": draft_file.id,
+            "owner_cursor": encode_cursor([submitted.created_at, submitted.id]),
+            "user_cursor": encode_cursor([users["owner"].id]),
+            "history_cursor": encode_cursor([submitted.history.first().created_at, submitted.history.first().id]),
+        }
+
+
+def explain(sql, params):
+    rows = db.session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()
+    return [row[3] for row in rows]
+
+
+@pytest.mark.parametrize("name, role, method, url, data", ROUTES, ids=[r[0] for r in ROUTES])
+def test_route_queries_use_indexes(client, app, scenario, sql_recorder, name, role, method, url, data):
+    """Жоден запит маршруту не обходить таблицю повністю і не сортує без індексу."""
+    if role:
+        client.post("/login", data={"email": f"{role}@test.com", "password": "password"})
+    sql_recorder.clear()
+
+    response = client.open(url.format(**scenario), method=method, data=data,
+                           content_type="multipart/form-data" if method == "POST" else None)
+    assert response.status_code < 500
+
+    selects = sql_recorder.selects()
+    assert selects, "маршрут не виконав жодного SELECT — перевірте сценарій"
+    if name in KNOWN_FULL_SCANS:
+        return
+
+    problems = []
+    for sql, params in selects:
+        plan = explain(sql, params)
+        if is_bad_plan(sql, plan):
+            problems.append(" ".join(sql.split()) + "\n    " + "\n    ".join(plan))
+    assert not problems, "Запити без індексу:\n" + "\n".join(problems)
@@ -0,0 +1,85 @@
+from unittest.mock import patch
+import pytest
+from extensions import db
+from models import User, PasswordResetToken
+from rate_limit import MemoryBackend, retry_after, sliding_estimate
+
+
+def test_sliding_window_estimate():
+    """Попереднє вікно враховується пропорційно тому, скільки його ще в кадрі."""
+    assert sliding_estimate(current=2, previous=10, now=90, window=60) == 2 + 10 * 0.5
+    assert sliding_estimate(current=2, previous=10, now=60, window=60) == 12
+
+
+def _attempt(backend, now, limit=5, window=60):
+    """Те саме, що RateLimiter.check для одного ключа: None або Retry-After."""
+    current, previous = backend.hit("login:ip:1", window, now)
+    if sliding_estimate(current, previous, now, window) > limit:
+        return retry_after(current, previous, now, window, limit)
+    return None
+
+
+@pytest.mark.parametrize("previous_hits, hits, start", [
+    (0, 6, 6030),    # перевищено в поточному вікні, попереднє порожнє
+    (0, 12, 6059),   # далеко за лімітом під кінець вікна
+    (8, 2, 6010),    # ліміт вичерпано попереднім вікном
+    (5, 4, 6001),    # до ліміту бракує однієї спроби
+])
+def test_retry_after_is_enough(previous_hits, hits, start):
+    """Спроба рівно через Retry-After секунд проходить."""
+    backend = MemoryBackend()
+    for _ in range(previous_hits):
+        _attempt(backend, start - 60)
+    results = [_attempt(backend, start) for _ in range(hits)]
+    wait = results[-1]
+    assert wait is not None
+    assert _attempt(backend, start + wait) is None
+
+
+def test_memory_backend_is_bounded():
+    """Кількість ключів у пам'яті обмежена, найдавніші витісняються."""
+    backend = MemoryBackend(max_keys=3)
+    for i in range(10):
+        backend.hit(f"login:ip:{i}", 60, now=0)
+    assert len(backend._data) == 3
+    assert backend.hit("login:ip:9", 60, now=1) == (2, 0)
+
+
+def test_login_throttled_per_email_before_hashing(client, app, monkeypatch):
+    """Після ліміту спроб логін відповідає 429 і не перевіряє пароль."""
+    monkeypatch.setitem(app.config, "RATELIMIT_LOGIN_PER_EMAIL", (3, 60))
+    with app.app_context():
+        u = User(email="victim@test.com", role="applicant")
+        u.set_password("password")
+        db.session.add(u)
+        db.session.commit()
+
+    for _ in range(3):
+        response = client.post("/login", data={"email": "victim@test.com", "password": "wrong"})
+        assert response.status_code == 200
+
+    with patch("models.User.check_password") as check:
+        response = client.post("/login", data={"email": "victim@test.com", "password": "password"})
+        check.assert_not_called()
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert "Забагато спроб входу" in response.get_data(as_text=True)
+
+
+def test_reset_throttled_with_shared_backend(client, app, monkeypatch):
+    """Спільний (database) бекенд: зайві запити не створюють токенів."""
+    monkeypatch.setitem(app.config, "RATELIMIT_BACKEND", "database")
+    monkeypatch.setitem(app.config, "RATELIMIT_RESET_PER_IP", (2, 300))
+    with app.app_context():
+        u = User(email="reset_limit@test.com", role="applicant")
+        u.set_password("password")
+        db.session.add(u)
+        db.session.commit()
+
+    statuses = [
+        client.post("/password/reset/request", data={"email": "reset_limit@test.com"}).status_code
+        for _ in range(4)
+    ]
+    assert statuses == [302, 302, 429, 429]
+    with app.app_context():
+        assert PasswordResetToken.query.count() == 2
@@ -0,0 +1,175 @@
+import base64
+import fcntl
+import io
+import os
+
+import pytest
+
+from sqlalchemy import select
+from werkzeug.exceptions import ClientDisconnected
+from extensions import db
+from models import User, Application, UploadSession
+import resumable
+import storage
+
+CHUNK = "application/offset+octet-stream"
+
+
+def _application(app, email="auth_user@test.com", status="draft"):
+    with app.app_context():
+        owner = User.query.filter_by(email=email).first()
+        a = Application(title="Заявка", short_description="Опис", status=status, owner_id=owner.id)
+        db.session.add(a)
+        db.session.commit()
+        return a.id
+
+
+def _start(client, app_id, length, filename="video.mp4"):
+    meta = "filename " + base64.b64encode(filename.encode()).decode()
+    return client.post(f"/applications/{app_id}/uploads", headers={"Upload-Length": str(length), "Upload-Metadata": meta})
+
+
+def _patch(client, location, offset, data):
+    return client.patch(location, data=data, content_type=CHUNK, headers={"Upload-Offset": str(offset)})
+
+
+def _offset(client, location):
+    return int(client.head(location).headers["Upload-Offset"])
+
+
+def test_upload_in_chunks_and_finish(client, app, auth_headers):
+    """Файл збирається з частин і після finish стає звичайним файлом заявки."""
+    app_id = _application(app)
+    content = os.urandom(300_000)
+    response = _start(client, app_id, len(content))
+    assert response.status_code == 201 and response.headers["Tus-Resumable"] == "1.0.0"
+    location = response.headers["Location"]
+
+    assert _patch(client, location, 0, content[:100_000]).headers["Upload-Offset"] == "100000"
+    assert _offset(client, location) == 100_000
+    assert client.post(location + "/finish").status_code == 409  # ще не все
+    assert _patch(client, location, 100_000, content[100_000:]).status_code == 204
+
+    result = client.post(location + "/finish")
+    assert result.status_code == 201 and result.json["filename"] == "video.mp4"
+    assert client.get(result.json["url"]).data == content
+    assert db.session.scalar(select(UploadSession)) is None
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".partial")) == []
+
+
+def test_resume_sends_only_missing_bytes(client, app, auth_headers):
+    """Після обриву зберігається прийняте; повтор частини нічого не псує, дірка — 409."""
+    app_id = _application(app)
+    content = os.urandom(200_000)
+    location = _start(client, app_id, len(content)).headers["Location"]
+
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            data = super().read(min(size, 50_000))
+            if not data:
+                raise ClientDisconnected()
+            return data
+
+    # Зв'язок обірвався після 120 000 байт із 200 000 частини
+    with app.test_request_context():
+        upload = db.session.get(UploadSession, location.rsplit("/", 1)[1])
+        try:
+            resumable.write(upload, 0, Broken(content[:120_000]))
+        except ClientDisconnected:
+            pass
+    assert _offset(client, location) == 120_000
+
+    # Відповідь на частину загубилась — клієнт повторює її з того ж зсуву
+    assert _patch(client, location, 100_000, content[100_000:120_000]).headers["Upload-Offset"] == "120000"
+    gap = _patch(client, location, 150_000, content[150_000:])
+    assert gap.status_code == 409 and gap.headers["Upload-Offset"] == "120000"
+    assert _patch(client, location, 120_000, content[120_000:]).status_code == 204
+
+    file_url = client.post(location + "/finish").json["url"]
+    assert client.get(file_url).data == content
+
+
+def test_concurrent_chunk_is_rejected(client, app, auth_headers):
+    """Поки в сесію пише один запит, другий отримує 423 і нічого не змінює."""
+    location = _start(client, _application(app), 10).headers["Location"]
+    with app.app_context():
+        path = resumable.partial_path(location.rsplit("/", 1)[1])
+    with open(path, "r+b") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert _patch(client, location, 0, b"0123456789").status_code == 423
+    assert _offset(client, location) == 0
+
+
+def test_limits_and_access(client, app, auth_headers):
+    """Розмір перевіряється до прийому тіла, чужі сесії не видно, без входу — 401."""
+    app_id = _application(app)
+    assert _start(client, app_id, app.config["UPLOAD_SESSION_MAX_SIZE"] + 1).status_code == 413
+    location = _start(client, app_id, 10).headers["Location"]
+    assert _patch(client, location, 5, b"01234").status_code == 409
+    assert _patch(client, location, 0, b"01234567890").status_code == 413
+    assert client.patch(location, data=b"x", headers={"Upload-Offset": "0"}).status_code == 415
+
+    other = User(email="other@test.com", role="applicant")
+    other.set_password("password")
+    db.session.add(other)
+    db.session.commit()
+    client.get("/logout")
+    assert client.head(location).status_code == 401
+    client.post("/login", data={"email": "other@test.com", "password": "password"})
+    assert client.head(location).status_code == 404
+    assert _start(client, app_id, 10).status_code == 403
+
+
+def test_open_sessions_count_towards_file_limit(client, app, auth_headers):
+    """Незавершені завантаження займають місця з ліміту в 10 файлів."""
+    app_id = _application(app)
+    for _ in range(10):
+        assert _start(client, app_id, 1).status_code == 201
+    assert _start(client, app_id, 1).status_code == 409
+
+
+def test_uploads_expire_command(client, app, auth_headers, runner):
+    """`flask uploads-expire` прибирає покинуті сесії разом із частковими файлами."""
+    location = _start(client, _application(app), 10).headers["Location"]
+    _patch(client, location, 0, b"01234")
+    result = runner.invoke(args=["uploads-expire"])
+    assert "Видалено незавершених завантажень: 0." in result.output
+    result = runner.invoke(args=["uploads-expire", "--ttl", "-1"])
+    assert "Видалено незавершених завантажень: 1." in result.output
+    assert client.head(location).status_code == 404
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".partial")) == []
+
+
+def test_failed_finish_can_be_retried_or_cancelled(client, app, auth_headers, monkeypatch):
+    """Якщо сховище не прийняло файл, сесія й частковий файл лишаються: finish можна повторити, DELETE — теж працює."""
+    app_id = _application(app)
+    content = os.urandom(50_000)
+    locations = [_start(client, app_id, len(content)).headers["Location"] for _ in range(2)]
+    for location in locations:
+        _patch(client, location, 0, content)
+
+    def refuse(self, key, path):
+        raise OSError("диск заповнено")
+
+    monkeypatch.setattr(storage.LocalStorage, "put_file", refuse)
+    for location in locations:
+        with pytest.raises(OSError):
+            client.post(location + "/finish")
+        assert _offset(client, location) == len(content)
+    monkeypatch.undo()
+
+    result = client.post(locations[0] + "/finish")
+    assert result.status_code == 201 and client.get(result.json["url"]).data == content
+    assert client.delete(locations[1]).status_code == 204
+    assert db.session.scalar(select(UploadSession)) is None
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".partial")) == []
+    assert os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], ".tmp")) == []
+
+
+def test_cancel_without_partial_file(client, app, auth_headers):
+    """Сесію, частковий файл якої вже зник, можна скасувати."""
+    location = _start(client, _application(app), 10).headers["Location"]
+    with app.app_context():
+        os.remove(resumable.partial_path(location.rsplit("/", 1)[1]))
+    assert client.delete(location).status_code == 204
+    assert client.head(location).status_code == 404
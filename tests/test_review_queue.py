@@ -0,0 +1,171 @@
+import threading
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+from extensions import db
+from models import User, Application
+import review_queue
+
+REVIEWERS = 8
+
+
+def _users(*emails):
+    users = [User(email=email, role="expert", password_hash="x") for email in emails]
+    db.session.add_all(users)
+    db.session.commit()
+    return [u.id for u in users]
+
+
+def _submitted(owner_id, count):
+    apps = [Application(title=f"Заявка {i}", short_description="Опис", status="submitted", owner_id=owner_id)
+            for i in range(count)]
+    db.session.add_all(apps)
+    db.session.commit()
+    return [a.id for a in apps]
+
+
+def test_claims_are_disjoint(app):
+    """Двоє експертів беруть різні заявки; власні заявки експерт не отримує."""
+    with app.app_context():
+        owner, first, second = _users("owner@test.com", "e1@test.com", "e2@test.com")
+        ids = _submitted(owner, 5)
+        own = _submitted(first, 1)
+
+        taken_first = review_queue.claim_next(first, 3)
+        taken_second = review_queue.claim_next(second, 3)
+        assert sorted(taken_first) == ids[:3]
+        assert sorted(taken_second) == ids[3:] + own
+        assert review_queue.claim_next(first, 3) == []
+        assert [a.id for a in review_queue.leases(first)] == sorted(taken_first)
+
+
+def test_expired_and_released_leases_return_to_queue(app):
+    """Прострочена оренда й повернута заявка знову доступні іншим."""
+    with app.app_context():
+        owner, first, second = _users("owner@test.com", "e1@test.com", "e2@test.com")
+        expired, returned = _submitted(owner, 2)
+        review_queue.claim_next(first, 2)
+        assert review_queue.claim_next(second) == []
+
+        db.session.execute(update(Application).where(Application.id == expired)
+                           .values(available_at=review_queue._utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+        assert review_queue.release(returned, first)
+        assert sorted(review_queue.claim_next(second)) == [expired, returned]
+
+
+def test_review_page_respects_lease(client, app, expert_headers):
+    """Заявку, взяту іншим експертом, не можна відкрити на розгляд і вирішити."""
+    with app.app_context():
+        owner, other = _users("owner@test.com", "other@test.com")
+        [app_id] = _submitted(owner, 1)
+        review_queue.claim_next(other)
+
+    response = client.get(f"/expert/applications/{app_id}", follow_redirects=True)
+    assert "розглядає інший експерт" in response.get_data(as_text=True)
+    client.post(f"/expert/applications/{app_id}", data={"decision": "approved", "comment": ""})
+    with app.app_context():
+        assert db.session.get(Application, app_id).status == "submitted"
+
+
+def test_viewing_does_not_lease(client, app, expert_headers):
+    """Відкрита сторінка розгляду заявку не займає — лише кнопка "Взяти на розгляд" чи рішення."""
+    with app.app_context():
+        [owner] = _users("owner@test.com")
+        [app_id] = _submitted(owner, 1)
+
+    html = client.get(f"/expert/applications/{app_id}").get_data(as_text=True)
+    assert "Взяти на розгляд" in html
+    with app.app_context():
+        assert db.session.get(Application, app_id).claimed_by_id is None
+
+    client.post(f"/expert/applications/{app_id}/claim")
+    with app.app_context():
+        expert_id = db.session.scalar(select(User.id).filter_by(email="expert_h@test.com"))
+        assert review_queue.holder(db.session.get(Application, app_id)) == expert_id
+    assert "Взяти на розгляд" not in client.get(f"/expert/applications/{app_id}").get_data(as_text=True)
+
+
+def test_admins_never_lease(client, app, admin_headers):
+    """Адміністратор переглядає й вирішує заявки, але не займає їх у черзі."""
+    with app.app_context():
+        [owner] = _users("owner@test.com")
+        first, second = _submitted(owner, 2)
+
+    assert client.get(f"/expert/applications/{first}").status_code == 200
+    client.post(f"/expert/applications/{first}/claim")
+    client.post("/expert/queue/claim")
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).where(Application.claimed_by_id.is_not(None))) == 0
+
+    client.post(f"/expert/applications/{second}",
+                data={"decision": "approved", "comment": "", "version": 1})
+    with app.app_context():
+        decided = db.session.get(Application, second)
+        assert decided.status == "approved" and decided.claimed_by_id is None
+
+
+def test_claim_button(client, app, expert_headers):
+    """Кнопка "Взяти наступні" видає заявки, і вони з'являються в кабінеті."""
+    with app.app_context():
+        [owner] = _users("owner@test.com")
+        _submitted(owner, 2)
+
+    response = client.post("/expert/queue/claim", follow_redirects=True)
+    html = response.get_data(as_text=True)
+    assert "Взято на розгляд заявок: 2" in html
+    assert "Повернути в чергу" in html
+
+
+def test_queue_query_uses_index(app):
+    """Пошук наступних вільних заявок іде по індексу черги без сортування."""
+    with app.app_context():
+        stmt = review_queue.available(1, review_queue._utcnow()).limit(5)
+        compiled = stmt.compile(db.engine, compile_kwargs={"literal_binds": True})
+        plan = [row[3] for row in db.session.connection()
+                .exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()]
+        assert any("ix_applications_queue" in line for line in plan), plan
+        assert not any("TEMP B-TREE" in line for line in plan), plan
+
+
+def test_parallel_reviewers_never_share_work(app):
+    """Навантажувальний тест: паралельні експерти розбирають чергу без перетинів."""
+    with app.app_context():
+        owner, *experts = _users("owner@test.com", *(f"e{i}@test.com" for i in range(REVIEWERS)))
+        ids = _submitted(owner, 200)
+
+    decided = {expert_id: [] for expert_id in experts}
+    errors = []
+
+    def reviewer(expert_id):
+        try:
+            with app.app_context():
+                while True:
+                    claimed = review_queue.claim_next(expert_id, 3)
+                    if not claimed:
+                        return
+                    for app_id in claimed:
+                        # Рішення зберігається лише поки оренда за цим експертом
+                        done = db.session.execute(
+                            update(Application)
+                            .where(Application.id == app_id, Application.claimed_by_id == expert_id,
+                                   Application.status == "submitted")
+                            .values(status="approved")
+                        ).rowcount
+                        db.session.commit()
+                        if done:
+                            decided[expert_id].append(app_id)
+        except Exception as e:  # pragma: no cover — видно в assert нижче
+            errors.append(e)
+
+    threads = [threading.Thread(target=reviewer, args=(expert_id,)) for expert_id in experts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    all_decided = [app_id for done in decided.values() for app_id in done]
+    assert sorted(all_decided) == ids
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).where(Application.status == "submitted")) == 0
@@ -0,0 +1,99 @@
+from sqlalchemy import text
+from extensions import db
+from models import User, Application
+import search
+
+
+def _add(app, title, description, comment=None):
+    with app.app_context():
+        owner = User.query.filter_by(email="owner@test.com").first()
+        if owner is None:
+            owner = User(email="owner@test.com", password_hash="x")
+            db.session.add(owner)
+            db.session.flush()
+        a = Application(title=title, short_description=description, expert_comment=comment,
+                        owner_id=owner.id, status="submitted")
+        db.session.add(a)
+        db.session.commit()
+        return a.id
+
+
+def test_build_query_strips_fts_syntax():
+    """Оператори FTS5 з вводу не проходять, кожне слово — префікс."""
+    assert search.build_query('алгоритм OR "x" NEAR(') == '"алгоритм"* "OR"* "x"* "NEAR"*'
+    assert search.build_query("  ?! ") == ""
+
+
+def test_search_ranks_title_and_highlights(client, app, expert_headers):
+    """Збіг у назві вище за збіг в описі; фрагмент підсвічено й екрановано."""
+    in_description = _add(app, "Двигун", "Новий алгоритм <script> керування")
+    in_title = _add(app, "Алгоритм стиснення", "Опис")
+    _add(app, "Інше", "Нічого спільного")
+
+    html = client.get("/search?q=алгоритм").get_data(as_text=True)
+    assert html.index(f">{in_title}<") < html.index(f">{in_description}<")
+    assert "<mark>Алгоритм</mark>" in html
+    assert "&lt;script&gt;" in html and "<script> керування" not in html
+    assert "Нічого спільного" not in html
+
+
+def test_index_follows_edits_and_comments(app):
+    """Тригери оновлюють індекс при зміні назви та коментаря експерта."""
+    app_id = _add(app, "Квантовий процесор", "Опис")
+    with app.test_request_context():
+        assert [r["id"] for r in search.search("квантов")[0]] == [app_id]
+
+        a = db.session.get(Application, app_id)
+        a.title = "Оптичний процесор"
+        a.expert_comment = "Бракує креслень"
+        db.session.commit()
+
+        assert search.search("квантов")[0] == []
+        assert [r["id"] for r in search.search("креслен")[0]] == [app_id]
+        db.session.delete(a)
+        db.session.commit()
+        assert search.search("оптичн")[0] == []
+
+
+def test_search_pagination(app):
+    """Сторінки не перетинаються, остання не має посилання далі."""
+    ids = {_add(app, f"Модуль {i}", "Опис") for i in range(5)}
+    with app.test_request_context():
+        first, has_next = search.search("модуль", page=1, page_size=3)
+        second, last_has_next = search.search("модуль", page=2, page_size=3)
+    assert has_next and not last_has_next
+    assert {r["id"] for r in first + second} == ids
+
+
+def test_best_match_ranks_first_among_many_newer(app):
+    """Ранжуються всі збіги: давня заявка зі словом у назві випереджає тисячі новіших."""
+    best = _add(app, "Гідропривід", "Опис")
+    with app.app_context():
+        owner_id = db.session.get(Application, best).owner_id
+        db.session.execute(text(
+            "INSERT INTO applications (title, short_description, status, owner_id, created_at) "
+            "VALUES ('Інше', 'згадано гідропривід', 'submitted', :owner, datetime('now'))"
+        ), [{"owner": owner_id}] * 2500)
+        db.session.commit()
+    with app.test_request_context():
+        results, has_next = search.search("гідропривід", page_size=10)
+    assert results[0]["id"] == best and has_next
+
+
+def test_search_requires_expert(client, auth_headers):
+    """Заявник не має доступу до пошуку."""
+    assert client.get("/search?q=x").status_code == 302
+
+
+def test_ensure_index_backfills_existing_database(app):
+    """init-db будує індекс для бази, де заявки з'явилися раніше за пошук."""
+    app_id = _add(app, "Старий синтезатор", "Опис")
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text("DROP TABLE applications_fts"))
+            for trigger in ("ai", "ad", "au"):
+                connection.execute(text(f"DROP TRIGGER applications_fts_{trigger}"))
+            assert search.ensure_index(connection) is True
+            assert search.ensure_index(connection) is False
+    with app.test_request_context():
+        assert [r["id"] for r in search.search("синтезатор")[0]] == [app_id]
@@ -0,0 +1,146 @@
+import numpy as np
+from extensions import db
+from models import User, Application
+from helpers import save_history
+import similar
+
+BASE = "Інноваційний алгоритм для навчання. Система автоматично добирає вправи за рівнем студента."
+
+
+def _owner():
+    u = User(email="owner@test.com", password_hash="x")
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+def _add(owner, title, description, status):
+    """Заявка з подією в історії — так само, як її створюють маршрути."""
+    a = Application(title=title, short_description=description, owner_id=owner.id, status=status)
+    db.session.add(a)
+    db.session.flush()
+    save_history(a, owner, "created")
+    db.session.commit()
+    return a
+
+
+def test_vector_cosine():
+    """Однаковий текст має косинус 1, текст без спільних слів — 0."""
+    idf = np.ones(similar.DIM, dtype=np.float32)
+    cols, weights = similar.vector(BASE, idf)
+    assert abs(float(np.dot(weights, weights)) - 1.0) < 1e-5
+    other_cols, _ = similar.vector("Квантовий двигун космічного корабля", idf)
+    assert not set(cols.tolist()) & set(other_cols.tolist())
+
+
+def test_similar_prior_only_decided(app):
+    """Показуються лише схвалені чи відхилені заявки, найсхожіша — першою."""
+    with app.app_context():
+        owner = _owner()
+        approved = _add(owner, "Алгоритм навчання", BASE, "approved")
+        rejected = _add(owner, "Алгоритм для навчання", "Система добирає вправи для студента.", "rejected")
+        _add(owner, "Алгоритм навчання", BASE, "draft")
+        _add(owner, "Квантовий двигун", "Двигун космічного корабля з новим охолодженням", "approved")
+        current = _add(owner, "Алгоритм навчання", BASE + " Нова версія.", "submitted")
+
+        found = similar.similar_prior(current)
+        assert [a.id for a, _ in found] == [approved.id, rejected.id]
+        assert found[0][1] > found[1][1] >= similar.MIN_SCORE
+
+
+def test_compaction_and_later_changes(app):
+    """Після компактизації нові зміни з історії перекривають рядки сегмента."""
+    with app.app_context():
+        owner = _owner()
+        approved = _add(owner, "Алгоритм навчання", BASE, "approved")
+        draft = _add(owner, "Алгоритм навчання", BASE, "draft")
+        current = _add(owner, "Алгоритм навчання", BASE, "submitted")
+
+        docs, _ = similar.compact()
+        assert docs == 3
+        assert [a.id for a, _ in similar.similar_prior(current)] == [approved.id]
+
+        # Рішення по чернетці та зміна тексту схваленої — уже після побудови сегмента
+        draft.status = "rejected"
+        save_history(draft, owner, "status_change")
+        approved.title = "Квантовий двигун"
+        approved.short_description = "Двигун космічного корабля з новим охолодженням"
+        save_history(approved, owner, "edited")
+        db.session.commit()
+        assert [a.id for a, _ in similar.similar_prior(current)] == [draft.id]
+
+
+def test_review_page_lists_similar(client, app, expert_headers):
+    """Експерт бачить схожі розглянуті заявки на сторінці розгляду."""
+    with app.app_context():
+        owner = _owner()
+        prior_id = _add(owner, "Алгоритм навчання", BASE, "approved").id
+        current_id = _add(owner, "Алгоритм навчання", BASE, "submitted").id
+
+    html = client.get(f"/expert/applications/{current_id}").get_data(as_text=True)
+    assert "Схожі розглянуті заявки" in html
+    assert f"/applications/{prior_id}" in html
+
+
+def test_compact_cli(runner, app):
+    """`flask similar-compact` будує сегмент у SIMILAR_INDEX_DIR."""
+    with app.app_context():
+        owner = _owner()
+        _add(owner, "Алгоритм навчання", BASE, "approved")
+
+    result = runner.invoke(args=["similar-compact"])
+    assert "1 заявок" in result.output
+    assert similar._current_generation(app.config["SIMILAR_INDEX_DIR"])
+
+
+def test_compaction_keeps_segments_readers_may_hold(app):
+    """Попереднє покоління переживає компактизацію; зниклий каталог не ламає пошук."""
+    import os
+    with app.app_context():
+        owner = _owner()
+        approved = _add(owner, "Алгоритм навчання", BASE, "approved")
+        current = _add(owner, "Алгоритм навчання", BASE, "submitted")
+        directory = similar.index_dir()
+
+        similar.compact()
+        first = similar._current_generation(directory)
+        assert [a.id for a, _ in similar.similar_prior(current)] == [approved.id]
+        similar.compact()
+        assert os.path.isdir(os.path.join(directory, first))  # читач міг щойно прочитати CURRENT
+
+        app.config["SIMILAR_GENERATION_GRACE"] = 0
+        try:
+            similar.compact()
+        finally:
+            app.config["SIMILAR_GENERATION_GRACE"] = 600
+        generations = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+        assert first not in generations and len(generations) == 2
+
+        # CURRENT вказує на каталог, якого вже немає: процес лишається на відкритому сегменті
+        with open(os.path.join(directory, "CURRENT"), "w", encoding="utf-8") as fh:
+            fh.write("0-0-0")
+        assert [a.id for a, _ in similar.similar_prior(current)] == [approved.id]
+
+
+def test_refresh_backlog_is_bounded(app, caplog):
+    """Завелику чергу подій запит не дочитує: лишається старий стан, компактизація наздоганяє."""
+    app.config["SIMILAR_REFRESH_MAX_EVENTS"] = 2
+    try:
+        with app.app_context():
+            owner = _owner()
+            approved = _add(owner, "Алгоритм навчання", BASE, "approved")
+            current = _add(owner, "Алгоритм навчання", BASE, "submitted")
+            assert [a.id for a, _ in similar.similar_prior(current)] == [approved.id]
+
+            later = [_add(owner, "Алгоритм навчання", BASE, "rejected") for _ in range(3)]
+            with caplog.at_level("WARNING", logger="similar"):
+                assert [a.id for a, _ in similar.similar_prior(current)] == [approved.id]
+                assert [a.id for a, _ in similar.similar_prior(current)] == [approved.id]
+            assert len([r for r in caplog.records if "similar-compact" in r.getMessage()]) == 1
+
+            similar.compact()
+            found = {a.id for a, _ in similar.similar_prior(current)}
+            assert found == {approved.id} | {a.id for a in later}
+    finally:
+        app.config["SIMILAR_REFRESH_MAX_EVENTS"] = 5000
+
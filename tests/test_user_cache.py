@@ -0,0 +1,72 @@
+import time
+from types import SimpleNamespace
+from extensions import db
+from models import User
+from user_cache import UserCache
+
+
+def _login_second_client(app, email, role):
+    with app.app_context():
+        u = User(email=email, role=role)
+        u.set_password("password")
+        db.session.add(u)
+        db.session.commit()
+    other = app.test_client()
+    other.post('/login', data={'email': email, 'password': 'password'})
+    return other
+
+
+def test_user_cache_lru_and_ttl():
+    """LRU витісняє найдавніший запис, а TTL робить запис недійсним."""
+    cache = UserCache(maxsize=2, ttl=0.05)
+    for i in (1, 2):
+        cache.put(SimpleNamespace(id=i, email=f"{i}@test.com", role="applicant", is_blocked=False))
+    cache.get(1)
+    cache.put(SimpleNamespace(id=3, email="3@test.com", role="applicant", is_blocked=False))
+
+    assert cache.get(2) is None  # витіснено
+    assert cache.get(1).email == "1@test.com"
+    time.sleep(0.06)
+    assert cache.get(1) is None
+
+
+def test_invalidate_reaches_other_processes(tmp_path):
+    """invalidate() в одному процесі скидає кеш інших через спільну мітку."""
+    stamp = str(tmp_path / "user_cache.stamp")
+    workers = [UserCache(ttl=3600, stamp_path=stamp) for _ in range(2)]
+    for cache in workers:
+        cache.put(SimpleNamespace(id=1, email="1@test.com", role="applicant", is_blocked=False))
+        assert cache.get(1).role == "applicant"
+
+    workers[0].invalidate(1)
+    assert workers[1].get(1) is None
+    workers[1].put(SimpleNamespace(id=1, email="1@test.com", role="expert", is_blocked=False))
+    assert workers[1].get(1).role == "expert"  # нова мітка запам'ятовується — кеш знову працює
+    workers[1].invalidate(1)
+    assert workers[0].get(1) is None
+
+
+def test_role_change_visible_immediately(client, app, auth_headers):
+    """Після зміни ролі адміном користувач одразу отримує нові права."""
+    assert client.get("/expert/applications").status_code == 302  # запис уже в кеші
+
+    admin_client = _login_second_client(app, "cache_admin@test.com", "admin")
+    with app.app_context():
+        user_id = User.query.filter_by(email="auth_user@test.com").first().id
+    admin_client.post(f"/admin/users/{user_id}/update", data={"action": "change_role", "role": "expert"})
+
+    assert client.get("/expert/applications").status_code == 200
+
+
+def test_blocked_user_loses_session(client, app, auth_headers):
+    """Заблокований користувач втрачає доступ з наступного запиту."""
+    assert client.get("/profile").status_code == 200
+
+    admin_client = _login_second_client(app, "cache_admin2@test.com", "admin")
+    with app.app_context():
+        user_id = User.query.filter_by(email="auth_user@test.com").first().id
+    admin_client.post(f"/admin/users/{user_id}/update", data={"action": "toggle_block"})
+
+    response = client.get("/profile")
+    assert response.status_code == 302
+    assert "/login" in response.headers["Location"]
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm.exc import StaleDataError
+from extensions import db
+from models import User, Application, ApplicationHistory
+from helpers import save_history
+
+THREADS = 6
+UPDATES = 10
+
+
+def _draft(app, email="auth_user@test.com"):
+    with app.app_context():
+        owner = db.session.scalar(select(User).filter_by(email=email))
+        a = Application(title="Заявка", short_description="Опис", status="draft", owner_id=owner.id)
+        db.session.add(a)
+        db.session.commit()
+        return a.id, a.version
+
+
+def test_stale_edit_form_is_rejected(client, app, auth_headers):
+    """Форма, відкрита до чужої зміни, отримує 409 і нічого не записує."""
+    app_id, version = _draft(app)
+    with app.app_context():
+        db.session.get(Application, app_id).title = "Змінив хтось інший"
+        db.session.commit()
+
+    response = client.post(f"/applications/{app_id}/edit",
+                           data={"title": "Моя назва", "short_description": "Опис", "version": version})
+    assert response.status_code == 409
+    assert "Конфлікт змін" in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(Application, app_id).title == "Змінив хтось інший"
+        assert db.session.scalar(select(func.count(ApplicationHistory.id))) == 0
+
+
+def test_current_version_is_accepted(client, app, auth_headers):
+    """З актуальною версією редагування і подання проходять, версія зростає."""
+    app_id, version = _draft(app)
+    client.post(f"/applications/{app_id}/edit",
+                data={"title": "Нова назва", "short_description": "Опис", "version": version})
+    client.post(f"/applications/{app_id}/submit", data={"version": version + 1})
+    with app.app_context():
+        app_obj = db.session.get(Application, app_id)
+        assert (app_obj.title, app_obj.status, app_obj.version) == ("Нова назва", "submitted", version + 2)
+
+
+def test_missing_version_is_a_conflict(client, app, auth_headers):
+    """Запит без версії (стара сторінка чи обхід форми) нічого не змінює; кнопки списку версію надсилають."""
+    app_id, version = _draft(app)
+    assert client.post(f"/applications/{app_id}/submit").status_code == 409
+    with app.app_context():
+        assert db.session.get(Application, app_id).status == "draft"
+
+    html = client.get("/applications").get_data(as_text=True)
+    assert f'name="version" value="{version}"' in html
+
+
+def test_concurrent_writer_loses_with_conflict(app, auth_headers):
+    """Другий запис з тією ж прочитаною версією не проходить (compare-and-swap)."""
+    app_id, _ = _draft(app)
+    with app.app_context():
+        stale = db.session.get(Application, app_id)
+        # Інша сесія встигає змінити рядок між читанням і записом
+        with db.engine.begin() as connection:
+            connection.execute(db.update(Application).where(Application.id == app_id)
+                               .values(status="submitted", version=Application.version + 1))
+        stale.status = "cancelled"
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+        else:
+            raise AssertionError("застарілий запис пройшов")
+        assert db.session.get(Application, app_id).status == "submitted"
+
+
+def test_threads_do_not_lose_updates(app, auth_headers):
+    """Стрес-тест: паралельні потоки з повтором при конфлікті не гублять жодної зміни."""
+    assert db.engine.url.database not in (None, "", ":memory:")
+    app_id, version = _draft(app)
+    conflicts = []
+    errors = []
+
+    def writer(n):
+        try:
+            with app.app_context():
+                owner_id = db.session.scalar(select(User.id).filter_by(email="auth_user@test.com"))
+                for i in range(UPDATES):
+                    while True:
+                        try:
+                            app_obj = db.session.get(Application, app_id, populate_existing=True)
+                            app_obj.short_description += f" [{n}:{i}]"
+                            time.sleep(0.001)  # даємо іншим потокам вклинитися між читанням і записом
+                            save_history(app_obj, db.session.get(User, owner_id), "edited")
+                            db.session.commit()
+                            break
+                        except StaleDataError:
+                            db.session.rollback()
+                            conflicts.append(n)
+        except Exception as e:  # pragma: no cover — видно в assert нижче
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert conflicts, "потоки жодного разу не перетнулися — тест нічого не перевірив"
+    with app.app_context():
+        app_obj = db.session.get(Application, app_id)
+        assert app_obj.version == version + THREADS * UPDATES
+        for n in range(THREADS):
+            for i in range(UPDATES):
+                assert f"[{n}:{i}]" in app_obj.short_description
+        # Історія містить рівно ті стани, що справді були записані
+        assert db.session.scalar(select(func.count(ApplicationHistory.id))) == THREADS * UPDATES
@@ -0,0 +1,108 @@
+import base64
+import binascii
+
+from flask import request, url_for, g, abort
+from extensions import db
+from models import Application, UploadSession
+from helpers import api_login_required
+from loaders import count_files
+import resumable
+
+TUS_VERSION = "1.0.0"
+MAX_FILES = 10
+
+
+def _tus(status, **headers):
+    """Порожня відповідь протоколу з заголовками Upload-* (імена — з підкресленнями)."""
+    headers = {name.replace("_", "-"): str(value) for name, value in headers.items() if value is not None}
+    headers["Tus-Resumable"] = TUS_VERSION
+    return "", status, headers
+
+
+def _filename(metadata):
+    """Ім'я файлу з Upload-Metadata: пари "ключ base64" через кому."""
+    for pair in (metadata or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if key == "filename":
+            try:
+                return base64.b64decode(value, validate=True).decode("utf-8")
+            except (binascii.Error, UnicodeDecodeError):
+                abort(400)
+    return None
+
+
+def _header_int(name):
+    value = request.headers.get(name, "")
+    if not value.isdigit():
+        abort(400)
+    return int(value)
+
+
+def _own_session(token):
+    upload = db.session.get(UploadSession, token)
+    if upload is None or upload.owner_id != g.user.id:
+        abort(404)
+    return upload
+
+
+def register_routes(app):
+    @app.route("/applications/<int:application_id>/uploads", methods=["POST"])
+    @api_login_required
+    def upload_session_create(application_id):
+        """Відкриває сесію відновлюваного завантаження файлу до заявки (див. resumable.py)."""
+        app_obj = db.get_or_404(Application, application_id)
+        if app_obj.owner_id != g.user.id:
+            abort(403)
+        if app_obj.status not in ("draft", "needs_changes"):
+            abort(409)
+        length = _header_int("Upload-Length")
+        filename = _filename(request.headers.get("Upload-Metadata"))
+        if not filename:
+            abort(400)
+        # Незавершені завантаження теж займають місця з ліміту на 10 файлів
+        if count_files(application_id) + resumable.open_count(application_id) >= MAX_FILES:
+            abort(409)
+        upload = resumable.start(application_id, g.user.id, filename, length)
+        return _tus(201, Location=url_for("upload_session_status", token=upload.id),
+                    Upload_Offset=0, Tus_Max_Size=resumable.max_size())
+
+    @app.route("/upload-sessions/<token>", methods=["HEAD"])
+    @api_login_required
+    def upload_session_status(token):
+        upload = _own_session(token)
+        return _tus(200, Upload_Offset=upload.received, Upload_Length=upload.length, Cache_Control="no-store")
+
+    @app.route("/upload-sessions/<token>", methods=["PATCH", "PUT"])
+    @api_login_required
+    def upload_session_write(token):
+        upload = _own_session(token)
+        if request.mimetype != "application/offset+octet-stream":
+            abort(415)
+        offset = _header_int("Upload-Offset")
+        if request.content_length is not None and offset + request.content_length > upload.length:
+            raise resumable.UploadTooLarge()
+        try:
+            received = resumable.write(upload, offset, request.stream)
+        except resumable.OffsetMismatch:
+            return _tus(409, Upload_Offset=upload.received)
+        return _tus(204, Upload_Offset=received)
+
+    @app.route("/upload-sessions/<token>/finish", methods=["POST"])
+    @api_login_required
+    def upload_session_finish(token):
+        upload = _own_session(token)
+        if upload.application.status not in ("draft", "needs_changes"):
+            abort(409)
+        record = resumable.finish(upload)
+        return {
+            "id": record.id,
+            "filename": record.filename,
+            "sha256": record.blob_sha256,
+            "url": url_for("download_application_file", file_id=record.id),
+        }, 201, {"Tus-Resumable": TUS_VERSION}
+
+    @app.route("/upload-sessions/<token>", methods=["DELETE"])
+    @api_login_required
+    def upload_session_cancel(token):
+        resumable.cancel(_own_session(token))
+        return _tus(204)
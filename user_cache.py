@@ -0,0 +1,105 @@
+"""Кеш поточного користувача в межах процесу.
+
+`load_logged_in_user` виконується на кожен запит (включно з /uploads/...
+та редіректами). Щоб не робити SELECT щоразу, тримаємо обмежений LRU-кеш
+легких записів (id, email, role, is_blocked) з часом життя TTL.
+
+Зміна ролі, блокування та зміна пароля явно викликають `invalidate()` (після
+commit). Щоб зміну одразу побачили й інші процеси (воркери gunicorn),
+invalidate() ще й оновлює файл-мітку USER_CACHE_STAMP: кожне звернення
+до кешу робить os.stat() цього файлу, і якщо мітка змінилася з
+попереднього разу, процес скидає весь свій кеш. stat() на порядки
+дешевший за SELECT, а такі зміни рідкісні, тож повне скидання нічого не
+коштує. БД — SQLite, тож усі процеси й так працюють на одній машині і
+бачать один файл. Без мітки (stamp_path=None) інші процеси побачать
+зміну не пізніше ніж через USER_CACHE_TTL секунд.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CachedUser = namedtuple("CachedUser", "id email role is_blocked")
+
+
+class UserCache:
+    def __init__(self, maxsize=1024, ttl=30.0, stamp_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stamp_path = stamp_path
+        self._stamp = None  # мітка, з якою узгоджено _data
+        self._data = OrderedDict()  # user_id -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize, ttl, stamp_path=None):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self.stamp_path = stamp_path
+            self._stamp = self._read_stamp()
+            self._data.clear()
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _read_stamp(self):
+        if self.stamp_path is None:
+            return None
+        try:
+            st = os.stat(self.stamp_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _bump_stamp(self):
+        """Нова мітка — новий файл на місці старого (інший inode навіть у межах одного тіку годинника)."""
+        folder = os.path.dirname(self.stamp_path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".user-cache-")
+        os.close(fd)
+        os.replace(tmp, self.stamp_path)
+
+    def get(self, user_id):
+        stamp = self._read_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                # Інший процес (або цей) щось інвалідував — не знаємо що, тож скидаємо все
+                self._data.clear()
+                self._stamp = stamp
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            expires_at, record = item
+            if expires_at < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return record
+
+    def put(self, user):
+        record = CachedUser(user.id, user.email, user.role, bool(user.is_blocked))
+        if self.maxsize <= 0:
+            return record
+        with self._lock:
+            self._data[record.id] = (time.monotonic() + self.ttl, record)
+            self._data.move_to_end(record.id)
+            if len(self._data) > self.maxsize:
+                # Викидаємо найдавніше використаний запис
+                self._data.popitem(last=False)
+        return record
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+        if self.stamp_path is not None:
+            self._bump_stamp()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+user_cache = UserCache()
@@ -0,0 +1,120 @@
+"""ZIP-архів файлів заявки, що генерується на льоту.
+
+Архів не складається ні в пам'яті, ні в тимчасовому файлі: zipfile пише в
+_Sink — об'єкт без seek(), тож zipfile сам ставить прапорець "data
+descriptor" (CRC і розміри — після даних запису), а генератор віддає
+назовні все, що накопичилось, після кожної порції файлу. Пам'ять — одна
+порція FILE_STORE_CHUNK_SIZE плюс те, що встиг стиснути zlib, незалежно від
+кількості й розміру файлів. ZIP64 вмикається сам: для записів, більших за
+4 ГБ (розмір відомий заздалегідь), і для зсувів за 4 ГБ у центральному
+каталозі.
+
+Формати, які вже стиснуті всередині (.docx, .pdf, зображення, архіви),
+пишуться як STORED: повторне deflate лише витрачає процесор, а розмір
+майже не змінює. Решта — DEFLATED.
+"""
+import zipfile
+from datetime import datetime
+
+from flask import current_app, has_app_context
+
+DEFAULTS = {
+    "FILE_STORE_CHUNK_SIZE": 1024 * 1024,
+    "ZIP_COMPRESS_LEVEL": 6,
+}
+
+# Уже стиснуті формати: Office/ODF — це ZIP, PDF — потоки FlateDecode
+STORED_EXTENSIONS = frozenset({
+    "docx", "xlsx", "pptx", "odt", "ods", "odp", "pdf", "epub",
+    "zip", "rar", "7z", "gz", "bz2", "xz",
+    "jpg", "jpeg", "png", "gif", "webp", "heic",
+    "mp3", "mp4", "m4a", "mov", "avi", "mkv", "webm",
+})
+
+# ZIP не вміє дат до 1980 року
+_ZIP_EPOCH = datetime(1980, 1, 1)
+
+
+def _settings():
+    cfg = current_app.config if has_app_context() else {}
+    return {key: cfg.get(key, default) for key, default in DEFAULTS.items()}
+
+
+class _Sink:
+    """Вихідний "файл" для zipfile: лише write(); накопичене забирає drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def compress_type(filename):
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def unique_names(names):
+    """Імена записів без повторів: друга "doc.txt" стає "doc (2).txt"."""
+    seen, result = set(), []
+    for name in names:
+        candidate, n = name, 1
+        while candidate in seen:
+            n += 1
+            stem, dot, ext = name.rpartition(".")
+            candidate = f"{stem} ({n}).{ext}" if dot and stem else f"{name} ({n})"
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+def stream(entries):
+    """Генератор байтів ZIP-архіву.
+
+    entries — список (ім'я в архіві, opener, розмір, datetime | None), де
+    opener() відкриває байти файлу (див. file_store.opener);
+    його варто зібрати до початку відповіді, щоб генератор не ходив у БД.
+    Налаштування читаються одразу: тіло відповіді віддається вже поза
+    контекстом застосунку.
+    """
+    settings = _settings()
+    return _generate(entries, settings["FILE_STORE_CHUNK_SIZE"], settings["ZIP_COMPRESS_LEVEL"])
+
+
+def _generate(entries, chunk_size, compress_level):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", compresslevel=compress_level) as archive:
+        for name, open_source, size, modified in entries:
+            modified = max((modified or _ZIP_EPOCH).replace(tzinfo=None), _ZIP_EPOCH)
+            info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+            info.compress_type = compress_type(name)
+            info.file_size = size  # zipfile за ним вирішує, чи потрібен ZIP64 для запису
+            info.external_attr = 0o644 << 16
+            with open_source() as src, archive.open(info, mode="w") as dst:
+                while chunk := src.read(chunk_size):
+                    dst.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    # Центральний каталог пишеться під час закриття архіву
+    if data := sink.drain():
+        yield data
+
+
+def entries_for(files):
+    """(ім'я, opener, розмір, час) для файлів заявки, байти яких на місці."""
+    import file_store
+    present = [f for f in files if file_store.exists(f)]
+    names = unique_names([f.filename for f in present])
+    return [(name, file_store.opener(f), file_store.size_of(f), f.created_at) for name, f in zip(names, present)]